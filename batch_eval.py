@@ -0,0 +1,163 @@
+"""
+Vectorized hand evaluation with NumPy.
+
+Scores many hands in one call for offline analysis, training and equity
+simulations. Hands are arrays of Card.id values and the result uses the same
+int strength encoding as board.hand_strength, so both can be mixed freely.
+"""
+
+import numpy as np
+
+from board import CARDS, STRENGTH_CATEGORY_SHIFT
+
+CHUNK_ROWS = 1 << 16  # hands scored per pass, bounds temporary memory
+
+_BITS = (1 << np.arange(13)).astype(np.int32)
+
+
+def _build_mask_tables():
+    """Lookups over 13-bit rank masks (bit i is rank i + 2)."""
+    masks = np.arange(1 << 13)
+    highest = np.full(1 << 13, -1, dtype=np.int32)
+    top5 = np.zeros(1 << 13, dtype=np.int32)
+    straight = np.zeros(1 << 13, dtype=np.int32)
+    for mask in range(1, 1 << 13):
+        held = [i for i in range(12, -1, -1) if mask >> i & 1]
+        highest[mask] = held[0]
+        packed = 0
+        for i in range(5):
+            packed = (packed << 4) | (held[i] + 2 if i < len(held) else 0)
+        top5[mask] = packed
+    for high in range(12, 3, -1):
+        run = 0b11111 << (high - 4)
+        hit = (masks & run) == run
+        straight[hit & (straight == 0)] = high + 2
+    wheel = (1 << 12) | 0b1111
+    straight[((masks & wheel) == wheel) & (straight == 0)] = 5
+    return highest, top5, straight
+
+
+_HIGHEST, _TOP5, _STRAIGHT = _build_mask_tables()
+
+
+def cards_to_ids(hands):
+    """Turns a list of card lists into an int array of Card ids (-1 pads short hands)."""
+    width = max(len(h) for h in hands)
+    ids = np.full((len(hands), width), -1, dtype=np.int32)
+    for row, hand in enumerate(hands):
+        ids[row, : len(hand)] = [card.id for card in hand]
+    return ids
+
+
+def ids_to_cards(ids):
+    return [CARDS[i] for i in ids if i >= 0]
+
+
+def _mask(cond):
+    return cond.astype(np.int32) @ _BITS
+
+
+def _top_multiset(counts, k):
+    """Highest k ranks repeating a rank once per copy, packed into 5 left aligned nibbles."""
+    n = counts.shape[0]
+    packed = np.zeros(n, dtype=np.int32)
+    left = np.full(n, k, dtype=np.int32)
+    for r in range(12, -1, -1):
+        take = np.minimum(counts[:, r], left)
+        for t in range(1, k + 1):
+            packed = np.where(take >= t, (packed << 4) | (r + 2), packed)
+        left -= take
+    return packed << (4 * (5 - k)) << (4 * left)
+
+
+def _evaluate_chunk(ids):
+    n = ids.shape[0]
+    rows = np.repeat(np.arange(n), ids.shape[1])
+    flat = ids.ravel()
+    held = flat >= 0
+    card_counts = np.bincount(
+        rows[held] * 52 + flat[held], minlength=n * 52
+    ).reshape(n, 4, 13)
+    counts = card_counts.sum(axis=1)
+    suit_counts = card_counts.sum(axis=2)
+
+    present = _mask(counts > 0)
+    pairs = _mask(counts >= 2)
+    n_ranks = (counts > 0).sum(axis=1)
+
+    def without(mask, idx):
+        # drop rank idx from mask, idx -1 means "no such rank"
+        return np.where(idx >= 0, mask & ~np.left_shift(1, np.maximum(idx, 0)), mask)
+
+    def category(c):
+        return np.int32(c << STRENGTH_CATEGORY_SHIFT)
+
+    # Every category is scored where it is possible; the encoding orders
+    # categories first, so the max picks the best one, same as the scalar
+    # evaluator's if/elif chain.
+    best = category(0) | _TOP5[present]
+    # a single rank held 5+ times (multi-deck): five copies as high card
+    single = n_ranks == 1
+    if single.any():
+        r = _HIGHEST[present[single]] + 2
+        best[single] = r * 0x11111
+
+    p = _HIGHEST[pairs]
+    rest = without(present, p)
+    cand = category(1) | ((p + 2) << 16) | ((_TOP5[rest] >> 8) << 4)
+    best = np.where((p >= 0) & (n_ranks >= 4), np.maximum(best, cand), best)
+
+    p2 = _HIGHEST[without(pairs, p)]
+    kicker = _HIGHEST[without(rest, p2)]
+    cand = category(2) | ((p + 2) << 16) | ((p2 + 2) << 12) | ((kicker + 2) << 8)
+    best = np.where((p2 >= 0) & (kicker >= 0), np.maximum(best, cand), best)
+
+    t = _HIGHEST[_mask(counts >= 3)]
+    cand = category(3) | ((t + 2) << 16) | ((_TOP5[without(present, t)] >> 12) << 8)
+    best = np.where((t >= 0) & (n_ranks >= 3), np.maximum(best, cand), best)
+
+    high = _STRAIGHT[present]
+    best = np.where(high > 0, np.maximum(best, category(4) | (high << 16)), best)
+
+    fh_pair = _HIGHEST[without(pairs, t)]
+    cand = category(6) | ((t + 2) << 16) | ((fh_pair + 2) << 12)
+    best = np.where((t >= 0) & (fh_pair >= 0), np.maximum(best, cand), best)
+
+    q = _HIGHEST[_mask(counts >= 4)]
+    kicker = _HIGHEST[without(present, q)]
+    cand = category(7) | ((q + 2) << 16) | ((kicker + 2) << 12)
+    best = np.where((q >= 0) & (kicker >= 0), np.maximum(best, cand), best)
+
+    flush_suit = suit_counts.argmax(axis=1)
+    flush = np.flatnonzero(suit_counts[np.arange(n), flush_suit] >= 5)
+    if flush.size:
+        suited = card_counts[flush, flush_suit[flush]]
+        suited_mask = _mask(suited > 0)
+        cand = category(5) | _TOP5[suited_mask]
+        dupes = np.flatnonzero(suited.max(axis=1) > 1)
+        if dupes.size:
+            cand[dupes] = category(5) | _top_multiset(suited[dupes], 5)
+        high = _STRAIGHT[suited_mask]
+        cand = np.where(high > 0, category(8) | (high << 16), cand)
+        best[flush] = np.maximum(best[flush], cand)
+    return best
+
+
+"""
+Scores a batch of hands in one vectorized call.
+
+@param cards: int array of Card ids, shape [N, 5..7]. Rows with fewer cards
+              can be padded with -1, every row needs at least 5 cards.
+
+@return strengths: int32 array of shape [N], same values as board.hand_strength
+"""
+
+
+def evaluate_hands_batch(cards):
+    cards = np.asarray(cards, dtype=np.int32)
+    if cards.ndim != 2 or not 5 <= cards.shape[1] <= 7:
+        raise ValueError(f"expected shape [N, 5..7], got {cards.shape}")
+    out = np.empty(cards.shape[0], dtype=np.int32)
+    for start in range(0, cards.shape[0], CHUNK_ROWS):
+        out[start : start + CHUNK_ROWS] = _evaluate_chunk(cards[start : start + CHUNK_ROWS])
+    return out
@@ -0,0 +1,120 @@
+"""
+Measures act round trips to a bot served by botserver.BotServer: a new
+connection per request, one kept-alive connection, and several tables asking
+at once over their own connections, with one worker and with one per table,
+then over one shared connection, taking turns or multiplexed (game.mux).
+
+    python benchmarks/bench_botserver.py --requests 2000 --think-ms 2
+
+The bot calls after --think-ms of "thinking" (a sleep, like waiting on a
+model), so the concurrent numbers show how much of that the server overlaps.
+The server's own latency report is printed at the end of each run.
+"""
+
+import argparse
+import contextlib
+import pathlib
+import sys
+import threading
+import time
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.append(str(REPO_ROOT))  # so we can import botserver from repo root
+
+from bench_transport import describe, sample_state
+from board import CallAction
+from botserver import BotServer
+from engine_net import ConnectionPool, ask_bot_tcp
+
+
+class ThinkingBot:
+    def __init__(self, think_s):
+        self.name = "ThinkingBot"
+        self.think_s = think_s
+
+    def decide_action(self, state_json):
+        if self.think_s:
+            time.sleep(self.think_s)
+        return CallAction()
+
+    def end_game(self, state_json):
+        pass
+
+
+@contextlib.contextmanager
+def serving(think_s, workers=1):
+    server = BotServer(ThinkingBot(think_s), "127.0.0.1", 0, workers=workers)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.ready.wait()
+    try:
+        yield server.port
+    finally:
+        server.stop()
+        thread.join()
+
+
+def ask(port, state, n, keepalive=True, pool=None, table=None):
+    own = pool is None
+    if own:
+        pool = ConnectionPool(keepalive=keepalive)
+    ask_bot_tcp("127.0.0.1", port, state, pool=pool, table=table, seat="me")  # warm up / negotiate
+    times = []
+    for _ in range(n):
+        start = time.perf_counter()
+        ask_bot_tcp("127.0.0.1", port, state, pool=pool, table=table, seat="me")
+        times.append(time.perf_counter() - start)
+    if own:
+        pool.close_all()
+    return times
+
+
+def ask_concurrently(port, state, n, tables, shared=None):
+    """
+    `tables` threads, n requests in total; returns (times, wall seconds).
+    Each table has its own connection, or with shared=False/True they all
+    use one, taking turns or multiplexed.
+    """
+    results = [[] for _ in range(tables)]
+    pool = ConnectionPool(mux=shared) if shared is not None else None
+    threads = [
+        threading.Thread(target=lambda i=i, r=r: r.extend(ask(port, state, n // tables, pool=pool, table=str(i))))
+        for i, r in enumerate(results)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    if pool is not None:
+        pool.close_all()
+    return [x for r in results for x in r], wall
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Act round trips to a BotServer.")
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--think-ms", type=float, default=0.0, help="time the bot takes per decision")
+    ap.add_argument("--tables", type=int, default=4, help="concurrent tables")
+    args = ap.parse_args()
+    think = args.think_ms / 1000
+    state = sample_state()
+
+    with serving(think) as port:
+        describe("connection per request", ask(port, state, args.requests, keepalive=False))
+        describe("kept-alive connection", ask(port, state, args.requests))
+    for workers in (1, args.tables):
+        with serving(think, workers) as port:
+            times, wall = ask_concurrently(port, state, args.requests, args.tables)
+            describe(f"{args.tables} tables, {workers} worker(s)", times)
+            print(f"{'':22s} {len(times) / wall:8.0f} req/s overall")
+    for mux in (False, True):
+        with serving(think, args.tables) as port:
+            times, wall = ask_concurrently(port, state, args.requests, args.tables, shared=mux)
+            describe(f"{args.tables} tables, 1 conn{', mux' if mux else ''}", times)
+            print(f"{'':22s} {len(times) / wall:8.0f} req/s overall")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Checks the table hand evaluator against the old combinations evaluator and
+measures hands per second for both.
+
+    python benchmarks/bench_evaluator.py                 # random check + benchmark
+    python benchmarks/bench_evaluator.py --exhaustive    # also every 5 card hand
+    python benchmarks/bench_evaluator.py --decks 5       # random multi-deck hands
+
+If NumPy is installed the batch evaluator (batch_eval.py) is checked and
+timed as well.
+"""
+
+import argparse
+import pathlib
+import random
+import sys
+import time
+from itertools import combinations
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.append(str(REPO_ROOT))  # so we can import board from repo root
+
+from board import (
+    Card,
+    _evaluate_hand_combinations,
+    evaluate_hand,
+    hand_score,
+    hand_strength,
+    ranks,
+    suits,
+)
+
+try:
+    from batch_eval import cards_to_ids, evaluate_hands_batch
+except ImportError:  # numpy not installed
+    evaluate_hands_batch = None
+
+
+def full_deck(num_decks=1):
+    return [Card(s, r) for _ in range(num_decks) for s in suits for r in ranks]
+
+
+def random_hands(count, size, num_decks=1, seed=0):
+    rng = random.Random(seed)
+    deck = full_deck(num_decks)
+    return [rng.sample(deck, size) for _ in range(count)]
+
+
+def check(hands):
+    """Compares both evaluators, returns a list of mismatching hands."""
+    bad = []
+    for cards in hands:
+        expected, _ = _evaluate_hand_combinations(cards)
+        got, best = evaluate_hand(cards)
+        if got != expected or _evaluate_hand_combinations(list(best))[0] != expected:
+            bad.append((cards, expected, got))
+    return bad
+
+
+def check_exhaustive():
+    """Every 5 card hand from one deck, counted per category."""
+    seen = [0] * len(hand_score)
+    bad = []
+    for cards in combinations(full_deck(), 5):
+        cards = list(cards)
+        expected, _ = _evaluate_hand_combinations(cards)
+        got, _ = evaluate_hand(cards)
+        if got != expected:
+            bad.append((cards, expected, got))
+        seen[got[0]] += 1
+    return bad, seen
+
+
+def hands_per_second(fn, hands, min_time=1.0):
+    done = 0
+    start = time.perf_counter()
+    while True:
+        for cards in hands:
+            fn(cards)
+        done += len(hands)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return done / elapsed
+
+
+def check_batch(hands):
+    expected = [hand_strength(cards) for cards in hands]
+    got = evaluate_hands_batch(cards_to_ids(hands)).tolist()
+    return [(cards, e, g) for cards, e, g in zip(hands, expected, got) if e != g]
+
+
+def batch_hands_per_second(hands, min_time=1.0):
+    ids = cards_to_ids(hands)
+    done = 0
+    start = time.perf_counter()
+    while True:
+        evaluate_hands_batch(ids)
+        done += len(hands)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return done / elapsed
+
+
+def report_mismatches(label, bad):
+    if not bad:
+        print(f"{label}: OK")
+        return True
+    print(f"{label}: {len(bad)} mismatches")
+    for cards, expected, got in bad[:10]:
+        print(f"  {[c.short_str() for c in cards]} expected {expected} got {got}")
+    return False
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Check and benchmark evaluate_hand.")
+    ap.add_argument("--hands", type=int, default=20000, help="random hands per size")
+    ap.add_argument("--decks", type=int, default=1, help="decks to sample from")
+    ap.add_argument("--exhaustive", action="store_true", help="check all 2,598,960 5 card hands")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    ok = True
+    for size in (5, 6, 7):
+        hands = random_hands(args.hands, size, args.decks, args.seed + size)
+        ok &= report_mismatches(f"random {size} card hands ({args.decks} deck)", check(hands))
+        if evaluate_hands_batch is not None:
+            ok &= report_mismatches(f"  batch {size} card hands", check_batch(hands))
+
+    if args.exhaustive:
+        bad, seen = check_exhaustive()
+        ok &= report_mismatches("all 5 card hands", bad)
+        for name, n in zip(hand_score, seen):
+            print(f"  {name:16s} {n:8d}")
+
+    hands = random_hands(2000, 7, args.decks, args.seed)
+    old = hands_per_second(_evaluate_hand_combinations, hands)
+    new = hands_per_second(evaluate_hand, hands)
+    print(f"7 card hands/sec: combinations {old:10.0f}  table {new:10.0f}  ({new / old:.1f}x)")
+    if evaluate_hands_batch is not None:
+        batch = batch_hands_per_second(random_hands(100000, 7, args.decks, args.seed))
+        print(f"7 card hands/sec: batch {batch:10.0f}  ({batch / old:.1f}x)")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
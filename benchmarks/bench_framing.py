@@ -0,0 +1,134 @@
+"""
+Throughput of netwire's framing over a local socket pair, small to large
+frames: the old way (recv chunks into a growing bytearray, copy to bytes,
+send header + payload concatenated) against send_frame (one vectored send)
+and FrameReader (recv_into a reused buffer, decoded in place). Both as
+streaming throughput and as request/reply round trips, which is how the
+engine and the bots talk; each number is the best of three runs.
+
+    python benchmarks/bench_framing.py --seconds 1
+
+Payloads are JSON strings of the given size, so decoding is about as cheap
+as it gets and the numbers are mostly the framing.
+"""
+
+import argparse
+import json
+import pathlib
+import socket
+import struct
+import sys
+import threading
+import time
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.append(str(REPO_ROOT))  # so we can import netwire from repo root
+
+from netwire import FrameReader, decode_payload, send_frame
+
+SIZES = (64, 1024, 16 * 1024, 256 * 1024)
+
+
+def old_send(sock, data):
+    sock.sendall(struct.pack(">I", len(data)) + data)
+
+
+def _old_recvall(sock, n):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("closed early")
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def old_recv(sock):
+    n = struct.unpack(">I", _old_recvall(sock, 4))[0]
+    return decode_payload(_old_recvall(sock, n))
+
+
+def run(send, make_recv, payload, seconds):
+    """Frames per second through a socket pair, the sender on its own thread."""
+    a, b = socket.socketpair()
+    recv = make_recv(b)
+    stop = threading.Event()
+
+    def sender():
+        try:
+            while not stop.is_set():
+                send(a, payload)
+        except OSError:
+            pass
+
+    thread = threading.Thread(target=sender, daemon=True)
+    thread.start()
+    recv()  # warm up
+    count, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for _ in range(16):
+            recv()
+        count += 16
+    elapsed = time.perf_counter() - start
+    stop.set()
+    b.close()
+    a.close()
+    thread.join()
+    return count / elapsed
+
+
+def round_trip(send, make_recv, payload, seconds):
+    """Microseconds per request/reply, an echo thread on the other end (how the engine and bots talk)."""
+    a, b = socket.socketpair()
+    recv_a, recv_b = make_recv(a), make_recv(b)
+
+    def echo():
+        try:
+            while True:
+                recv_b()
+                send(b, payload)
+        except (OSError, ValueError):
+            pass
+
+    thread = threading.Thread(target=echo, daemon=True)
+    thread.start()
+    send(a, payload)
+    recv_a()  # warm up
+    count, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for _ in range(16):
+            send(a, payload)
+            recv_a()
+        count += 16
+    elapsed = time.perf_counter() - start
+    a.close()
+    thread.join()
+    b.close()
+    return elapsed / count * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Framing throughput, old vs recv_into/sendmsg.")
+    ap.add_argument("--seconds", type=float, default=1.0, help="per size and variant")
+    args = ap.parse_args()
+
+    print("throughput, a sender thread streaming frames")
+    print(f"{'payload':>10}  {'old frames/s':>13} {'MB/s':>8}  {'new frames/s':>13} {'MB/s':>8}  speedup")
+    for size in SIZES:
+        payload = json.dumps("x" * (size - 2)).encode()
+        old = max(run(old_send, lambda s: (lambda: old_recv(s)), payload, args.seconds) for _ in range(3))
+        new = max(run(send_frame, lambda s: FrameReader(s).recv, payload, args.seconds) for _ in range(3))
+        mb = size / 1e6
+        print(f"{size:>10}  {old:13.0f} {old * mb:8.1f}  {new:13.0f} {new * mb:8.1f}  {new / old:6.2f}x")
+
+    print()
+    print("round trip, request and same size reply, microseconds")
+    print(f"{'payload':>10}  {'old':>9}  {'new':>9}  speedup")
+    for size in SIZES:
+        payload = json.dumps("x" * (size - 2)).encode()
+        old = min(round_trip(old_send, lambda s: (lambda: old_recv(s)), payload, args.seconds) for _ in range(3))
+        new = min(round_trip(send_frame, lambda s: FrameReader(s).recv, payload, args.seconds) for _ in range(3))
+        print(f"{size:>10}  {old:9.1f}  {new:9.1f}  {old / new:6.2f}x")
+
+if __name__ == "__main__":
+    main()
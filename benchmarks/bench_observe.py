@@ -0,0 +1,108 @@
+"""
+Measures how long bots/simple_bot.py takes to answer an act when it gets
+observe messages (game.observe) vs when it works everything out on its turn.
+
+    python benchmarks/bench_observe.py --hands 40 --others-ms 100
+
+Each hand the engine side deals our seat in, then for every street sends the
+new board, waits --others-ms while "the others act" and asks for an action.
+With observe messages the bot spends that wait on its equity, so the act
+only has to look it up; without them it runs the simulation inside the act.
+"""
+
+import argparse
+import contextlib
+import pathlib
+import sys
+import threading
+import time
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.append(str(REPO_ROOT))  # so we can import botserver from repo root
+sys.path.append(str(REPO_ROOT / "bots"))
+
+from bench_transport import describe
+from board import Deck
+from botserver import BotServer
+from engine_net import ConnectionPool, notify_bot_tcp, observe_bot_tcp, request_action
+from simple_bot import PokerBot
+
+NUM_DECKS = 8
+OPPONENTS = ("Bot1", "Bot2", "Bot3")
+TABLE, SEAT = "0.0", "Simple"
+
+
+@contextlib.contextmanager
+def serving():
+    bot = PokerBot(name=SEAT)
+    bot.served = True  # what run() does, it's served over TCP rather than in-process
+    server = BotServer(bot, "127.0.0.1", 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.ready.wait()
+    try:
+        yield server.port
+    finally:
+        server.stop()
+        thread.join()
+
+
+def act_state(hand, board):
+    players = {name: {"chips": 1000, "position": i} for i, name in enumerate((SEAT,) + OPPONENTS)}
+    return {
+        "hand": [c.to_dict() for c in hand], "board": [c.to_dict() for c in board],
+        "pot": 120, "curr_bet": 40, "player_curr_bet": 0, "can_check": False,
+        "small_blind": 10, "big_blind": 20, "num_decks": NUM_DECKS, "players": players,
+    }
+
+
+def play(port, hands, others_s, observe):
+    pool = ConnectionPool(observe=observe)
+    deck = Deck(NUM_DECKS)
+    deck.shuffle()
+    times = []
+
+    def tell(event):
+        observe_bot_tcp("127.0.0.1", port, {"op": "observe", **event, "table": TABLE, "seat": SEAT}, pool)
+
+    def act(hand, board):
+        time.sleep(others_s)  # everyone before us acts
+        start = time.perf_counter()
+        request_action("127.0.0.1", port, act_state(hand, board), pool=pool, table=TABLE, seat=SEAT)
+        times.append(time.perf_counter() - start)
+
+    # negotiate first, like the engine's preflight, so the first hand is observed
+    request_action("127.0.0.1", port, act_state(deck.deal(2), []), pool=pool, table=TABLE, seat=SEAT)
+    for _ in range(hands):
+        hand, board = deck.deal(2), []
+        tell({
+            "event": "hand", "hand": [c.short_str() for c in hand],
+            "stacks": {name: 1000 for name in (SEAT,) + OPPONENTS},
+            "small_blind": 10, "big_blind": 20, "num_decks": NUM_DECKS,
+        })
+        act(hand, board)
+        for street, count in ((1, 3), (2, 1), (3, 1)):
+            board = board + deck.deal(count)
+            tell({"event": "board", "street": street, "board": [c.short_str() for c in board]})
+            act(hand, board)
+        end = {"is_end_state": True, "num_decks": NUM_DECKS, "players": {}}
+        notify_bot_tcp("127.0.0.1", port, {"op": "end", "state": end}, pool=pool, table=TABLE, seat=SEAT)
+    subscribed = pool.get("127.0.0.1", port).observing
+    pool.close_all()
+    return times, subscribed
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Act latency of simple_bot with and without observe messages.")
+    ap.add_argument("--hands", type=int, default=40)
+    ap.add_argument("--others-ms", type=float, default=100.0, help="time the other seats take before our turn")
+    args = ap.parse_args()
+
+    for observe in (False, True):
+        with serving() as port:
+            times, subscribed = play(port, args.hands, args.others_ms / 1000, observe)
+        describe(f"observe {'on ' if observe else 'off'} (subscribed: {subscribed})", times)
+
+
+if __name__ == "__main__":
+    main()
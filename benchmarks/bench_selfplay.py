@@ -0,0 +1,76 @@
+"""
+Hands per second when the engine plays against bots in-process (Player(bot=...),
+"local" in config.json) vs the same bots behind TCP, with engine output off.
+
+    python benchmarks/bench_selfplay.py --hands 500 --players 6
+
+Both sides use bots/brainless_bot.py. The TCP bots run as threads in this
+process and the engine uses kept-alive connections.
+"""
+
+import argparse
+import contextlib
+import io
+import pathlib
+import random
+import socket
+import sys
+import threading
+import time
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.append(str(REPO_ROOT))  # so we can import the engine from repo root
+sys.path.append(str(REPO_ROOT / "bots"))
+
+import engine_net
+from board import Deck
+from brainless_bot import PokerBot
+from engine import Player, play_poker_round
+
+
+def tcp_players(count, chips):
+    players = []
+    for i in range(count):
+        bot = PokerBot(name=f"T{i}", host="127.0.0.1", port=0)
+        # brainless_bot binds its own server, find a free port first
+        with contextlib.closing(socket.create_server(("127.0.0.1", 0))) as s:
+            bot.port = s.getsockname()[1]
+        threading.Thread(target=bot.run, daemon=True).start()
+        players.append(Player(name=bot.name, host="127.0.0.1", port=bot.port, chips=chips))
+    time.sleep(0.5)
+    return players
+
+
+def local_players(count, chips):
+    return [Player(name=f"L{i}", chips=chips, bot=PokerBot(name=f"L{i}")) for i in range(count)]
+
+
+def hands_per_second(players, hands, seed=0):
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    for _ in range(hands):
+        for p in players:
+            p.chips = 1000  # keep everyone in, only the speed matters here
+        deck = Deck(1)
+        deck.shuffle(rng)
+        play_poker_round(deck, players, blinds=[5, 10])
+    return hands / (time.perf_counter() - start)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="In-process vs TCP self-play speed.")
+    ap.add_argument("--hands", type=int, default=500)
+    ap.add_argument("--players", type=int, default=6)
+    args = ap.parse_args()
+
+    # engine and bot threads print a lot, keep it out of the report
+    out, sys.stdout = sys.stdout, io.StringIO()
+    local = hands_per_second(local_players(args.players, 1000), args.hands)
+    print(f"in-process: {local:8.0f} hands/s", file=out)
+    tcp = hands_per_second(tcp_players(args.players, 1000), args.hands)
+    print(f"tcp:        {tcp:8.0f} hands/s  ({local / tcp:.1f}x)", file=out)
+    engine_net.POOL.close_all()
+
+
+if __name__ == "__main__":
+    main()
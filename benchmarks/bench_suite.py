@@ -0,0 +1,440 @@
+"""
+Micro-benchmarks for the engine's hot paths, with results saved as JSON so
+runs can be compared over time.
+
+    python benchmarks/bench_suite.py                          # run everything
+    python benchmarks/bench_suite.py -k deck -k netwire       # only matching cases
+    python benchmarks/bench_suite.py --save before.json       # keep the results
+    python benchmarks/bench_suite.py --compare before.json    # run and compare
+    python benchmarks/bench_suite.py --compare before.json after.json
+
+Each case is timed in samples of enough calls to take --sample-time seconds;
+the median and p95 of the per-call time over --repeats samples are reported.
+Compare mode exits with 1 if any case's median got slower than the baseline
+by more than --threshold (relative, default 0.10).
+"""
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import pathlib
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.append(str(REPO_ROOT))  # so we can import the engine from repo root
+
+from board import CallAction, Card, Deck, GameState, RaiseAction, evaluate_hand, hand_strength
+from botstate import BotState
+from engine import Player, play_poker_round
+from eventlog import LOG
+from handhistory import HandHistoryWriter, HandRecord
+from netwire import decode_payload, encode_payload, recv_message, send_message
+from opponents import OpponentStats
+
+# name -> function() that sets the case up and returns the callable to time,
+# or (callable, operations per call)
+CASES = {}
+
+
+def case(name):
+    def register(setup):
+        CASES[name] = setup
+        return setup
+
+    return register
+
+
+def _random_hands(count, size, seed=0):
+    rng = random.Random(seed)
+    deck = Deck(1).cards
+    return [rng.sample(deck, size) for _ in range(count)]
+
+
+class StubBot:
+    """In-process bot that raises once a street from the first seat, else calls."""
+
+    wants_state = True
+
+    def __init__(self, name):
+        self.name = name
+
+    def decide_action(self, state):
+        if state["player_curr_bet"] == 0 and state["players"][self.name]["position"] == 0:
+            return RaiseAction(state["curr_bet"] + state["big_blind"])
+        return CallAction()
+
+    def end_game(self, state):
+        pass
+
+
+def _table(num_players=6, chips=1000):
+    players = [Player(name=f"P{i}", chips=chips, bot=StubBot(f"P{i}")) for i in range(num_players)]
+    for i, p in enumerate(players):
+        p.last_action = [None, CallAction(), RaiseAction(40)][i % 3]
+    return players
+
+
+def _game_state(num_players=6):
+    deck = Deck(1)
+    deck.shuffle(random.Random(0))
+    players = _table(num_players)
+    for p in players:
+        p.hand = deck.deal(2)
+    deck.deal_table(3)
+    gs = GameState(deck=deck, players=players)
+    gs.pot, gs.curr_bet, gs.small_blind, gs.big_blind = 640, 120, 20, 40
+    return gs
+
+
+@case("evaluate_hand_7")
+def _():
+    hands = _random_hands(1000, 7)
+
+    def run():
+        for cards in hands:
+            evaluate_hand(cards)
+
+    return run, len(hands)
+
+
+@case("hand_strength_7")
+def _():
+    hands = _random_hands(1000, 7)
+
+    def run():
+        for cards in hands:
+            hand_strength(cards)
+
+    return run, len(hands)
+
+
+@case("deck_construct_5")
+def _():
+    return lambda: Deck(5)
+
+
+@case("deck_shuffle_5")
+def _():
+    deck = Deck(5)
+    rng = random.Random(0)
+    return lambda: deck.shuffle(rng)
+
+
+@case("deck_reset_verify_5")
+def _():
+    deck = Deck(5)
+
+    def run():
+        deck.reset()
+        deck.verify(6)
+
+    return run
+
+
+@case("deck_deal_hand_6p")
+def _():
+    # one hand's worth of dealing: 6 hole card pairs, burns and the board
+    deck = Deck(1)
+    rng = random.Random(0)
+
+    def run():
+        deck.reset()
+        deck.shuffle(rng)
+        for _ in range(6):
+            deck.deal(2)
+        for n in (3, 1, 1):
+            deck.burn(1)
+            deck.deal_table(n)
+
+    return run
+
+
+@case("gamestate_to_safe_dict_6p")
+def _():
+    return _game_state().to_safe_dict
+
+
+@case("gamestate_to_end_dict_6p")
+def _():
+    gs = _game_state()
+    return lambda: gs.to_end_dict(["P0"], "P1")
+
+
+@case("netwire_encode_decode_json")
+def _():
+    msg = {"op": "act", "state": _game_state().to_safe_dict()}
+    return lambda: decode_payload(encode_payload(msg, "json"))
+
+
+@case("netwire_encode_decode_binary")
+def _():
+    msg = {"op": "act", "state": _game_state().to_safe_dict()}
+    return lambda: decode_payload(encode_payload(msg, "binary"))
+
+
+def _act_state():
+    gs = _game_state()
+    state = gs.to_safe_dict()
+    state["hand"] = [c.to_dict() for c in gs.players[1].hand]
+    state["player_curr_bet"] = 40
+    return state
+
+
+@case("bot_state_json_reparse_6p")
+def _():
+    # what a bot did with a decoded act state before BotState: dump, load, build cards
+    state = _act_state()
+
+    def run():
+        gs = json.loads(json.dumps(state, separators=(",", ":")))
+        hand = [Card(suit=x["suit"], rank=x["rank"]) for x in gs["hand"]]
+        board = [Card(suit=x["suit"], rank=x["rank"]) for x in gs["board"]]
+        return hand, board, max(0, gs["curr_bet"] - gs["player_curr_bet"]), gs["players"]["P1"]["chips"]
+
+    return run
+
+
+@case("bot_state_view_6p")
+def _():
+    state = _act_state()
+
+    def run():
+        gs = BotState(state, "P1")
+        return gs.hand, gs.board, gs.to_call, gs.my_stack
+
+    return run
+
+
+@case("netwire_socket_round_trip")
+def _():
+    # frame out and back over a local socket pair, no bot involved
+    a, b = socket.socketpair()
+    msg = {"op": "act", "state": _game_state().to_safe_dict()}
+
+    def run():
+        send_message(a, msg)
+        send_message(b, recv_message(b))
+        recv_message(a)
+
+    return run
+
+
+@case("play_poker_round_6p")
+def _():
+    players = _table()
+    rng = random.Random(0)
+    devnull = open(os.devnull, "w")
+
+    def run():
+        for p in players:
+            p.chips = 1000
+        deck = Deck(1)
+        deck.shuffle(rng)
+        with contextlib.redirect_stdout(devnull):
+            play_poker_round(deck, players, blinds=[10, 20])
+            LOG.flush()
+
+    return run
+
+
+@case("handhistory_write_hand_6p")
+def _():
+    # record and encode one hand, the file write is batched by the writer
+    players = _table()
+    for p, cards in zip(players, _random_hands(6, 2)):
+        p.hand, p.curr_bet = cards, 0
+    board = _random_hands(1, 5)[0]
+    writer = HandHistoryWriter(os.devnull)
+
+    def run():
+        record = HandRecord(players, [10, 20], 1, tier=1, table=1, table_hand=1)
+        for p in players:
+            record.deal(p)
+        for street in range(4):
+            for p in players:
+                record.action(street, p, "call", 20)
+        record.award(players[0], 480)
+        writer.write(record.finish(board, "showdown"))
+
+    return run
+
+
+@case("opponents_observe_end_6p")
+def _():
+    # profile updates from one showdown end state, as a bot sees it
+    gs = _game_state()
+    gs.deck.deal_table(2)
+    for i, p in enumerate(gs.players):
+        p.moves = [[0, "call", 20, 980], [1, "raise" if i == 0 else "call", 40, 940], [2, "check", 0, 940]]
+    state = gs.to_end_dict(["P0"], "P1")
+    for seat in state["players"].values():
+        seat["hand"] = seat["hand"] or ["2C", "7D"]
+    stats = OpponentStats(me="P1")
+    return lambda: stats.observe(state)
+
+
+"""
+Times one case.
+
+@param run: the callable to time
+@param per_call: operations per call of run
+@param sample_time: seconds each sample should take at least
+@param repeats: samples to take
+
+@return dict of per-operation statistics
+"""
+
+
+def measure(run, per_call=1, sample_time=0.05, repeats=15):
+    run()  # warm up caches and lazy tables
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= sample_time:
+            break
+        loops *= 2 if elapsed < sample_time / 4 else 1 + int(sample_time / max(elapsed, 1e-9))
+
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        samples.append((time.perf_counter() - start) / (loops * per_call))
+    samples.sort()
+    median = statistics.median(samples)
+    return {
+        "median_us": median * 1e6,
+        "p95_us": samples[max(0, int(round(0.95 * len(samples))) - 1)] * 1e6,
+        "min_us": samples[0] * 1e6,
+        "ops_per_sec": 1.0 / median,
+        "loops": loops * per_call,
+        "repeats": repeats,
+    }
+
+
+def run_cases(patterns, sample_time, repeats):
+    results = {}
+    for name, setup in CASES.items():
+        if patterns and not any(p in name for p in patterns):
+            continue
+        run = setup()
+        per_call = 1
+        if isinstance(run, tuple):
+            run, per_call = run
+        results[name] = measure(run, per_call, sample_time, repeats)
+        r = results[name]
+        print(
+            f"{name:30s} median {r['median_us']:10.2f} us   p95 {r['p95_us']:10.2f} us"
+            f"   {r['ops_per_sec']:12.0f} ops/s"
+        )
+    return results
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT, capture_output=True, text=True, timeout=5,
+        )
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def describe_run(results):
+    return {
+        "meta": {
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+"""
+Compares two runs case by case (cases in only one run are skipped).
+
+@param baseline: results dict of the older run
+@param current: results dict of the newer run
+@param threshold: relative slowdown of the median that counts as a regression
+
+@return list of regressed case names
+"""
+
+
+def compare(baseline, current, threshold=0.10):
+    regressions = []
+    print(f"\n{'case':30s} {'baseline us':>12s} {'current us':>12s} {'change':>8s}")
+    for name in current:
+        if name not in baseline:
+            continue
+        old = baseline[name]["median_us"]
+        new = current[name]["median_us"]
+        change = new / old - 1.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"{name:30s} {old:12.2f} {new:12.2f} {change:+8.1%}{flag}")
+    return regressions
+
+
+def _load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Engine micro-benchmarks.")
+    ap.add_argument("-k", dest="patterns", action="append", help="only cases containing this (repeatable)")
+    ap.add_argument("--list", action="store_true", help="list the cases and exit")
+    ap.add_argument("--save", help="write the results to this JSON file")
+    ap.add_argument(
+        "--compare", nargs="+", metavar="JSON",
+        help="baseline results to compare against (a second file is used instead of running)",
+    )
+    ap.add_argument("--threshold", type=float, default=0.10, help="relative slowdown flagged as regression")
+    ap.add_argument("--sample-time", type=float, default=0.05, help="seconds per sample")
+    ap.add_argument("--repeats", type=int, default=15, help="samples per case")
+    args = ap.parse_args()
+
+    if args.list:
+        print("\n".join(CASES))
+        return 0
+
+    if args.compare and len(args.compare) > 2:
+        ap.error("--compare takes a baseline and at most one other results file")
+    if args.compare and len(args.compare) == 2:
+        current = _load(args.compare[1])
+    else:
+        current = run_cases(args.patterns, args.sample_time, args.repeats)
+        if args.save:
+            with open(args.save, "w", encoding="utf-8") as f:
+                json.dump(describe_run(current), f, indent=2)
+            print(f"saved {args.save}")
+
+    if args.compare:
+        regressions = compare(_load(args.compare[0]), current, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+Measures the round-trip latency of an act request to a bot over loopback TCP,
+with a new connection per request vs one kept-alive connection, and the same
+over a unix domain socket (bots on the engine's machine, "unix" in config).
+
+    python benchmarks/bench_transport.py --requests 2000
+
+The bot here is a minimal in-process server that always calls, so the numbers
+are transport cost only.
+"""
+
+import argparse
+import os
+import pathlib
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.append(str(REPO_ROOT))  # so we can import engine_net from repo root
+
+from board import Deck, GameState
+from engine_net import ConnectionPool, ask_bot_tcp
+from netwire import HAS_UNIX, listen, recv_json, send_json
+
+
+class _Seat:
+    def __init__(self, name, chips):
+        self.name = name
+        self.chips = chips
+        self.last_action = None
+
+
+def sample_state(num_players=5):
+    """An act state like the engine sends mid-hand at a full table."""
+    deck = Deck(5)
+    deck.shuffle()
+    gs = GameState(deck=deck, players=[_Seat(f"Bot{i}", 2000 - 37 * i) for i in range(num_players)])
+    deck.deal_table(3)
+    gs.pot, gs.curr_bet, gs.small_blind, gs.big_blind = 640, 120, 20, 40
+    state = gs.to_safe_dict()
+    state["hand"] = [c.to_dict() for c in deck.deal(2)]
+    state["player_curr_bet"] = 40
+    return state
+
+
+class CallBot(threading.Thread):
+    """Answers every act with a call, supports keep-alive connections."""
+
+    def __init__(self, unix=None):
+        super().__init__(daemon=True)
+        # on a unix socket, host is its path and port None, as in engine_net
+        self.host, self.port = (unix, None) if unix else ("127.0.0.1", 0)
+        self.srv = listen(self.host, self.port)
+        if not unix:
+            self.port = self.srv.getsockname()[1]
+        self.connections = 0
+
+    def run(self):
+        while True:
+            conn, _ = self.srv.accept()
+            self.connections += 1
+            threading.Thread(target=self.serve, args=(conn,), daemon=True).start()
+
+    def serve(self, conn):
+        with conn:
+            if conn.family != getattr(socket, "AF_UNIX", None):
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            while True:
+                try:
+                    req = recv_json(conn)
+                except (OSError, ConnectionError):
+                    return
+                if req.get("op") == "hello":
+                    send_json(conn, {"ok": True, "keepalive": True})
+                elif req.get("op") == "act":
+                    send_json(conn, {"move": "call"})
+
+
+def measure(bot, state, n, keepalive):
+    pool = ConnectionPool(keepalive=keepalive)
+    ask_bot_tcp(bot.host, bot.port, state, pool=pool)  # warm up / negotiate
+    times = []
+    for _ in range(n):
+        start = time.perf_counter()
+        ask_bot_tcp(bot.host, bot.port, state, pool=pool)
+        times.append(time.perf_counter() - start)
+    pool.close_all()
+    return times
+
+
+def describe(label, times):
+    times = sorted(times)
+    p50 = statistics.median(times) * 1e6
+    p95 = times[int(len(times) * 0.95) - 1] * 1e6
+    print(f"{label:28s} p50 {p50:8.1f} us   p95 {p95:8.1f} us   {len(times) / sum(times):8.0f} req/s")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Per-action round-trip latency to a bot.")
+    ap.add_argument("--requests", type=int, default=2000)
+    args = ap.parse_args()
+
+    state = sample_state()
+    with tempfile.TemporaryDirectory() as tmp:
+        bots = [("tcp", CallBot())]
+        if HAS_UNIX:
+            bots.append(("unix", CallBot(unix=os.path.join(tmp, "bot.sock"))))
+        for transport, bot in bots:
+            bot.start()
+            before = bot.connections
+            describe(f"{transport}, connection per request", measure(bot, state, args.requests, keepalive=False))
+            per_request = bot.connections - before
+            before = bot.connections
+            describe(f"{transport}, kept-alive connection", measure(bot, state, args.requests, keepalive=True))
+            kept = bot.connections - before
+            print(f"{transport} connections opened: {per_request} vs {kept}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Compares the JSON and binary encodings of netwire on the messages the engine
+sends most: an act request at a 5 player table, an end-of-hand state, and an
+action reply. Reports bytes on the wire and encode/decode time per message,
+then the same for a mid-hand act sent as a delta (game.delta) instead of the
+full state.
+
+    python benchmarks/bench_wire.py
+"""
+
+import argparse
+import copy
+import pathlib
+import sys
+import time
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.append(str(REPO_ROOT))  # so we can import netwire from repo root
+
+from bench_transport import sample_state
+from board import CallAction, FoldAction, RaiseAction
+from netwire import ENCODINGS, DeltaReceiver, DeltaSender, decode_payload, encode_payload
+
+
+def sample_messages(num_players=5):
+    state = sample_state(num_players)
+    seats = list(state["players"].values())
+    seats[0]["last_action"] = RaiseAction(120)
+    seats[1]["last_action"] = CallAction()
+    seats[2]["last_action"] = FoldAction()
+
+    end = dict(state, is_end_state=True, reset_deck=False)
+    end["players"] = {
+        name: dict(seat, winner=i == 0, hand=["AH", "KD"] if i < 2 else [])
+        for i, (name, seat) in enumerate(state["players"].items())
+    }
+    return {
+        "act": {"op": "act", "state": state},
+        "end": {"op": "end", "state": end},
+        "reply": {"move": "raise", "amount": 240},
+    }
+
+
+def next_state(state):
+    """The state one action later: a player raised, pot and bet went up."""
+    state = copy.deepcopy(state)
+    name, seat = next(iter(state["players"].items()))
+    seat["chips"] -= 240
+    seat["last_action"] = RaiseAction(240)
+    state["pot"] += 240
+    state["curr_bet"] = 240
+    return state
+
+
+def per_message_us(fn, arg, min_time=0.5):
+    done = 0
+    start = time.perf_counter()
+    while True:
+        for _ in range(200):
+            fn(arg)
+        done += 200
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / done * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser(description="JSON vs binary wire encoding.")
+    ap.add_argument("--players", type=int, default=5)
+    args = ap.parse_args()
+
+    print(f"{'message':8s} {'encoding':8s} {'bytes':>6s} {'encode us':>10s} {'decode us':>10s}")
+    for label, msg in sample_messages(args.players).items():
+        expected = decode_payload(encode_payload(msg, "json"))
+        for encoding in ENCODINGS:
+            data = encode_payload(msg, encoding)
+            assert decode_payload(data) == expected, f"{encoding} round trip changed {label}"
+            enc = per_message_us(lambda m: encode_payload(m, encoding), msg)
+            dec = per_message_us(decode_payload, data)
+            print(f"{label:8s} {encoding:8s} {len(data):6d} {enc:10.1f} {dec:10.1f}")
+
+    # delta: encode time includes diffing against the last state sent,
+    # decode time includes rebuilding the full state on the bot side
+    before = sample_messages(args.players)["act"]["state"]
+    after = next_state(before)
+    for encoding in ENCODINGS:
+        sender, receiver = DeltaSender(), DeltaReceiver()
+        receiver.receive(decode_payload(encode_payload(sender.message(before), encoding)))
+        data = encode_payload(sender.message(after), encoding)
+        expected = decode_payload(encode_payload(after, "json"))
+        assert receiver.receive(decode_payload(data))["state"] == expected, "delta changed the state"
+
+        def encode(state):
+            sender.baseline = before
+            return encode_payload(sender.message(state), encoding)
+
+        def decode(payload):
+            receiver.seq, receiver.state = 0, expected
+            return receiver.receive(dict(decode_payload(payload), seq=1))
+
+        enc = per_message_us(encode, after)
+        dec = per_message_us(decode, data)
+        print(f"{'delta':8s} {encoding:8s} {len(data):6d} {enc:10.1f} {dec:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
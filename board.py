@@ -1,11 +1,11 @@
 import contextlib
 import copy
 import random
-import socket
 from collections import namedtuple
 from itertools import combinations
 
-from netwire import send_json
+from eventlog import LOG
+from netwire import connect, send_json
 
 # Card and Deck setup
 suits = ["Hearts", "Diamonds", "Clubs", "Spades"]
@@ -31,10 +31,15 @@ RaiseAction = namedtuple("RaiseAction", ["amount"])
 
 """
 Card obj
+There are only 52 Card objects, Card(suit, rank) always returns the same
+instance for the same card. Each card has an integer id (0..51, suit major in
+the same order as suits/ranks) and a 64-bit mask (1 << id) for set operations.
 """
 
 
 class Card:
+    __slots__ = ("suit", "rank", "id", "mask", "_short", "_dict")
+
     SUIT_MAP = {"H": "Hearts", "D": "Diamonds", "C": "Clubs", "S": "Spades"}
 
     RANK_MAP = {
@@ -55,23 +60,31 @@ class Card:
     REVERSE_SUIT_MAP = {v: k for k, v in SUIT_MAP.items()}
     REVERSE_RANK_MAP = {v: k for k, v in RANK_MAP.items()}
 
-    def __init__(self, suit, rank):
-        if suit in self.REVERSE_SUIT_MAP:
-            pass
-        elif suit in self.SUIT_MAP:
-            suit = self.SUIT_MAP[suit]
-        else:
-            raise ValueError(f"Invalid suit name: {suit}")
+    # filled in below the class: every accepted (suit, rank) spelling -> Card
+    _BY_NAME = {}
+    _BY_SHORT = {}
 
-        if rank in self.REVERSE_RANK_MAP:
-            pass
-        elif rank in self.RANK_MAP:
-            rank = self.RANK_MAP[rank]
-        else:
-            raise ValueError(f"Invalid rank name: {rank}")
+    def __new__(cls, suit, rank):
+        card = cls._BY_NAME.get((suit, rank))
+        if card is not None:
+            return card
+        if suit not in cls.REVERSE_SUIT_MAP and suit not in cls.SUIT_MAP:
+            raise ValueError(f"Invalid suit name: {suit}")
+        raise ValueError(f"Invalid rank name: {rank}")
 
-        self.suit = suit
-        self.rank = rank
+    @classmethod
+    def _intern(cls, suit, rank, card_id):
+        card = object.__new__(cls)
+        card.suit = suit
+        card.rank = rank
+        card.id = card_id
+        card.mask = 1 << card_id
+        card._short = f"{cls.REVERSE_RANK_MAP[rank]}{cls.REVERSE_SUIT_MAP[suit]}"
+        for s in (suit, cls.REVERSE_SUIT_MAP[suit]):
+            for r in (rank, cls.REVERSE_RANK_MAP[rank]):
+                cls._BY_NAME[(s, r)] = card
+        cls._BY_SHORT[card._short] = card
+        return card
 
     def __str__(self):
         return f"{self.rank} of {self.suit}"
@@ -82,112 +95,385 @@ class Card:
     def __eq__(self, other):
         if not isinstance(other, Card):
             return False
-        return self.suit == other.suit and self.rank == other.rank
+        return self.id == other.id
 
     def __ne__(self, other):
         result = self.__eq__(other)
         return not result
 
+    def __hash__(self):
+        return self.id
+
+    # keep copies/pickles pointing at the interned instance
+    def __reduce__(self):
+        return (Card.from_id, (self.id,))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
     def short_str(self):
-        return f"{self.REVERSE_RANK_MAP[self.rank]}{self.REVERSE_SUIT_MAP[self.suit]}"
+        return self._short
 
     @classmethod
     def from_string(cls, short_str):
+        card = cls._BY_SHORT.get(short_str)
+        if card is not None:
+            return card
         if len(short_str) != 2:
             raise ValueError("Card string must be exactly 2 characters")
-        rank_char, suit_char = short_str[0], short_str[1]
-        if rank_char in cls.RANK_MAP and suit_char in cls.SUIT_MAP:
-            return cls(cls.SUIT_MAP[suit_char], cls.RANK_MAP[rank_char])
         raise ValueError(f"Invalid card string: {short_str}")
 
+    @staticmethod
+    def from_id(card_id):
+        return CARDS[card_id]
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["suit"], d["rank"])
+
     def to_dict(self):
+        """A new {"suit", "rank"} dict, in-process bots get it as is and may change it."""
         return {"suit": self.suit, "rank": self.rank}
 
 
+CARDS = tuple(
+    Card._intern(suit, rank, s * len(ranks) + r)
+    for s, suit in enumerate(suits)
+    for r, rank in enumerate(ranks)
+)
+
+
+def cards_to_mask(cards):
+    mask = 0
+    for card in cards:
+        mask |= card.mask
+    return mask
+
+
+def mask_to_cards(mask):
+    return [card for card in CARDS if mask & card.mask]
+
+
 """
 Deck obj
 Contains methods for shuffling, dealing, and managing multiple decks.
 
+The deck is one preallocated list of card ids (num_decks * 52) and a deal
+pointer: ids before the pointer are still in the deck, the ones after it
+have been dealt, last dealt first. Dealing moves the pointer, reset moves it
+back, nothing is rebuilt. cards / used_cards are read only: each access
+builds a tuple of the cards, and changing it doesn't change the deck. Take
+a card you have seen out with deck.remove(card) rather than
+deck.cards.remove(card), and use len(deck) for the number of cards left.
+
 * Copy and import this for your bots to keep track of possible cards left. *
 """
 
 
+_CARD_IDS = list(range(52))
+
+
 class Deck:
-    def __init__(self, num_decks: int = 1):
+    def __init__(self, num_decks: int = 1, rng=None):
         self.num_decks = max(1, int(num_decks))
-        self.cards = self._fresh_cards()
-        self.used_cards = []
+        # random.Random used by shuffle (also when verify reshuffles), None for the random module
+        self.rng = rng
+        self.size = 52 * self.num_decks
+        self._order = _CARD_IDS * self.num_decks
+        self._end = self.size
         self.community_cards = []
-
-    def _fresh_cards(self):
-        return [
-            Card(suit, rank)
-            for _ in range(self.num_decks)
-            for suit in suits
-            for rank in ranks
-        ]
-
-    def shuffle(self):
-        self.cards += self.used_cards
-        self.used_cards = []
-        random.shuffle(self.cards) # TODO: custom shuffle
+        # positions in _order of the community cards, same order
+        self._community_pos = []
+
+    def __len__(self):
+        return self._end
+
+    @property
+    def cards(self):
+        """The cards left, the next one dealt last, as a tuple."""
+        order = self._order
+        return tuple(CARDS[order[p]] for p in range(self._end))
+
+    @property
+    def used_cards(self):
+        """Cards dealt to players or burned, in the order they were dealt, as a tuple."""
+        order, table = self._order, self._community_pos
+        return tuple(CARDS[order[p]] for p in range(self.size - 1, self._end - 1, -1) if p not in table)
+
+    def shuffle(self, rng=None):
+        """
+        Puts the used cards back and shuffles, the community cards stay on the
+        table. rng: optional random.Random, defaults to the deck's rng, then
+        the random module.
+        """
+        order = self._order
+        if self._end < self.size:
+            # in the deck the same order as before: cards left, then used as dealt
+            table = [order[p] for p in self._community_pos]
+            table_pos = set(self._community_pos)
+            ids = order[: self._end]
+            ids.extend(order[p] for p in range(self.size - 1, self._end - 1, -1) if p not in table_pos)
+            order[:] = ids + table
+            self._end = self.size - len(table)
+            self._community_pos = list(range(self._end, self.size))
+        # Fisher-Yates over the cards left, in place
+        rand = (rng or self.rng or random).random
+        for i in range(self._end - 1, 0, -1):
+            j = int(rand() * (i + 1))
+            order[i], order[j] = order[j], order[i]
 
     def deal(self, num=1):
         dealt = []
+        order, end = self._order, self._end
         for _ in range(num):
-            if self.cards:
-                card = self.cards.pop()
-                self.used_cards.append(card)
-                dealt.append(card)
+            if end:
+                end -= 1
+                dealt.append(CARDS[order[end]])
             else:
-                print("No more cards in the deck.")
+                LOG.warn("deck_empty", "No more cards in the deck.")
+        self._end = end
         return dealt
 
     def burn(self, num=1):
-        for _ in range(num):
-            if self.cards:
-                card = self.cards.pop()
-                self.used_cards.append(card)
-            else:
-                print("No more cards in the deck.")
-                return False
+        if num > self._end:
+            self._end = 0
+            LOG.warn("deck_empty", "No more cards in the deck.")
+            return False
+        self._end -= num
         return True
 
     def deal_table(self, num=1):
-        dealt = []
+        order, end = self._order, self._end
         for _ in range(num):
-            if self.cards:
-                card = self.cards.pop()
-                dealt.append(card)
+            if end:
+                end -= 1
+                self.community_cards.append(CARDS[order[end]])
+                self._community_pos.append(end)
             else:
-                print("No more cards in the deck.")
-        self.community_cards += dealt
-        return self.community_cards
+                LOG.warn("deck_empty", "No more cards in the deck.")
+        self._end = end
         return self.community_cards
 
+    def remove(self, card):
+        """
+        Takes a known card (e.g. seen at the table) out of the cards left, it
+        counts as used.
+
+        @return False if no copy of it is left in the deck
+        """
+        order, end = self._order, self._end
+        for p in range(end):
+            if order[p] == card.id:
+                end -= 1
+                order[p], order[end] = order[end], order[p]
+                self._end = end
+                return True
+        return False
+
     def show_table(self):
         return [str(card) for card in self.community_cards]
 
+    def clear_table(self):
+        """The community cards become used cards, for the next hand from the same shoe."""
+        self.community_cards = []
+        self._community_pos = []
+
     def reset(self):
-        self.cards = self._fresh_cards()
-        self.used_cards = []
+        """Every card back in the deck, in the order of the last shuffle."""
+        self._end = self.size
         self.community_cards = []
-    
+        self._community_pos = []
+
+    def _consistent(self):
+        return 0 <= self._end <= self.size and len(self.community_cards) == len(self._community_pos)
+
+    def needs_reset(self, num_players):
+        """True if another hand for num_players might run out of cards, nothing is changed."""
+        return not self._consistent() or self._end < num_players * 2 + 5 + 3  # 2 per player + 5 community + 3 burn
+
     # check if deck needs resetting
     def verify(self, num_players):
-        total_cards = 52 * self.num_decks
-        if len(self.cards) + len(self.used_cards) + len(self.community_cards) != total_cards:
-            print("Deck inconsistency detected. Resetting deck.")
+        if not self._consistent():
+            LOG.warn("deck_reset", "Deck inconsistency detected. Resetting deck.")
             self.reset()
             self.shuffle()
             return True
-        if len(self.cards) < num_players * 2 + 5 + 3:  # 2 per player + 5 community + 3 burn
-            print("Deck low on cards. Resetting deck.")
+        if self.needs_reset(num_players):
+            LOG.info("deck_reset", "Deck low on cards. Resetting deck.")
             self.reset()
             self.shuffle()
             return True
         return False
-        
+
+
+"""
+Hand strength encoding.
+
+A hand's strength is a single int: the category in the high bits followed by
+five 4-bit kicker ranks, left aligned. Comparing two strengths with < / > / ==
+gives the same ordering as comparing the (category, kickers) scores returned
+by evaluate_hand, so showdowns only need integer comparisons.
+"""
+
+STRENGTH_CATEGORY_SHIFT = 20
+# number of kicker ranks evaluate_hand reports for each category
+KICKER_COUNTS = (5, 4, 3, 3, 1, 5, 2, 2, 1)
+
+# counts of each rank are packed into 4-bit fields (index 0 is rank 2),
+# indexed by Card.id
+_CARD_RANK_KEY = [1 << (4 * (card.id % 13)) for card in CARDS]
+_STRAIGHT_MASKS = [(0b11111 << (high - 4), high + 2) for high in range(12, 3, -1)]
+_STRAIGHT_MASKS.append(((1 << 12) | 0b1111, 5))  # A-2-3-4-5
+
+# rank-count key -> strength, filled the first time each pattern is seen
+_RANK_TABLE = {}
+_FLUSH_TABLE = {}
+
+
+def score_to_strength(score):
+    category, kickers = score
+    strength = category
+    for i in range(5):
+        strength = (strength << 4) | (kickers[i] if i < len(kickers) else 0)
+    return strength
+
+
+def strength_to_score(strength):
+    category = strength >> STRENGTH_CATEGORY_SHIFT
+    kickers = [
+        (strength >> (16 - 4 * i)) & 0xF for i in range(KICKER_COUNTS[category])
+    ]
+    return category, kickers
+
+
+def _straight_high(mask):
+    for straight, high in _STRAIGHT_MASKS:
+        if mask & straight == straight:
+            return high
+    return 0
+
+
+def _top_ranks(counts, n, exclude=()):
+    """Highest n ranks (2..14), repeating a rank once per copy held."""
+    top = []
+    for i in range(12, -1, -1):
+        if i + 2 in exclude:
+            continue
+        for _ in range(counts[i]):
+            if len(top) == n:
+                return top
+            top.append(i + 2)
+    return top
+
+
+def _key_counts(key):
+    return [(key >> (4 * i)) & 0xF for i in range(13)]
+
+
+def _rank_strength(key):
+    """Best non-flush hand for a rank-count key (see _CARD_RANK_KEY)."""
+    counts = _key_counts(key)
+    present = [i + 2 for i in range(12, -1, -1) if counts[i]]
+    quads = [r for r in present if counts[r - 2] >= 4]
+    trips = [r for r in present if counts[r - 2] >= 3]
+    pairs = [r for r in present if counts[r - 2] >= 2]
+
+    # with several decks a rank can show up 5+ times; if it is the only rank
+    # there is no kicker / second group and the hand falls through to high card
+    if quads and len(present) > 1:
+        return score_to_strength((7, [quads[0], _top_ranks(counts, 1, (quads[0],))[0]]))
+    if trips:
+        others = [r for r in pairs if r != trips[0]]
+        if others:
+            return score_to_strength((6, [trips[0], others[0]]))
+    high = _straight_high(sum(1 << (r - 2) for r in present))
+    if high:
+        return score_to_strength((4, [high]))
+    if trips and len(present) >= 3:
+        kickers = [r for r in present if r != trips[0]][:2]
+        return score_to_strength((3, [trips[0]] + kickers))
+    if len(pairs) >= 2:
+        kicker = _top_ranks(counts, 1, tuple(pairs[:2]))
+        return score_to_strength((2, pairs[:2] + kicker))
+    if pairs and len(present) >= 4:
+        kickers = [r for r in present if r != pairs[0]][:3]
+        return score_to_strength((1, [pairs[0]] + kickers))
+    return score_to_strength((0, _top_ranks(counts, 5)))
+
+
+def _flush_strength(key):
+    """Best flush / straight flush from the rank-count key of one suit."""
+    counts = _key_counts(key)
+    high = _straight_high(sum(1 << i for i in range(13) if counts[i]))
+    if high:
+        return score_to_strength((8, [high]))
+    return score_to_strength((5, _top_ranks(counts, 5)))
+
+
+"""
+Scores a hand with table lookups instead of trying every 5 card combination.
+
+@param cards: a list of 5 or more cards, is both hand and community cards
+
+@return strength: int, higher is better (see score_to_strength)
+"""
+
+
+def hand_strength(cards):
+    key = 0
+    suit_keys = [0, 0, 0, 0]
+    suit_counts = [0, 0, 0, 0]
+    for card in cards:
+        card_id = card.id
+        k = _CARD_RANK_KEY[card_id]
+        s = card_id // 13
+        key += k
+        suit_keys[s] += k
+        suit_counts[s] += 1
+
+    strength = _RANK_TABLE.get(key)
+    if strength is None:
+        strength = _RANK_TABLE[key] = _rank_strength(key)
+    for s in range(4):
+        if suit_counts[s] >= 5:
+            flush = _FLUSH_TABLE.get(suit_keys[s])
+            if flush is None:
+                flush = _FLUSH_TABLE[suit_keys[s]] = _flush_strength(suit_keys[s])
+            if flush > strength:
+                strength = flush
+    return strength
+
+
+def _best_five(cards, category, kickers):
+    """Picks the 5 cards that make up a score, in the order they were given."""
+    if category in (4, 8):
+        high = kickers[0]
+        wanted = [high - i for i in range(5)] if high > 5 else [5, 4, 3, 2, 14]
+    elif category in (0, 5):
+        wanted = list(kickers)
+    else:
+        sizes = {7: (4, 1), 6: (3, 2), 3: (3, 1, 1), 2: (2, 2, 1), 1: (2, 1, 1, 1)}
+        wanted = [r for r, n in zip(kickers, sizes[category]) for _ in range(n)]
+
+    pool = list(enumerate(cards))
+    if category in (5, 8):
+        suit_counts = [0, 0, 0, 0]
+        for card in cards:
+            suit_counts[card.id // 13] += 1
+        flush_suit = suit_counts.index(max(suit_counts))
+        pool = [(i, c) for i, c in pool if c.id // 13 == flush_suit]
+
+    picked = []
+    for rank in wanted:
+        for j, (i, card) in enumerate(pool):
+            if card.id % 13 + 2 == rank:
+                picked.append(i)
+                pool.pop(j)
+                break
+    return tuple(cards[i] for i in sorted(picked))
 
 
 """
@@ -196,12 +482,25 @@ only works with a set of more than 5 cards
 
 @param cards: a list of cards, is both hand and community cards
 
-@return best_score: int of score
-@return best_hand: list containing ranks of best hand
+@return best_score: tuple of (category, kickers), see hand_score for categories
+@return best_hand: tuple containing the 5 cards of best hand
 """
 
 
 def evaluate_hand(cards):
+    if len(cards) < 5:
+        return (0, []), None
+    score = strength_to_score(hand_strength(cards))
+    return score, _best_five(cards, *score)
+
+
+"""
+Reference evaluator that tries all 5 card combinations.
+Kept to check the table evaluator against, use evaluate_hand instead.
+"""
+
+
+def _evaluate_hand_combinations(cards):
     def card_rank(card):
         return RANK_ORDER[card.rank]
 
@@ -260,22 +559,25 @@ def evaluate_hand(cards):
     return best_score, best_hand
 
 """
-Helper to terminate a bot process via TCP
+Helper to terminate a bot process via TCP (or its unix socket, port None)
 """
 
 
 def _terminate_bot(host, port, timeout=1.0):
     """Politely tell a TCP bot to exit; ignore if it’s already gone."""
     try:
-        with contextlib.closing(
-            socket.create_connection((host, port), timeout=timeout)
-        ) as s:
+        with contextlib.closing(connect(host, port, timeout=timeout)) as s:
             pass
             send_json(s, {"op": "terminate"})
     except OSError:
         pass
 
 
+def _action_to_state(action):
+    # actions are namedtuples, send them as the list JSON would make of them
+    return None if action is None else list(action)
+
+
 """
 Game state obj
 """
@@ -289,6 +591,10 @@ class GameState:
         self.curr_bet = 0
         self.small_blind = 0
         self.big_blind = 0
+        # engine side: handhistory.HandRecord of the hand, when recording
+        self.history = None
+        # engine side: engine.HandObservers of the hand, when bots observe it
+        self.observers = None
 
     def to_safe_dict(self):
         d = {}
@@ -304,7 +610,11 @@ class GameState:
         for player in self.players:
             pd = {}
             pd["chips"] = player.chips
-            pd["last_action"] = player.last_action
+            pd["last_action"] = _action_to_state(player.last_action)
+            moves = getattr(player, "moves", None)
+            pd["last_move"] = moves[-1][1] if moves else None
+            # False once they fold, and for players sitting the hand out
+            pd["in_hand"] = getattr(player, "in_hand", True)
             pd["position"] = i
             i += 1
             players_dict[player.name] = pd
@@ -331,7 +641,8 @@ class GameState:
                 pd["winner"] = False
 
             pd["chips"] = player.chips
-            pd["last_action"] = player.last_action
+            pd["last_action"] = _action_to_state(player.last_action)
+            pd["moves"] = [list(m) for m in getattr(player, "moves", ())]
             pd["position"] = i
             i += 1
             if player.in_hand or curr_player == player.name:
@@ -358,16 +669,17 @@ class GameState:
         self.big_blind = blinds[1]
         blind_count = 0
         for p in self.players:
+            p.moves = []
             # First check if player can even afford blinds
             if p.chips < blinds[1]:  # Can't afford BB
-                print(f"{p.name} can't afford big blind ({p.chips} < {blinds[1]}), sitting out")
+                LOG.info("sit_out", "%s can't afford big blind (%d < %d), sitting out", p.name, p.chips, blinds[1])
                 p.in_hand = False
                 #TODO: should bot be terminated? removed from players
                 continue
             
             # Now pay blinds
             if blind_count == 1:  # Big blind
-                print(f"{p.name} pays big blind of {blinds[1]}")
+                LOG.debug("blind", "%s pays big blind of %d", p.name, blinds[1])
                 p.chips -= blinds[1]
                 self.pot += blinds[1]
                 p.curr_bet = blinds[1]
@@ -376,7 +688,7 @@ class GameState:
                 p.in_hand = True
             elif blind_count == 0:  # Small blind
                 if p.chips >= blinds[0]:
-                    print(f"{p.name} pays small blind of {blinds[0]}")
+                    LOG.debug("blind", "%s pays small blind of %d", p.name, blinds[0])
                     p.chips -= blinds[0]
                     self.pot += blinds[0]
                     p.curr_bet = blinds[0]
@@ -384,7 +696,7 @@ class GameState:
                     blind_count += 1
                     p.in_hand = True
                 else:
-                    print(f"{p.name} can't afford small blind ({p.chips} < {blinds[0]}), sitting out")
+                    LOG.info("sit_out", "%s can't afford small blind (%d < %d), sitting out", p.name, p.chips, blinds[0])
                     p.in_hand = False
             else:  # Not in blind
                 p.in_hand = True
@@ -392,7 +704,7 @@ class GameState:
         while i < len(self.players):
             p = self.players[i]
             if p.chips <= 0:
-                print(f"Eliminated player {p.name}")
+                LOG.info("eliminated", "Eliminated player %s", p.name)
                 # lets not terminate bots for now
                 #_terminate_bot(p.host, p.port, timeout=1.0)
                 self.players.pop(i)
@@ -404,13 +716,15 @@ class GameState:
 
 
 """
-Prints a list of cards as ascii art poker cards.
+Draws a list of cards as ascii art poker cards.
 
 @param cards: a list of card objs
+
+@return the drawing, 7 lines
 """
 
 
-def print_cards_as_ascii(cards):
+def cards_as_ascii(cards):
     suit_map = {"H": "♡", "S": "♤", "C": "♧", "D": "♢"}
 
     rank_suits = []
@@ -423,24 +737,35 @@ def print_cards_as_ascii(cards):
         suit = suit_map[card[1]]
         rank_suits.append((rank, suit))
 
+    lines = []
     for i in range(7):
-        for j in range(len(rank_suits)):
-            rank, suit = rank_suits[j]
-            string = "   "
-
+        row = []
+        for rank, suit in rank_suits:
             if rank == "10":
                 string = "10" + suit
             else:
                 string = rank + suit + " "
 
             if i == 0:
-                print(f"╔═════════╗", end="  ")
+                row.append("╔═════════╗  ")
             elif i == 1:
-                print(f"║{string}      ║", end="  ")
+                row.append(f"║{string}      ║  ")
             elif i == 5:
-                print(f"║      {string}║", end="  ")
+                row.append(f"║      {string}║  ")
             elif i == 6:
-                print(f"╚═════════╝", end="  ")
+                row.append("╚═════════╝  ")
             else:
-                print(f"║         ║", end="  ")
-        print()
+                row.append("║         ║  ")
+        lines.append("".join(row))
+    return "\n".join(lines)
+
+
+"""
+Prints a list of cards as ascii art poker cards (through the event log).
+
+@param cards: a list of card objs
+"""
+
+
+def print_cards_as_ascii(cards):
+    LOG.info("cards", "%s", cards_as_ascii(cards))
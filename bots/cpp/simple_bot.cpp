@@ -7,6 +7,7 @@
 // Compile and run:
 // g++ -std=gnu++17 -O2 -pthread simple_bot.cpp -o simple_bot
 // ./simple_bot --host 0.0.0.0 --port 5001 --name Simple
+// ./simple_bot --unix /tmp/simple.sock --name Simple   (bot on the engine's machine)
 
 #include <algorithm>
 #include <array>
@@ -22,6 +23,7 @@
 #include <stdexcept>
 #include <string>
 #include <sys/socket.h>
+#include <sys/un.h>
 #include <unistd.h>
 #include <vector>
 #include <thread>
@@ -250,6 +252,7 @@ struct Bot {
     std::string name = "MyBot";
     std::string host = "127.0.0.1";
     int port = 5001;
+    std::string unix_path;  // listen on this unix socket instead of host/port
     bool running = true;
 
     static int to_rank(const std::string& r) {
@@ -367,17 +370,32 @@ struct Bot {
     }
 
     int serve() {
-        int fd = ::socket(AF_INET, SOCK_STREAM, 0);
+        int fd = ::socket(unix_path.empty() ? AF_INET : AF_UNIX, SOCK_STREAM, 0);
         if (fd < 0) { perror("socket"); return 1; }
 
-        int yes = 1;
-        setsockopt(fd, SOL_SOCKET, SO_REUSEADDR, &yes, sizeof(yes));
-
-        sockaddr_in addr{};
-        addr.sin_family = AF_INET;
-        addr.sin_port = htons((uint16_t)port);
-        addr.sin_addr.s_addr = INADDR_ANY; // bind all (host flag is for announcement only)
-        if (::bind(fd, (sockaddr*)&addr, sizeof(addr)) < 0) {
+        int bound;
+        if (unix_path.empty()) {
+            int yes = 1;
+            setsockopt(fd, SOL_SOCKET, SO_REUSEADDR, &yes, sizeof(yes));
+
+            sockaddr_in addr{};
+            addr.sin_family = AF_INET;
+            addr.sin_port = htons((uint16_t)port);
+            addr.sin_addr.s_addr = INADDR_ANY; // bind all (host flag is for announcement only)
+            bound = ::bind(fd, (sockaddr*)&addr, sizeof(addr));
+        } else {
+            sockaddr_un addr{};
+            addr.sun_family = AF_UNIX;
+            if (unix_path.size() >= sizeof(addr.sun_path)) {
+                std::cerr << "unix socket path too long: " << unix_path << "\n";
+                ::close(fd);
+                return 1;
+            }
+            std::strcpy(addr.sun_path, unix_path.c_str());
+            ::unlink(unix_path.c_str()); // left behind by an earlier run
+            bound = ::bind(fd, (sockaddr*)&addr, sizeof(addr));
+        }
+        if (bound < 0) {
             perror("bind");
             ::close(fd);
             return 1;
@@ -387,11 +405,14 @@ struct Bot {
             ::close(fd);
             return 1;
         }
-        std::cerr << "[" << name << "] Listening on " << host << ":" << port << " ...\n";
+        if (unix_path.empty())
+            std::cerr << "[" << name << "] Listening on " << host << ":" << port << " ...\n";
+        else
+            std::cerr << "[" << name << "] Listening on unix:" << unix_path << " ...\n";
 
         // main accept loop
         while (running) {
-            sockaddr_in cli{};
+            sockaddr_storage cli{};
             socklen_t clilen = sizeof(cli);
             int cfd = ::accept(fd, (sockaddr*)&cli, &clilen);
             if (cfd < 0) {
@@ -432,6 +453,7 @@ struct Bot {
         }
 
         ::close(fd);
+        if (!unix_path.empty()) ::unlink(unix_path.c_str());
         return 0;
     }
 };
@@ -440,7 +462,7 @@ struct Bot {
 
 static void print_help(const char* prog){
     std::cerr <<
-    "Usage: " << prog << " [--host HOST] [--port PORT] [--name NAME]\n"
+    "Usage: " << prog << " [--host HOST] [--port PORT] [--unix PATH] [--name NAME]\n"
     "Defaults: --host 127.0.0.1  --port 5001  --name Simple\n";
 }
 
@@ -454,6 +476,7 @@ int main(int argc, char** argv) {
         };
         if (a=="--host") bot.host = next();
         else if (a=="--port") bot.port = std::stoi(next());
+        else if (a=="--unix") bot.unix_path = next();
         else if (a=="--name") bot.name = next();
         else if (a=="-h" || a=="--help") { print_help(argv[0]); return 0; }
         else { std::cerr << "Unknown arg: " << a << "\n"; print_help(argv[0]); return 2; }
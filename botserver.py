@@ -0,0 +1,393 @@
+import contextlib
+import os
+import queue
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from board import FoldAction
+from botstate import for_bot
+from engine_net import action_to_wire
+from metrics import Histogram
+from netwire import (
+    DeltaReceiver,
+    FrameReader,
+    address_str,
+    choose_encoding,
+    encode_payload,
+    is_unix,
+    listen,
+    send_frame_nowait,
+)
+
+"""
+Event driven server for Python bots, the part of bots/ that "shouldn't be
+messed with" in one place:
+
+    BotServer(bot, host, port).serve_forever()
+    BotServer(bot, "/tmp/mybot.sock", None).serve_forever()   # unix socket
+
+One selector loop accepts connections and reads and writes every one of them
+without blocking, so kept-alive connections, concurrent tables and the
+engine's one-off connections are all served at once, with no accept timeout
+or sleep in the way. Hello replies, encodings and delta states are handled on
+the loop; decide_action/end_game run on a small thread pool, so a slow
+decision never holds up reading the other connections. Messages on one
+connection are handled in order, one at a time; on a multiplexed connection
+(see engine_net.py) that is per table and seat, and replies go back with
+the request's id as soon as they are ready. With the default single worker
+the bot's methods are never called concurrently; more workers let decisions
+for different tables run in parallel, if the bot is thread safe.
+
+The bot gets the state as a botstate.BotState if it sets `wants_state`, as a
+JSON string otherwise, like before, and its action goes back as
+{"move": ..., "amount": ...}. A bot with an on_observe(event) method
+subscribes to observe messages (see HandObservers in engine.py) and gets
+each one, in order with the acts and ends of its table, as a BotState or a
+dict. The server times every message: queue
+(waiting for a worker), decide (inside the bot) and total (frame received to
+reply written), per op, and prints a report every `report_every` seconds and
+when it stops.
+"""
+
+_OPS = ("act", "end", "observe")
+
+
+def _tagged(reply, req):
+    # a reply on a multiplexed connection carries the id of its request
+    if isinstance(req, dict) and "id" in req:
+        reply = dict(reply, id=req["id"])
+    return reply
+
+
+class _Connection:
+    __slots__ = (
+        "sock", "reader", "outbuf", "lock", "writing", "keepalive", "encoding", "delta", "mux", "deltas",
+        "pending", "busy", "close_after",
+    )
+
+    def __init__(self, sock, max_bytes):
+        self.sock = sock
+        self.reader = FrameReader(sock, max_bytes)
+        self.outbuf = bytearray()
+        # workers write replies themselves, the loop only what didn't fit
+        self.lock = threading.Lock()
+        self.writing = False
+        self.keepalive = False
+        self.encoding = "json"
+        self.delta = False
+        # multiplexed: messages name their (table, seat) session, otherwise
+        # there is only the session None
+        self.mux = False
+        # session -> DeltaReceiver
+        self.deltas = {}
+        # session -> (request, time received) waiting for the one before to finish
+        self.pending = {}
+        # sessions with a message on a worker
+        self.busy = set()
+        self.close_after = False
+
+
+class BotServer:
+    def __init__(self, bot, host="0.0.0.0", port=5001, workers=1, report_every=0, max_bytes=1 << 20):
+        self.bot = bot
+        self.name = getattr(bot, "name", "bot")
+        # port None: host is the path of a unix socket to listen on
+        self.host = host
+        self.port = int(port) if port is not None else None
+        self.workers = max(1, int(workers))
+        self.report_every = report_every
+        self.max_bytes = max_bytes
+        self.running = False
+        # set once listening; port is then the real one, also with port 0
+        self.ready = threading.Event()
+        # op -> {"queue"|"decide"|"total": Histogram}
+        self.latency = {op: {k: Histogram() for k in ("queue", "decide", "total")} for op in _OPS}
+        self._selector = None
+        self._pool = None
+        self._done = queue.Queue()
+        self._wake_r, self._wake_w = socket.socketpair()
+
+    def serve_forever(self):
+        """Serves until a terminate message or stop()."""
+        self._selector = selectors.DefaultSelector()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"{self.name}-worker")
+        self._wake_r.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+        unix = is_unix(self.host, self.port)
+        with listen(self.host, self.port) as srv:
+            srv.setblocking(False)
+            self._selector.register(srv, selectors.EVENT_READ, srv)
+            if not unix:
+                self.port = srv.getsockname()[1]
+            print(f"[{self.name}] Listening on {address_str(self.host, self.port)} ...")
+            self.running = True
+            self.ready.set()
+            last_report = time.monotonic()
+            try:
+                while self.running:
+                    for key, mask in self._selector.select(self.report_every or None):
+                        if key.data is None:
+                            self._finish_work()
+                        elif key.data is srv:
+                            self._accept(srv)
+                        else:
+                            if mask & selectors.EVENT_WRITE:
+                                self._write(key.data)
+                            if mask & selectors.EVENT_READ:
+                                self._read(key.data)
+                    if self.report_every and time.monotonic() - last_report >= self.report_every:
+                        print(self.report())
+                        last_report = time.monotonic()
+            finally:
+                self.running = False
+                self._pool.shutdown(wait=True)
+                self._finish_work()
+                for key in list(self._selector.get_map().values()):
+                    if isinstance(key.data, _Connection):
+                        self._close(key.data, flush=True)
+                self._selector.close()
+                if unix:
+                    with contextlib.suppress(OSError):
+                        os.unlink(self.host)
+                print(self.report())
+
+    def stop(self):
+        """Stops serve_forever, from any thread."""
+        self.running = False
+        self._wake()
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            pass
+
+    def _accept(self, srv):
+        while True:
+            try:
+                sock, _ = srv.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            sock.setblocking(False)
+            if sock.family in (socket.AF_INET, socket.AF_INET6):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn = _Connection(sock, self.max_bytes)
+            self._selector.register(sock, selectors.EVENT_READ, conn)
+
+    def _read(self, conn):
+        try:
+            frames = conn.reader.recv_ready()
+        except (OSError, ValueError):
+            self._close(conn)  # closed, or a bad frame
+            return
+        received = time.perf_counter()
+        for req in frames:
+            self._message(conn, req, received)
+
+    def _message(self, conn, req, received):
+        if not conn.keepalive and not conn.close_after:
+            if isinstance(req, dict) and req.get("op") == "hello" and req.get("keepalive"):
+                # the engine wants to send everything over this one connection,
+                # in one of the encodings it lists, maybe only what changed
+                conn.keepalive = True
+                conn.delta = bool(req.get("delta"))
+                conn.mux = bool(req.get("mux"))
+                # observe messages only for bots that do something with them
+                observe = bool(req.get("observe")) and hasattr(self.bot, "on_observe")
+                encoding = choose_encoding(req.get("encodings"))
+                self._reply(
+                    conn,
+                    {
+                        "ok": True, "keepalive": True, "encoding": encoding, "delta": conn.delta, "mux": conn.mux,
+                        "observe": observe,
+                    },
+                )
+                self._write(conn)
+                conn.encoding = encoding
+                return
+            # one message, one reply, then the engine closes
+            conn.close_after = True
+        session = (req.get("table"), req.get("seat")) if conn.mux and isinstance(req, dict) else None
+        if conn.delta:
+            receiver = conn.deltas.get(session)
+            if receiver is None:
+                receiver = conn.deltas[session] = DeltaReceiver()
+            full = receiver.receive(req)  # rebuilds the full state
+            if full is None:
+                # missed a message, ask for the full state
+                self._reply(conn, _tagged({"resync": True}, req))
+                self._write(conn)
+                return
+            req = full
+        pending = conn.pending.get(session)
+        if pending is None:
+            pending = conn.pending[session] = deque()
+        pending.append((req, received))
+        self._dispatch(conn, session)
+
+    def _dispatch(self, conn, session):
+        pending = conn.pending.get(session)
+        if session in conn.busy or not pending or not self.running:
+            # stopping: the pool is (being) shut down, what's queued is dropped
+            return
+        conn.busy.add(session)
+        req, received = pending.popleft()
+        if not pending:
+            del conn.pending[session]
+        self._pool.submit(self._work, conn, session, req, received)
+
+    def _work(self, conn, session, req, received):
+        # on a worker thread: the bot, the reply and the done queue, the loop does the rest
+        start = time.perf_counter()
+        try:
+            reply = self.handle(req)
+        except Exception as e:
+            print(f"[{self.name}] unexpected error handling request: {e}")
+            # best effort: a fold so the engine can continue
+            reply = action_to_wire(FoldAction())
+        end = time.perf_counter()
+        if reply is not None:
+            self._reply(conn, _tagged(reply, req))
+        self._done.put((conn, session, req, received, start, end, time.perf_counter()))
+        self._wake()
+
+    def _finish_work(self):
+        try:
+            while True:
+                self._wake_r.recv(4096)
+        except OSError:
+            pass
+        while True:
+            try:
+                conn, session, req, received, start, end, sent = self._done.get_nowait()
+            except queue.Empty:
+                return
+            op = req.get("op") if isinstance(req, dict) else None
+            if op in self.latency:
+                hists = self.latency[op]
+                hists["queue"].observe(start - received)
+                hists["decide"].observe(end - start)
+                hists["total"].observe(sent - received)
+            conn.busy.discard(session)
+            if op == "terminate":
+                self.running = False
+            self._dispatch(conn, session)
+            self._write(conn)
+
+    """
+    Handles one message, on a worker thread.
+
+    @param req: the decoded message, with the full state
+    @return the reply, or None for messages that don't get one
+    """
+
+    def handle(self, req):
+        bot = self.bot
+        op = req.get("op")
+        if op == "terminate":
+            print(f"[{self.name}] Terminating on request...")
+            return {"ok": True}
+
+        table, seat = req.get("table"), req.get("seat")
+        if op == "observe":
+            try:
+                bot.on_observe(for_bot(bot, req, seat=seat))
+            except Exception as e:
+                print(f"[{self.name}] error in on_observe: {e}")
+            return None
+
+        # end of round (or start of a brand new game)
+        if op == "end":
+            try:
+                bot.end_game(for_bot(bot, req.get("state", {}), True, table, seat))
+            except Exception as e:
+                print(f"[{self.name}] error in end_game: {e}")
+            return None
+
+        if op != "act":
+            if "state" in req or not req:
+                return {"error": "unknown op"}
+            req = {"state": req}  # treat the entire object as the state
+        try:
+            action = bot.decide_action(for_bot(bot, req.get("state", {}), True, table, seat))
+        except Exception as e:
+            # don't let a bot exception kill the connection/process
+            print(f"[{self.name}] decide_action raised: {e}")
+            action = FoldAction()
+        bot.action_count = getattr(bot, "action_count", 0) + 1
+        return action_to_wire(action)
+
+    def _reply(self, conn, obj):
+        """Queues a message and sends as much of it as the socket takes, from any thread."""
+        data = encode_payload(obj, conn.encoding)
+        with conn.lock:
+            if conn.outbuf or conn.sock.fileno() < 0:
+                conn.outbuf += len(data).to_bytes(4, "big")
+                conn.outbuf += data
+                return
+            try:
+                conn.outbuf += send_frame_nowait(conn.sock, data)
+            except OSError:
+                pass  # the loop sees the connection close
+
+    def _send_locked(self, conn):
+        if not conn.outbuf or conn.sock.fileno() < 0:
+            return True
+        try:
+            sent = conn.sock.send(conn.outbuf)
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except OSError:
+            return False
+        del conn.outbuf[:sent]
+        return True
+
+    def _write(self, conn):
+        # on the loop: sends what's left, and waits for the socket when it is full
+        if conn.sock.fileno() < 0:
+            return
+        with conn.lock:
+            ok = self._send_locked(conn)
+            pending = bool(conn.outbuf)
+        if not ok:
+            self._close(conn)
+            return
+        if pending != conn.writing:
+            conn.writing = pending
+            events = selectors.EVENT_READ | (selectors.EVENT_WRITE if pending else 0)
+            self._selector.modify(conn.sock, events, conn)
+        if conn.close_after and not conn.busy and not conn.pending and not pending:
+            self._close(conn)
+
+    def _close(self, conn, flush=False):
+        if conn.sock.fileno() < 0:
+            return
+        if flush and conn.outbuf:
+            try:
+                conn.sock.setblocking(True)
+                conn.sock.settimeout(1.0)
+                conn.sock.sendall(conn.outbuf)
+            except OSError:
+                pass
+        self._selector.unregister(conn.sock)
+        conn.sock.close()
+
+    def report(self):
+        lines = [f"[{self.name}] request latency, ms  (count, then mean / p95 / max)"]
+        for op, hists in self.latency.items():
+            if not hists["total"].total:
+                continue
+            parts = [f"{op:>4} {hists['total'].total:7d}"]
+            for kind in ("queue", "decide", "total"):
+                h = hists[kind]
+                parts.append(
+                    f"{kind} {h.sum / h.total * 1000:.2f} / {h.quantile(0.95) * 1000:.2f} / {h.max * 1000:.2f}"
+                )
+            lines.append("  ".join(parts))
+        return "\n".join(lines)
@@ -0,0 +1,175 @@
+import json
+from functools import cached_property
+
+from board import Card
+
+"""
+Typed, lazy view of the state the engine sends a bot.
+
+The bot server used to decode each message, json.dumps the state again and
+hand the string to decide_action, which json.loads it and builds Card objects
+one dict at a time. BotState wraps the decoded dict instead: nothing is
+serialized or parsed again, and each accessor is computed on first use only
+(cards are the interned Card objects from board.py):
+
+    class PokerBot:
+        wants_state = True                  # decide_action/end_game get a BotState
+
+        def decide_action(self, state):
+            if state.to_call == 0 and state.hand[0].rank == state.hand[1].rank: ...
+
+A BotState is also the state dict itself (a shallow copy of its top level,
+the nested players/cards are shared, treat them as read only), so code that
+does state.get("pot"), state["players"], isinstance(state, dict) or
+json.dumps(state) keeps working. Bots without `wants_state` keep getting what
+they got before through for_bot(): a JSON string, from botserver.py and
+in-process alike.
+"""
+
+
+def _cards(items):
+    return [Card.from_string(c) if isinstance(c, str) else Card.from_dict(c) for c in items]
+
+
+class BotState(dict):
+    def __init__(self, state, me=None):
+        super().__init__(state)
+        # our bot's name, for the accessors about our own seat
+        self.me = me
+
+    """
+    Builds a BotState from whatever a decide_action implementation was
+    given: a JSON string, a dict or a BotState already.
+
+    @param state: JSON string/bytes, dict or BotState
+    @param me: our bot's name, unless the state names the seat
+    """
+
+    @classmethod
+    def load(cls, state, me=None):
+        if isinstance(state, BotState):
+            if me is not None and state.me is None:
+                state.me = me
+            return state
+        if isinstance(state, (str, bytes, bytearray)):
+            state = json.loads(state)
+        # a process playing several seats is told which one in "seat"
+        return cls(state, state.get("seat") or me)
+
+    def __repr__(self):
+        return f"BotState({dict.__repr__(self)}, me={self.me!r})"
+
+    @cached_property
+    def json(self):
+        """The state as a compact JSON string, for decide_action implementations that parse it."""
+        return json.dumps(self, separators=(",", ":"))
+
+    @cached_property
+    def hand(self):
+        return _cards(self.get("hand", ()))
+
+    @cached_property
+    def board(self):
+        return _cards(self.get("board", ()))
+
+    @property
+    def table(self):
+        """Id of the table the state is from, None if the engine didn't say."""
+        return self.get("table")
+
+    @property
+    def is_end(self):
+        return bool(self.get("is_end_state", False))
+
+    @property
+    def pot(self):
+        return self.get("pot", 0)
+
+    @property
+    def curr_bet(self):
+        return self.get("curr_bet", 0)
+
+    @property
+    def my_bet(self):
+        """What we've put in this street (player_curr_bet)."""
+        return self.get("player_curr_bet", 0)
+
+    @property
+    def to_call(self):
+        return max(0, self.curr_bet - self.my_bet)
+
+    @property
+    def can_check(self):
+        return bool(self.get("can_check", False))
+
+    @property
+    def small_blind(self):
+        return self.get("small_blind", 0)
+
+    @property
+    def big_blind(self):
+        return self.get("big_blind", 0)
+
+    @property
+    def num_decks(self):
+        return self.get("num_decks", 1)
+
+    @property
+    def players(self):
+        return self.get("players", {})
+
+    @cached_property
+    def stacks(self):
+        """Player name -> chips."""
+        return {name: seat.get("chips", 0) for name, seat in self.players.items()}
+
+    @property
+    def my_stack(self):
+        return self.players.get(self.me, {}).get("chips", 0)
+
+    @property
+    def position(self):
+        """Our seat, 0 is the small blind."""
+        return self.players.get(self.me, {}).get("position")
+
+    @cached_property
+    def opponents(self):
+        """Names of everyone else at the table, in seat order."""
+        seats = sorted(self.players.items(), key=lambda item: item[1].get("position", 0))
+        return [name for name, _ in seats if name != self.me]
+
+    @cached_property
+    def live_opponents(self):
+        """The opponents still in the hand: not folded or sitting it out, in seat order."""
+        players = self.players
+        return [
+            name for name in self.opponents
+            if players[name].get("in_hand", players[name].get("last_move") != "fold")
+        ]
+
+
+"""
+What a bot's decide_action/end_game get for a decoded state: a BotState if
+the bot sets `wants_state`, otherwise the old argument. On a multiplexed
+connection the table and seat a message is for are added to the state as
+"table" and "seat".
+
+@param bot: the bot object
+@param state: the decoded state dict
+@param as_json: give bots without wants_state a JSON string rather than the dict
+@param table: id of the table, if known
+@param seat: name of the seat, if the bot plays several
+"""
+
+
+def for_bot(bot, state, as_json=False, table=None, seat=None):
+    extra = {key: value for key, value in (("table", table), ("seat", seat)) if value is not None}
+    if getattr(bot, "wants_state", False):
+        view = BotState(state, seat or getattr(bot, "name", None))
+        view.update(extra)
+        return view
+    if extra:
+        state = {**state, **extra}
+    if as_json:
+        return json.dumps(state, separators=(",", ":"))
+    return state
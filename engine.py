@@ -1,17 +1,32 @@
+import concurrent.futures
 import contextlib
 import importlib
 import importlib.util
+import io
 import json
 import multiprocessing
 import os
 import random
 import time
+from concurrent.futures import ThreadPoolExecutor
 from operator import attrgetter
-import socket
 
-from netwire import recv_json, send_json
+from netwire import ENCODINGS, address_str, connect, recv_json, send_json
 from board import *
-from engine_net import ask_bot_tcp
+import engine_net
+from engine_net import (
+    ask_bot_local,
+    ask_bot_tcp,
+    notify_bot_local,
+    notify_bot_tcp,
+    observe_bot_local,
+    observe_bot_tcp,
+    observing_tcp,
+    request_action,
+)
+from handhistory import HISTORY, STREETS, HandRecord
+from eventlog import DEBUG, INFO, LEVELS, LOG, OFF
+from metrics import METRICS
 
 """
 Jacob Yoder
@@ -30,16 +45,33 @@ Player obj: used for engine side only
 
 
 class Player:
-    def __init__(self, name="bot", host=None, port=None, chips=100):
+    def __init__(self, name="bot", host=None, port=None, chips=100, bot=None):
         self.name = name
         self.hand = []
         self.in_hand = True
         self.chips = chips
         self.last_action = None
+        # this hand's moves, [street, move, chips put in, chips left], for the end state
+        self.moves = []
         self.curr_bet = 0
         self.ready = False
+        # TCP bots: host and port; bots on a unix socket: host is its path, port None
         self.host = host
-        self.port = int(port)
+        self.port = int(port) if port is not None else None
+        # in-process bot object (decide_action/end_game), None for TCP bots
+        self.bot = bot
+        # id of the table the player sits at ("tier.table"), sent along with
+        # every message so one bot process can play several tables
+        self.table = None
+        # delivery of the last end/info broadcast: "ok", "timeout" or the error
+        self.notify_status = None
+        self.notify_failures = 0
+        # an end message still being sent after broadcast_end gave up waiting
+        self.pending_notify = None
+
+    @property
+    def address(self):
+        return address_str(self.host, self.port)
 
     def receive_cards(self, cards):
         self.hand.extend(cards)
@@ -47,11 +79,74 @@ class Player:
     def show_hand(self):
         return [str(card) for card in self.hand]
 
-    def action(self, game_state):
-        if self.host and self.port is not None:
-            return ask_bot_tcp(self.host, self.port, game_state)
+    def _wait_pending(self):
+        """Lets an end message still on its way arrive before anything sent after it."""
+        pending, self.pending_notify = self.pending_notify, None
+        if pending is not None:
+            # bounded by the send's own socket timeouts
+            concurrent.futures.wait([pending])
+
+    def action(self, game_state, timeout_s=2.0):
+        self._wait_pending()
+        if self.bot is not None:
+            return ask_bot_local(self.bot, game_state, self.table)
+        if self.host:
+            # raises on comms errors, betting_round folds the player and counts it
+            return request_action(
+                self.host, self.port, game_state, timeout_s=timeout_s, table=self.table, seat=self.name
+            )
         return FoldAction()
 
+    def notify(self, msg, timeout_s=2.0):
+        """Sends a message with no reply, raises if it can't be delivered."""
+        if self.bot is not None:
+            notify_bot_local(self.bot, msg, self.table)
+        else:
+            notify_bot_tcp(self.host, self.port, msg, timeout_s=timeout_s, table=self.table, seat=self.name)
+
+    def observing(self):
+        """True if the bot wants observe messages (on_observe in-process, subscribed over TCP)."""
+        if self.bot is not None:
+            return engine_net.POOL.observe and hasattr(self.bot, "on_observe")
+        return bool(self.host) and observing_tcp(self.host, self.port)
+
+    def observe(self, msg):
+        self._wait_pending()
+        if self.bot is not None:
+            observe_bot_local(self.bot, msg)
+        else:
+            observe_bot_tcp(self.host, self.port, msg)
+
+
+_LOCAL_MODULES = {}
+
+
+"""
+Creates an in-process bot from a bot config entry's "local" field.
+
+@param source: path to a .py file (relative to the config) or a module name
+@param name: bot name
+@param base_dir: directory of the config file
+@param class_name: class to instantiate with name=name, default PokerBot
+
+@return bot obj
+"""
+
+
+def load_local_bot(source, name, base_dir, class_name="PokerBot"):
+    if source.endswith(".py") or os.sep in source or "/" in source:
+        path = os.path.normpath(os.path.join(base_dir, source))
+        module = _LOCAL_MODULES.get(path)
+        if module is None:
+            mod_name = "local_bot_" + os.path.splitext(os.path.basename(path))[0]
+            spec = importlib.util.spec_from_file_location(mod_name, path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            _LOCAL_MODULES[path] = module
+    else:
+        module = importlib.import_module(source)
+    return getattr(module, class_name)(name=name)
+
 
 """
 Loads players and rules from config file.
@@ -59,7 +154,8 @@ Loads players and rules from config file.
 
 
 def load_from_config(config_path, default_host="127.0.0.1", base_port=5001):
-    """Returns (players, rules, spawned_procs). `players` are socket-based."""
+    """Returns (players, rules, spawned_procs). `players` are socket-based,
+    or in-process for bots with a "local" entry."""
     config_path = os.path.abspath(config_path)
     with open(config_path, "r", encoding="utf-8") as f:
         config = json.load(f)
@@ -71,8 +167,20 @@ def load_from_config(config_path, default_host="127.0.0.1", base_port=5001):
     bots = config.get("bots", [])
     players, spawned = [], []
     for i, b in enumerate(bots):
-        # Process (local/module) bots no longer supported, for language-agnostic-ness
+        # Competition bots are TCP servers (any language); "local" Python bots
+        # run in-process for self-play and testing
         name = b.get("name", f"bot{i+1}")
+        if b.get("local"):
+            bot = load_local_bot(
+                b["local"], name, os.path.dirname(config_path), b.get("class", "PokerBot")
+            )
+            players.append(Player(name=name, chips=starting_chips, bot=bot))
+            continue
+        if b.get("unix"):
+            # a bot on this machine listening on a unix socket, path relative to the config
+            path = os.path.join(os.path.dirname(config_path), b["unix"])
+            players.append(Player(name=name, host=path, port=None, chips=starting_chips))
+            continue
         host = b.get("host", default_host)
         port = int(b.get("port", base_port + i))
 
@@ -84,7 +192,23 @@ def load_from_config(config_path, default_host="127.0.0.1", base_port=5001):
             "max_players": int(game.get("max_table_size", len(players))),
             "visual": bool(game.get("visual", False)),
             "delay": float(game.get("delay", 0)),
+            "keepalive": bool(game.get("keepalive", True)),
+            "encoding": game.get("encoding", "json"),
+            "delta": bool(game.get("delta", False)),
+            "mux": bool(game.get("mux", False)),
+            "observe": bool(game.get("observe", False)),
+            "headless": bool(game.get("headless", False)),
+            "turbo": bool(game.get("turbo", False)),
+            "log_level": game.get("log_level", "debug"),
+            "log_events": game.get("log_events"),
+            "hand_history": game.get("hand_history"),
+            "metrics_file": game.get("metrics_file"),
+            "metrics_interval": float(game.get("metrics_interval", 10)),
     }
+    if rules["encoding"] not in ENCODINGS:
+        raise ValueError(f"game.encoding must be one of {', '.join(ENCODINGS)}")
+    if rules["log_level"] not in LEVELS:
+        raise ValueError(f"game.log_level must be one of {', '.join(LEVELS)}")
     return players, rules, spawned
 
 
@@ -107,9 +231,8 @@ def compare_players(players, community_cards):
         if not player.in_hand:
             continue
         score, hand = evaluate_hand(player.hand + community_cards)
-        print(
-            f"{player.name}'s best hand: {[str(card) for card in hand]} with score {score}"
-        )
+        if LOG.enabled(DEBUG):
+            LOG.debug("best_hand", "%s's best hand: %s with score %s", player.name, [str(card) for card in hand], score)
         if score > best_score:
             best_score = score
             winners = [player]
@@ -124,13 +247,31 @@ Defines a single round of betting, lets all players decide an action, if there i
 
 @param players: list of players
 @param game_state: GameState obj, defining board, deck, and state
+@param max_time: seconds a bot gets to answer
+@param street: name of the street, for the response metrics
 """
 
 
-def betting_round(players, game_state, max_time=5):
+def betting_round(players, game_state, max_time=5, street="preflop"):
+    history = game_state.history
+    street_index = STREETS.index(street)
+
+    observers = game_state.observers
+
+    def record(player, move, amount=0, to=None, shown=None):
+        # comms errors look like folds to the other bots
+        if shown is None:
+            shown = "fold" if move == "error" else move
+        player.moves.append([street_index, shown, amount, player.chips - amount])
+        if history:
+            history.action(street, player, move, amount, to)
+        if observers:
+            observers.action(street_index, player, shown, amount)
+
     def fold(player):
         player.last_action = FoldAction()
         player.in_hand = False
+        record(player, "fold")
 
     while players_not_ready(players):
         for player in players[2:] + players[:2]:  # Start with non-blinds players
@@ -146,24 +287,29 @@ def betting_round(players, game_state, max_time=5):
                 gs["hand"] = [x.to_dict() for x in player.hand]
                 gs["player_curr_bet"] = player.curr_bet
 
+                start = time.perf_counter()
                 try:
-                    action = ask_bot_tcp(player.host, player.port, gs, timeout_s=max_time)
+                    action = player.action(gs, timeout_s=max_time)
+                    METRICS.observe(player.name, street, time.perf_counter() - start, max_time)
                 except Exception as e:
+                    METRICS.failure(player.name, e)
+                    METRICS.count(player.name, "autofolds")
                     # If a bot dies or communication fails, mark them out of the hand
-                    print(f"[WARN] bot {player.host}:{player.port} comms error: {e}")
+                    LOG.warn("comms_error", "bot %s comms error: %s", player.address, e)
                     # Treat as folded / disconnected for this hand
                     player.last_action = FoldAction()
                     player.in_hand = False
                     player.ready = True
-                    print(f"{player.name}: connection error, removed from hand")
+                    record(player, "error")
+                    LOG.info("removed", "%s: connection error, removed from hand", player.name)
                     continue
 
                 if action is None:  # Fun fact `if not action` doesn't work here, because empty enum is False
                     action = FoldAction()
 
-                print(f"{player.name}: {action}")
+                LOG.debug("action", "%s: %s", player.name, action)
             else:
-                print(f"{player.name}: Not in Round")
+                LOG.debug("action", "%s: Not in Round", player.name)
                 continue
 
             match action:
@@ -171,14 +317,17 @@ def betting_round(players, game_state, max_time=5):
                     if player.curr_bet == game_state.curr_bet:
                         player.last_action = action
                         player.ready = True
+                        record(player, "check")
                     else:
-                        print("Bad check, folding")
+                        LOG.info("autofold", "Bad check, folding")
+                        METRICS.count(player.name, "autofolds")
                         fold(player)
                     continue
 
                 case CallAction():
                     # verify player can call
                     if player.chips >= game_state.curr_bet - player.curr_bet:
+                        record(player, "call", game_state.curr_bet - player.curr_bet)
                         game_state.pot += game_state.curr_bet - player.curr_bet
                         player.chips = player.chips - (
                             game_state.curr_bet - player.curr_bet
@@ -188,6 +337,7 @@ def betting_round(players, game_state, max_time=5):
                         player.ready = True
                     else:
                         # Forced to go all in
+                        record(player, "call", player.chips)
                         player.curr_bet += player.chips
                         game_state.pot += player.chips
                         player.chips = 0
@@ -196,7 +346,7 @@ def betting_round(players, game_state, max_time=5):
 
                         continue
                         # Is there ever a bad call?
-                        print("Bad call, folding")
+                        LOG.info("autofold", "Bad call, folding")
                         fold(player)
                     continue
 
@@ -206,12 +356,14 @@ def betting_round(players, game_state, max_time=5):
                     need = want - player.curr_bet
                     if need <= 0:
                         # raising to less-or-equal current bet is invalid
-                        print("Bad raise (not above current bet), folding")
+                        LOG.info("autofold", "Bad raise (not above current bet), folding")
+                        METRICS.count(player.name, "autofolds")
                         fold(player)
                         continue
 
                     if need <= player.chips:
                         # normal raise
+                        record(player, "raise", need, want)
                         game_state.pot += need
                         player.chips -= need
                         player.curr_bet = want
@@ -224,8 +376,11 @@ def betting_round(players, game_state, max_time=5):
                         player.ready = True
                     else:
                         # player cannot cover full raise -> go all-in with remaining chips
-                        print("Player raised more than they have... Going all in!")
+                        LOG.debug("all_in", "Player raised more than they have... Going all in!")
                         all_in_amt = player.chips
+                        # to the other bots an all-in that doesn't raise the bet is a call
+                        raised = player.curr_bet + all_in_amt > game_state.curr_bet
+                        record(player, "raise", all_in_amt, want, shown=None if raised else "call")
                         game_state.pot += all_in_amt
                         player.curr_bet += all_in_amt
                         player.chips = 0
@@ -243,7 +398,8 @@ def betting_round(players, game_state, max_time=5):
                     fold(player)
                     continue
                 case _:
-                    print("Invalid Action, folding")
+                    LOG.info("autofold", "Invalid Action, folding")
+                    METRICS.count(player.name, "autofolds")
                     fold(player)
                     continue
 
@@ -276,7 +432,7 @@ def players_not_ready(players):
 Simple function to notify players of end of round.
 
 @param host: player host
-@param port: player port
+@param port: player port, None if host is a unix socket path
 @param end_state: the dict of game_state
 @param timeout_s: timeout in seconds
 """
@@ -284,13 +440,139 @@ Simple function to notify players of end of round.
 
 def notify_end(host, port, end_state, timeout_s=2.0):
     try:
-        with contextlib.closing(
-            socket.create_connection((host, port), timeout=timeout_s)
-        ) as s:
-            send_json(s, {"op": "end", "state": end_state})
+        notify_bot_tcp(host, port, {"op": "end", "state": end_state}, timeout_s=timeout_s)
     except Exception as e:
         # Don't let unreachable bots crash the engine; log and continue.
-        print(f"[WARN] failed to notify {host}:{port} -> {e}")
+        LOG.warn("notify_failed", "failed to notify %s -> %s", address_str(host, port), e)
+
+
+# shared by every table so concurrent tables don't each spin up threads
+_NOTIFY_POOL = ThreadPoolExecutor(max_workers=32, thread_name_prefix="notify")
+
+
+"""
+Sends an end message to every player at once and waits for all of them, but
+no longer than one overall deadline, so a dead or slow bot costs at most
+timeout_s per broadcast instead of timeout_s per bot.
+
+Records the outcome on each player (notify_status, notify_failures) and
+prints a warning for every bot that didn't get its message. A message that
+is still being sent at the deadline isn't lost or overtaken: the player's
+next act, observe or end message waits for it (pending_notify).
+
+@param players: list of players
+@param states: end_state dict per player (same order as players)
+@param timeout_s: overall deadline in seconds
+
+@return dict of player name -> "ok", "timeout" or the error message
+"""
+
+
+def _notify_after(pending, player, msg, timeout_s):
+    if pending is not None:
+        concurrent.futures.wait([pending])
+    player.notify(msg, timeout_s)
+
+
+def broadcast_end(players, states, timeout_s=2.0):
+    futures = []
+    for p, state in zip(players, states):
+        msg = {"op": "end", "state": state}
+        if p.bot is not None:
+            # in-process bots are just a call, no need for a thread
+            future = concurrent.futures.Future()
+            p.notify(msg)
+            future.set_result(None)
+        else:
+            # behind the last broadcast's message, if that one is still being sent
+            pending, p.pending_notify = p.pending_notify, None
+            future = _NOTIFY_POOL.submit(_notify_after, pending, p, msg, timeout_s)
+        futures.append(future)
+    concurrent.futures.wait(futures, timeout=timeout_s)
+    delivery = {}
+    for p, future in zip(players, futures):
+        if not future.done():
+            # still queued: drop it; already sending: the player's next message waits for it
+            if not future.cancel():
+                p.pending_notify = future
+            status = "timeout"
+        elif future.exception() is not None:
+            status = str(future.exception()) or type(future.exception()).__name__
+        else:
+            status = "ok"
+        p.notify_status = status
+        if status != "ok":
+            p.notify_failures += 1
+            LOG.warn("notify_failed", "failed to notify %s (%s) -> %s", p.name, p.address, status)
+        delivery[p.name] = status
+    return delivery
+
+
+"""
+Pushes what happens in a hand, as it happens, to the bots at the table that
+subscribed to observe messages, so they can think while the others act.
+Every message is {"op": "observe", "event": ..., "table", "seat"} plus:
+
+    hand    at the deal: "hand" (the seat's own hole cards), "stacks"
+            (name -> chips after the blinds, in seat order), "small_blind",
+            "big_blind", "num_decks"
+    blind   "player", "amount", "chips" (left)
+    action  "street" (0 preflop .. 3 river), "player", "move", "amount"
+            (chips put in), "chips" (left); a bot that failed to answer
+            shows as a fold
+    board   "street", "board" (every community card so far)
+
+Cards are short strings ("AH"). The end of the hand is the end message, as
+before. Sending never waits for the bot (see BotConnection.observe).
+"""
+
+
+class HandObservers:
+    def __init__(self, players):
+        self.players = players
+        self.table = players[0].table if players else None
+
+    """
+    Starts observing a hand that was just dealt, None if no one at the
+    table subscribed.
+
+    @param players: the players at the table, in seat order
+    @param game_state: the hand's GameState, blinds paid
+    """
+
+    @classmethod
+    def start(cls, players, game_state):
+        if not engine_net.POOL.observe:
+            return None
+        watching = [p for p in players if p.observing()]
+        if not watching:
+            return None
+        observers = cls(watching)
+        stacks = {p.name: p.chips for p in players if p.in_hand}
+        for p in watching:
+            p.observe({
+                "op": "observe", "event": "hand", "table": observers.table, "seat": p.name,
+                "hand": [c.short_str() for c in p.hand], "stacks": stacks,
+                "small_blind": game_state.small_blind, "big_blind": game_state.big_blind,
+                "num_decks": game_state.deck.num_decks,
+            })
+        for p in players:
+            if p.in_hand and p.curr_bet:
+                observers.send({"event": "blind", "player": p.name, "amount": p.curr_bet, "chips": p.chips})
+        return observers
+
+    def send(self, event):
+        for p in self.players:
+            p.observe({"op": "observe", **event, "table": self.table, "seat": p.name})
+
+    def action(self, street, player, move, amount):
+        self.send({
+            "event": "action", "street": street, "player": player.name, "move": move,
+            "amount": amount, "chips": player.chips - amount,
+        })
+
+    def board(self, street, cards):
+        self.send({"event": "board", "street": street, "board": [c.short_str() for c in cards]})
 
 
 def award_pot_to_player(winners, players, game_state, reason=None, reset_deck=False):
@@ -300,10 +582,12 @@ def award_pot_to_player(winners, players, game_state, reason=None, reset_deck=Fa
     winners may be a single Player or a list of Players. The function will
     correctly split the pot for multiple winners and distribute any remainder
     to the first winner.
-    reset_deck indicates if the deck was verified and needs resetting.
+    reset_deck forces a reshuffle of the shoe after this hand, it is also
+    reshuffled when another hand might run out of cards. Bots are told in the
+    end state, otherwise the next hand is dealt from the same shoe.
     """
     if not winners:  # Protect against empty winners list
-        print("Warning: No winners provided to award_pot_to_player")
+        LOG.warn("no_winners", "No winners provided to award_pot_to_player")
         # Find someone still in hand to award to, or lowest stack as fallback
         winners = [next((p for p in players if p.in_hand), min(players, key=lambda p: p.chips))]
     # normalize to list
@@ -312,34 +596,47 @@ def award_pot_to_player(winners, players, game_state, reason=None, reset_deck=Fa
     winner_names = [w.name for w in winners]
 
     if len(winners) == 1:
-        print(f"\n-- {winners[0].name} wins ({'early' if reason=='early' else 'showdown'}) --")
-        print(f"Awarding pot of {game_state.pot} to {winners[0].name}")
+        LOG.info("winner", "\n-- %s wins (%s) --", winners[0].name, "early" if reason == "early" else "showdown")
+        LOG.info("pot", "Awarding pot of %d to %s", game_state.pot, winners[0].name)
         winners[0].chips += game_state.pot
+        if game_state.history:
+            game_state.history.award(winners[0], game_state.pot)
     else:
-        print(f"\n-- Split pot between: {', '.join(winner_names)} --")
+        LOG.info("winner", "\n-- Split pot between: %s --", ", ".join(winner_names))
         total = game_state.pot
         share = total // len(winners)
         remainder = total - share * len(winners)
         for i, w in enumerate(winners):
             add = share + (remainder if i == 0 else 0)
             w.chips += add
-        print(f"Each winner receives {share} chips (remainder {remainder} -> {winner_names[0]})")
+            if game_state.history:
+                game_state.history.award(w, add)
+        LOG.info("pot", "Each winner receives %d chips (remainder %d -> %s)", share, remainder, winner_names[0])
+
+    if game_state.history:
+        HISTORY.write(game_state.history.finish(game_state.deck.community_cards, reason or "early"))
+        game_state.history = None
+
+    deck = game_state.deck
+    reset_deck = reset_deck or deck.needs_reset(len(players))
 
     # Reset pot and per-player bet state
     game_state.pot = 0
     game_state.curr_bet = 0
     # notify and cleanup
+    broadcast_end(
+        players,
+        [game_state.to_end_dict(winner_names, p.name, reset_deck=reset_deck) for p in players],
+        timeout_s=2.0,
+    )
+    if reset_deck:
+        LOG.info("deck_reset", "Deck low on cards. Resetting deck.")
+        deck.reset()
+        deck.shuffle()
+    else:
+        deck.clear_table()
     for p in players:
-        try:
-            notify_end(
-                p.host,
-                p.port,
-                game_state.to_end_dict(winner_names, p.name, reset_deck=reset_deck),
-                timeout_s=2.0,
-            )
-        except Exception:
-            print(f"[WARN] failed to notify {p.name} of end")
-        print(f"{p.name}: {p.chips}")
+        LOG.debug("stack", "%s: %d", p.name, p.chips)
         p.in_hand = True
         p.ready = False
         p.hand = []
@@ -354,85 +651,101 @@ Plays a round of poker, resets players turns and rotates position ordering at en
 
 @param players: list of players
 @param blinds: tuple of small and big blind
+@param hand_info: extra fields for the hand history record (tier, table, table_hand)
 """
 
 
-def play_poker_round(deck, players, blinds=[0, 0], visual=False, delay=0):
-    time.sleep(delay)
+def play_poker_round(deck, players, blinds=[0, 0], visual=False, delay=0, hand_info=None):
+    if delay:
+        time.sleep(delay)
 
     if len(players) < 2:
-        print(f"Not enough players to play")
+        LOG.info("skip_hand", "Not enough players to play")
         return
 
     # Check if we have enough players who can afford blinds
     can_play = sum(1 for p in players if p.chips >= blinds[1])
     if can_play < 2:
-        print(f"Not enough players can afford big blind ({blinds[1]}), skipping round")
+        LOG.info("skip_hand", "Not enough players can afford big blind (%d), skipping round", blinds[1])
         return
 
     game_state = GameState(players=players, deck=deck)
 
     game_state.reset_round(blinds=blinds)
+    if HISTORY.enabled:
+        game_state.history = HandRecord(players, blinds, deck.num_decks, **(hand_info or {}))
 
     # Pre-flop: Deal 2 cards to each player
     for player in players:
         player.hand = [] # make sure to reset hand
         if player.in_hand:
             player.receive_cards(deck.deal(2))
+            if game_state.history:
+                game_state.history.deal(player)
             if visual:
-                print(f"\n{player.name}'s hand:")
+                LOG.info("deal", "\n%s's hand:", player.name)
                 print_cards_as_ascii(player.hand)
-            else:
-                print(f"{player.name} is dealt: {player.show_hand()}")
+            elif LOG.enabled(DEBUG):
+                LOG.debug("deal", "%s is dealt: %s", player.name, player.show_hand())
+    game_state.observers = HandObservers.start(players, game_state)
 
     # Placeholder betting round
-    print("\n-- Betting Round (Pre-Flop) --\n")
-    early_winner = betting_round(players, game_state)
+    LOG.debug("street", "\n-- Betting Round (Pre-Flop) --\n")
+    early_winner = betting_round(players, game_state, street="preflop")
     if early_winner:
         award_pot_to_player(early_winner, players, game_state)
         return
-    time.sleep(delay)
+    if delay:
+        time.sleep(delay)
 
     # Flop
     deck.burn(1)
     deck.deal_table(3)
+    if game_state.observers:
+        game_state.observers.board(1, deck.community_cards)
     if visual:
-        print(f"\nFlop: ")
+        LOG.info("board", "\nFlop: ")
         print_cards_as_ascii(deck.community_cards)
-    else:
-        print(f"Flop: {deck.show_table()}")
-    print("\n-- Betting Round (Post-Flop) --\n")
-    early_winner = betting_round(players, game_state)
+    elif LOG.enabled(DEBUG):
+        LOG.debug("board", "Flop: %s", deck.show_table())
+    LOG.debug("street", "\n-- Betting Round (Post-Flop) --\n")
+    early_winner = betting_round(players, game_state, street="flop")
     if early_winner:
         award_pot_to_player(early_winner, players, game_state)
         return
-    time.sleep(delay)
+    if delay:
+        time.sleep(delay)
 
     # Turn
     deck.burn(1)
     deck.deal_table(1)
+    if game_state.observers:
+        game_state.observers.board(2, deck.community_cards)
     if visual:
-        print(f"\nTurn: ")
+        LOG.info("board", "\nTurn: ")
         print_cards_as_ascii(deck.community_cards)
-    else:
-        print(f"Turn: {deck.show_table()}")
-    print("\n-- Betting Round (Post-Turn) --\n")
-    early_winner = betting_round(players, game_state)
+    elif LOG.enabled(DEBUG):
+        LOG.debug("board", "Turn: %s", deck.show_table())
+    LOG.debug("street", "\n-- Betting Round (Post-Turn) --\n")
+    early_winner = betting_round(players, game_state, street="turn")
     if early_winner:
         award_pot_to_player(early_winner, players, game_state)
         return
-    time.sleep(delay)
+    if delay:
+        time.sleep(delay)
 
     # River
     deck.burn(1)
     deck.deal_table(1)
+    if game_state.observers:
+        game_state.observers.board(3, deck.community_cards)
     if visual:
-        print(f"\nRiver: ")
+        LOG.info("board", "\nRiver: ")
         print_cards_as_ascii(deck.community_cards)
-    else:
-        print(f"River: {deck.show_table()}")
-    print("\n-- Betting Round (Final) --\n")
-    early_winner = betting_round(players, game_state)
+    elif LOG.enabled(DEBUG):
+        LOG.debug("board", "River: %s", deck.show_table())
+    LOG.debug("street", "\n-- Betting Round (Final) --\n")
+    early_winner = betting_round(players, game_state, street="river")
     if early_winner:
         award_pot_to_player(early_winner, players, game_state, reason="early")
         return
@@ -444,18 +757,16 @@ def play_poker_round(deck, players, blinds=[0, 0], visual=False, delay=0):
             award_pot_to_player(left[0], players, game_state, reason="last standing")
         else:
             # If no players remain in the hand, award pot to fallback winner
-            print("Warning: No players left in hand at showdown -- awarding pot to fallback winner")
+            LOG.warn("no_players_left", "No players left in hand at showdown -- awarding pot to fallback winner")
             # (first in-hand or lowest stack).
             award_pot_to_player(None, players, game_state, reason="no_players_left")
         return
 
     # Showdown
-    print("\n-- Showdown --")
+    LOG.debug("street", "\n-- Showdown --")
     winners, score = compare_players(players, deck.community_cards)
 
-    # Check if deck needs resetting
-    need_reset = deck.verify(len(players))
-    award_pot_to_player(winners, players, game_state, reason="showdown", reset_deck=need_reset)
+    award_pot_to_player(winners, players, game_state, reason="showdown")
 
 
 """
@@ -467,9 +778,9 @@ Terminates players
 
 def terminate(players):
     for player in players:
-        with contextlib.closing(
-            socket.create_connection((player.host, player.port), timeout=1)
-        ) as s:
+        if player.bot is not None:
+            continue
+        with contextlib.closing(connect(player.host, player.port, timeout=1)) as s:
             send_json(s, {"op": "terminate"})
             pass
 
@@ -477,30 +788,28 @@ def terminate(players):
 def preflight_check(players, timeout_s=1.0):
     bad = []
     for p in players:
+        if p.bot is not None:
+            continue
         try:
-            with contextlib.closing(
-                socket.create_connection((p.host, p.port), timeout=timeout_s)
-            ):
+            with contextlib.closing(connect(p.host, p.port, timeout=timeout_s)):
                 pass
         except OSError as e:
-            bad.append((p.name, p.host, p.port, str(e)))
+            bad.append((p.name, p.address, str(e)))
     if bad:
-        lines = "\n".join(f"- {n} @ {h}:{pt} -> {err}" for n, h, pt, err in bad)
+        lines = "\n".join(f"- {n} @ {addr} -> {err}" for n, addr, err in bad)
         raise RuntimeError("Unreachable bots:\n" + lines)
 
 
 def wait_for_bots(players, timeout_s=5.0, interval=0.25):
-    """Retry until all bots accept TCP or timeout."""
+    """Retry until all bots accept connections or timeout."""
     deadline = time.time() + timeout_s
-    remaining = {(p.host, p.port, p.name) for p in players}
+    remaining = {(p.host, p.port, p.name) for p in players if p.bot is None}
     last_err = {}
     while remaining and time.time() < deadline:
         ready_now = []
         for host, port, name in list(remaining):
             try:
-                with contextlib.closing(
-                    socket.create_connection((host, port), timeout=interval)
-                ):
+                with contextlib.closing(connect(host, port, timeout=interval)):
                     ready_now.append((host, port, name))
             except OSError as e:
                 last_err[(host, port, name)] = str(e)
@@ -510,8 +819,8 @@ def wait_for_bots(players, timeout_s=5.0, interval=0.25):
             time.sleep(interval)
     if remaining:
         lines = "\n".join(
-            f"- {n} @ {h}:{pt} -> {last_err.get((h,pt,n),'no response')}"
-            for h, pt, n in sorted(remaining)
+            f"- {n} @ {address_str(h, pt)} -> {last_err.get((h,pt,n),'no response')}"
+            for h, pt, n in sorted(remaining, key=lambda r: r[2])
         )
         raise RuntimeError("Unreachable bots (after wait):\n" + lines)
 
@@ -526,13 +835,19 @@ def chunked(iterable, size):
         yield it[i : i + size]
 
 def print_scoreboard(players, title="Standings"):
-    print("\n" + "=" * 40)
-    print(f"{title}")
-    print("=" * 40)
+    lines = ["\n" + "=" * 40, f"{title}", "=" * 40]
     sorted_p = sorted(players, key=attrgetter("chips"), reverse=True)
     for i, p in enumerate(sorted_p, start=1):
-        print(f"{i:2d}. {p.name:20s} {p.chips:8d} chips")
-    print("=" * 40 + "\n")
+        lines.append(f"{i:2d}. {p.name:20s} {p.chips:8d} chips")
+    lines.append("=" * 40 + "\n")
+    LOG.info("scoreboard", "%s", "\n".join(lines))
+
+class _Discard(io.TextIOBase):
+    """stdout for headless runs."""
+
+    def write(self, text):
+        return len(text)
+
 
 class Tournament:
         """Simple bracket-style tournament.
@@ -542,37 +857,185 @@ class Tournament:
           - max_table_size: override rules.max_players per table
           - rounds_per_match: how many poker rounds to play per table (default 1)
           - visual: pass through to play_poker_round for ascii output
+          - turbo (rules): no ascii cards, no delays, no per-hand log flush
+          - table_concurrency: how many tables of a tier play at the same time
+            (default 1), not with blind_step_per_round
+          - seed: seed for seating and shuffles, for repeatable tournaments (a
+            random one is picked and logged/recorded when not set)
         """
 
         def __init__(self, players, rules, config=None):
             self.players = list(players)
             self.rules = rules
             config = config or {}
+            self.config = config
             self.advance_per_table = int(config.get("advance_per_table", 2))
             self.max_table_size = int(rules.get("max_players", 6))
             self.rounds_per_match = int(config.get("hands_per_match", 1))
-            self.visual = bool(rules.get("visual", True))
-            self.delay = float(rules.get("delay", 0))
+            # headless: no output and no delays, for self-play with in-process bots
+            self.headless = bool(rules.get("headless", False))
+            # turbo: as fast as the bots allow, the demo settings (visual, delay) are ignored
+            self.turbo = bool(rules.get("turbo", False)) or self.headless
+            self.visual = bool(rules.get("visual", True)) and not self.turbo
+            self.delay = 0.0 if self.turbo else float(rules.get("delay", 0))
             self.blind_step_per_round = int(config.get("blind_step_per_round", 0))
             self.blind_step_per_tier = int(config.get("blind_step_per_tier", 1))
             self.blinds_schedule = config.get("blinds_schedule")
+            self.table_concurrency = max(1, int(config.get("table_concurrency", 1)))
+            if self.table_concurrency > 1 and self.blind_step_per_round:
+                # a serial table starts where the hands of the tables before it left the
+                # blinds, which a table played at the same time can't know
+                raise ValueError("tournament.blind_step_per_round can't be used with table_concurrency > 1")
+            # own RNGs, so bots running in-process can't change the cards dealt
+            self.seed = config.get("seed")
+            if self.seed is None:
+                self.seed = random.SystemRandom().getrandbits(64)
+            self.rng = self.rng_stream("seating")
+            self.tier = 0
+
+        """
+        An RNG stream derived from the tournament seed and `key` alone, so no
+        stream depends on how much another one was used: table 3's cards are
+        the same whether tables play one after the other or at the same time,
+        and whatever happened at tables 1 and 2.
+
+        @param key: what the stream is for, e.g. ("deal", tier, table)
+
+        @return random.Random
+        """
+
+        def rng_stream(self, *key):
+            # str seeds go through sha512, the same on every run and platform
+            return random.Random("/".join(str(k) for k in (self.seed, *key)))
+
+        """
+        Plays the configured number of hands at one table.
+
+        @return selected: players advancing from this table
+        @return blind_idx: blind schedule index after the table's hands
+        """
+
+        def _play_table(self, t_idx, table_players, blind_levels, blind_idx, rng=None):
+            LOG.info("table", "\nPlaying table %d with %d players", t_idx, len(table_players))
+            for p in table_players:
+                p.table = f"{self.tier}.{t_idx}"
+
+            # choose blind level for this table based on global blind index
+            if blind_levels:
+                lvl = blind_levels[min(blind_idx, len(blind_levels) - 1)]
+                sb = lvl.get("small", 1)
+                bb = lvl.get("big", 2)
+            else:
+                sb = 1
+                bb = 2
+
+            # one shoe for all the table's hands, reshuffled when it runs low
+            # (award_pot_to_player); tell the bots it's a fresh one
+            num_decks = self.rules.get("num_decks", 1)
+            deck = Deck(num_decks, rng=rng)
+            deck.shuffle()
+            deck_info = {"is_end_state": True, "num_decks": num_decks, "reset_deck": True}
+            broadcast_end(table_players, [deck_info] * len(table_players), timeout_s=2.0)
+
+            # Play configured number of rounds (hands) and aggregate chips
+            for r in range(self.rounds_per_match):
+                # Filter out any busted players at the table before each hand
+                table_players = [p for p in table_players if p.chips > 0]
+                if len(table_players) < 2:
+                    LOG.info("table", "Not enough active players at table %d to continue rounds, ending table early", t_idx)
+                    break
+
+                # Use current blind level for this hand
+                play_poker_round(
+                    deck, table_players, blinds=[sb, bb], visual=self.visual, delay=self.delay,
+                    hand_info={"tier": self.tier, "table": t_idx, "table_hand": r + 1},
+                )
+                METRICS.maybe_write()
+                if not self.turbo:
+                    LOG.flush()
+                # advance blind index per-round if configured
+                blind_idx += self.blind_step_per_round
+                # clamp to last schedule index
+                if blind_levels:
+                    blind_idx = min(blind_idx, len(blind_levels) - 1)
+
+            # determine advancers from this table (top stacks at the table advance)
+            sorted_table = sorted(table_players, key=attrgetter("chips"), reverse=True)
+            take = min(self.advance_per_table, len(sorted_table))
+            selected = sorted_table[:take]
+            LOG.info("advancing", "Advancing: %s", ", ".join(p.name for p in selected))
+            # reset transient table state
+            for p in table_players:
+                p.in_hand = True
+                p.ready = False
+                p.hand = []
+            return selected, blind_idx
+
+        """
+        Plays the tables of a tier on a thread pool (table_concurrency threads).
+        Each table has its own shuffle RNG (rng_stream) and its events are
+        captured and logged in table order, so logs and results don't depend
+        on thread timing.
+
+        @return list of (selected, blind_idx) per table, in table order
+        """
+
+        def _play_tables_concurrently(self, tables, blind_levels, blind_idx):
+            results = []
+            with ThreadPoolExecutor(self.table_concurrency) as pool:
+                futures = [
+                    pool.submit(
+                        self._capture_table,
+                        t_idx, table_players, blind_levels, blind_idx,
+                        self.rng_stream("deal", self.tier, t_idx),
+                    )
+                    for t_idx, table_players in enumerate(tables, start=1)
+                ]
+                for future in futures:
+                    result, records = future.result()
+                    LOG.emit(records)
+                    results.append(result)
+            return results
+
+        def _capture_table(self, *args):
+            with LOG.capture() as records:
+                result = self._play_table(*args)
+            return result, records
 
         def run(self):
+            level = LOG.level
+            output = contextlib.nullcontext()
+            if self.headless:
+                # don't even format the events, and drop what in-process bots print
+                LOG.level = OFF
+                output = contextlib.redirect_stdout(_Discard())
+            elif self.turbo:
+                LOG.level = max(level, INFO)  # no per-action events
+            try:
+                with output:
+                    return self._run()
+            finally:
+                HISTORY.flush()
+                LOG.flush()
+                LOG.level = level
+
+        def _run(self):
             # initial check and reset chips
             num_decks = self.rules.get("num_decks", 1)
+            LOG.debug("seed", "Tournament seed: %s", self.seed)
 
-            # inform bots of deck size at start
             for p in self.players:
                 p.chips = self.rules.get("starting_chips", p.chips)
-                try:
-                    notify_end(
-                        p.host,
-                        p.port,
-                        {"is_end_state": True, "num_decks": num_decks, "reset_deck": True},
-                        timeout_s=2.0,
-                    )
-                except Exception as e:
-                    print(f"[WARN] failed to send initial deck info to {p.name}: {e}")
+            HISTORY.write({
+                "type": "tournament",
+                "time": time.time(),
+                "seed": self.seed,
+                "players": [p.name for p in self.players],
+                "starting_chips": self.rules.get("starting_chips"),
+                "num_decks": num_decks,
+                "max_players": self.max_table_size,
+                "config": self.config,
+            })
 
             current = list(self.players)
             tier = 1
@@ -581,62 +1044,38 @@ class Tournament:
             blind_levels = self.blinds_schedule or self.rules.get("blind_levels", [])
             blind_idx = 0
             while len(current) > self.advance_per_table:
+                self.tier = tier
                 # Remove players who have run out of chips so we don't repeatedly
                 busted = [p for p in current if p.chips <= 0]
                 if busted:
                     for p in busted:
-                        print(f"Removing busted player from tournament: {p.name}")
+                        LOG.info("busted", "Removing busted player from tournament: %s", p.name)
                     current = [p for p in current if p.chips > 0]
 
-                print(f"\n-- Tier {tier}: {len(current)} players -> advance {self.advance_per_table} per table --")
+                LOG.info(
+                    "tier", "\n-- Tier %d: %d players -> advance %d per table --",
+                    tier, len(current), self.advance_per_table,
+                )
                 advancers = []
 
                 # Randomize seating at each tier (like real tournaments)
-                random.shuffle(current)
+                self.rng.shuffle(current)
 
                 # chunk into tables (random seating)
                 tables = list(chunked(current, self.max_table_size))
-                for t_idx, table_players in enumerate(tables, start=1):
-                    print(f"\nPlaying table {t_idx} with {len(table_players)} players")
-
-                    # choose blind level for this table based on global blind index
-                    if blind_levels:
-                        lvl = blind_levels[min(blind_idx, len(blind_levels) - 1)]
-                        sb = lvl.get("small", 1)
-                        bb = lvl.get("big", 2)
-                    else:
-                        sb = 1
-                        bb = 2
-
-                    # Play configured number of rounds (hands) and aggregate chips
-                    for r in range(self.rounds_per_match):
-                        # Filter out any busted players at the table before each hand
-                        table_players = [p for p in table_players if p.chips > 0]
-                        if len(table_players) < 2:
-                            print(f"Not enough active players at table {t_idx} to continue rounds, ending table early")
-                            break
-
-                        # Use current blind level for this hand
-                        deck = Deck(self.rules.get("num_decks", 1))
-                        deck.shuffle()
-                        play_poker_round(deck, table_players, blinds=[sb, bb], visual=self.visual, delay=self.delay)
-                        # advance blind index per-round if configured
-                        blind_idx += self.blind_step_per_round
-                        # clamp to last schedule index
-                        if blind_levels:
-                            blind_idx = min(blind_idx, len(blind_levels) - 1)
-
-                    # determine advancers from this table (top stacks at the table advance)
-                    sorted_table = sorted(table_players, key=attrgetter("chips"), reverse=True)
-                    take = min(self.advance_per_table, len(sorted_table))
-                    selected = sorted_table[:take]
-                    print("Advancing:", ", ".join(p.name for p in selected))
-                    # reset transient table state
-                    for p in table_players:
-                        p.in_hand = True
-                        p.ready = False
-                        p.hand = []
-                    advancers.extend(selected)
+                if self.table_concurrency > 1 and len(tables) > 1:
+                    results = self._play_tables_concurrently(tables, blind_levels, blind_idx)
+                    # no blind steps per hand with concurrent tables, they all end where they started
+                    blind_idx = max(end_idx for _, end_idx in results)
+                    for selected, _ in results:
+                        advancers.extend(selected)
+                else:
+                    for t_idx, table_players in enumerate(tables, start=1):
+                        selected, blind_idx = self._play_table(
+                            t_idx, table_players, blind_levels, blind_idx,
+                            self.rng_stream("deal", tier, t_idx),
+                        )
+                        advancers.extend(selected)
 
                 # prepare for next tier
                 # deduplicate advancers (same bot shouldn't advance twice)
@@ -655,11 +1094,13 @@ class Tournament:
                 current = next_round
                 tier += 1
 
-            print("\nTournament finished. Finalists:")
+            LOG.info("finished", "\nTournament finished. Finalists:")
             print_scoreboard(current, title="Finalists")
             # merge final ranking with all players for a full board
             final_board = sorted(self.players, key=attrgetter("chips"), reverse=True)
             print_scoreboard(final_board, title="Final Standings")
+            LOG.info("metrics", "\nBot response times and failures:\n%s", METRICS.report())
+            METRICS.write()
 
             return current
 
@@ -679,8 +1120,22 @@ if __name__ == "__main__":
     wait_for_bots(players, timeout_s=5.0)
     preflight_check(players)
 
+    engine_net.POOL.keepalive = rules["keepalive"]
+    engine_net.POOL.encoding = rules["encoding"]
+    engine_net.POOL.delta = rules["delta"]
+    engine_net.POOL.mux = rules["mux"]
+    engine_net.POOL.observe = rules["observe"]
+    METRICS.path = rules["metrics_file"]
+    METRICS.interval = rules["metrics_interval"]
+    LOG.level = LEVELS[rules["log_level"]]
+    if rules["log_events"]:
+        LOG.events = open(rules["log_events"], "a", encoding="utf-8")
+    if rules["hand_history"]:
+        HISTORY.open(rules["hand_history"])
     tour = Tournament(players, rules, config=config)
     winners = tour.run()
+    engine_net.POOL.close_all()
+    HISTORY.close()
 
     # lets not terminate bots for now
     #terminate(players)
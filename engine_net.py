@@ -1,41 +1,448 @@
+import concurrent.futures
 import contextlib
 import json
 import socket
+import threading
 
 from board import CallAction, CheckAction, FoldAction, RaiseAction
-from netwire import recv_json, send_json
+from botstate import for_bot
+from eventlog import LOG
+from netwire import (
+    ConnectionClosed,
+    DeltaSender,
+    FrameReader,
+    address_str,
+    choose_encoding,
+    connect,
+    recv_message,
+    send_json,
+    send_message,
+)
 
 """
 Internal for communicating with bots.
+
+Bots that answer the "hello" op with {"keepalive": true} get one long-lived
+connection that carries every act/end message. Bots that don't (older bots
+reply with an error or an action) get a new connection per message, like
+before.
+
+A kept-alive connection can also use the compact binary encoding (netwire.py)
+if the engine is configured for it and the bot accepts it in its hello reply.
+The same goes for delta states: one full state per hand, then only changes
+(see DeltaSender in netwire.py).
+
+Several seats can share one bot process (the same address in config). By
+default their requests take turns on its connection. With mux the engine
+asks the bot to multiplex: every message names its table and seat, acts
+carry a request id the reply repeats, and replies may come back in any
+order, so tables played at the same time don't wait for each other.
+
+Bots can also subscribe (observe in their hello reply) to observe messages:
+what happens in each hand as it happens, pushed on the kept-alive connection
+with no reply (see HandObservers in engine.py).
+
+Bots are addressed by (host, port) over TCP, or (path, None) for a bot on a
+unix domain socket (see connect() in netwire.py).
 """
 
 
-def ask_bot_tcp(host, port, state, timeout_s=2.0):
+def action_from_wire(resp):
+    mv = resp.get("move")
+    if isinstance(mv, str):
+        mv = mv.strip().lower()
+    if mv == "raise":
+
+        def first_present(d, keys):
+            for k in keys:
+                if k in d and d[k] is not None:
+                    return d[k]
+            return None
+
+        amt = first_present(resp, ("amount", "raise_to", "value", "amt"))
+
+        return RaiseAction(int(amt))
+    if mv == "call":
+        return CallAction()
+    return FoldAction()
+
+
+def action_to_wire(action):
+    """The reply a bot in bots/ sends for an action (see _enum_to_wire there)."""
+    if isinstance(action, FoldAction):
+        return {"move": "fold"}
+    if isinstance(action, CheckAction):
+        return {"move": "check"}
+    if isinstance(action, CallAction):
+        return {"move": "call"}
+    if isinstance(action, RaiseAction):
+        return {"move": "raise", "amount": int(action.amount)}
+    return {"move": "fold"}
+
+
+class BotConnection:
+    """Connection to one bot, persistent if the bot supports it."""
+
+    def __init__(self, host, port, keepalive=True, encoding="json", delta=False, mux=False, observe=False):
+        # port None: host is a unix socket path
+        self.host = host
+        self.port = port
+        # None until negotiated, then True (persistent) or False (per message)
+        self.keepalive = None if keepalive else False
+        self.preferred_encoding = encoding
+        # encoding used on the persistent socket, per-message connections are JSON
+        self.encoding = "json"
+        self.want_delta = delta
+        # DeltaSender while the bot takes state deltas on the persistent socket
+        self.delta = None
+        self.want_mux = mux and keepalive
+        # True while the persistent socket is multiplexed: requests from every
+        # table go out as they come, a reader thread hands out the replies
+        self.mux = False
+        self.want_observe = observe and keepalive
+        # True once the bot subscribed to observe messages
+        self.observing = False
+        # multiplexed: (table, seat) -> DeltaSender, request id -> Future
+        self.deltas = {}
+        self.waiting = {}
+        self.next_id = 0
+        self.sock = None
+        # reads the persistent socket's frames into one reused buffer
+        self.reader = None
+        self.lock = threading.Lock()
+
+    def _open(self, timeout_s):
+        s = connect(self.host, self.port, timeout_s)
+        s.settimeout(timeout_s)
+        return s
+
+    def _negotiate(self, timeout_s, mux=False):
+        s = self._open(timeout_s)
+        try:
+            hello = {"op": "hello", "keepalive": True}
+            if self.preferred_encoding != "json":
+                hello["encodings"] = [self.preferred_encoding, "json"]
+            if self.want_delta:
+                hello["delta"] = True
+            if mux:
+                hello["mux"] = True
+            if self.want_observe:
+                hello["observe"] = True
+            send_json(s, hello)
+            resp = recv_message(s)
+        except (OSError, ConnectionError, ValueError):
+            s.close()
+            self.keepalive = False
+            self.mux = False
+            return
+        if isinstance(resp, dict) and resp.get("keepalive"):
+            self.sock = s
+            self.reader = FrameReader(s)
+            self.keepalive = True
+            self.encoding = choose_encoding([resp.get("encoding")], (self.preferred_encoding,))
+            self.delta = DeltaSender() if self.want_delta and resp.get("delta") else None
+            self.mux = bool(mux and resp.get("mux"))
+            self.observing = bool(self.want_observe and resp.get("observe"))
+            if self.mux:
+                threading.Thread(
+                    target=self._read_replies, args=(s, self.reader), daemon=True,
+                    name=f"mux-{address_str(self.host, self.port)}",
+                ).start()
+        else:
+            s.close()
+            self.keepalive = False
+            self.mux = False
+
+    def _stale(self):
+        """True if the bot closed the idle socket (or left unread bytes on it)."""
+        self.sock.setblocking(False)
+        try:
+            self.sock.recv(1, socket.MSG_PEEK)
+        except BlockingIOError:
+            return False
+        except OSError:
+            return True
+        return True
+
+    def _exchange(self, msg, timeout_s, reply):
+        """msg: the message, or a function(persistent) building it once the socket is known."""
+        build = msg if callable(msg) else lambda persistent: msg
+        if self.keepalive is None:
+            self._negotiate(timeout_s)
+        if not self.keepalive:
+            with contextlib.closing(self._open(timeout_s)) as s:
+                send_json(s, build(False))
+                return recv_message(s) if reply else None
+
+        # a kept-alive socket may have been closed by the bot since last use;
+        # if it fails before the bot could have read our message, reconnect once
+        if self.sock is not None and self._stale():
+            self.close()
+        for attempt in (0, 1):
+            fresh = self.sock is None
+            if fresh:
+                # the bot only keeps a connection open after a hello
+                self._negotiate(timeout_s)
+                if not self.keepalive:
+                    return self._exchange(build, timeout_s, reply)
+            self.sock.settimeout(timeout_s)
+            try:
+                send_message(self.sock, build(True), self.encoding)
+                return self.reader.recv() if reply else None
+            except ConnectionError as e:
+                self.close()
+                stale = isinstance(e, (ConnectionClosed, BrokenPipeError, ConnectionResetError))
+                if fresh or attempt or not stale:
+                    raise
+            except (OSError, ValueError):
+                # timeouts and bad frames leave the stream out of sync
+                self.close()
+                raise
+
+    """
+    Sends a message and waits for its reply, multiplexed if the bot agreed
+    to it: then the lock is only held while sending, so requests for other
+    tables go out (and their replies come back) while this one waits, and
+    a reply that comes too late is dropped without closing the connection.
+
+    @param build: function(persistent) building the message
+    @param session: (table, seat) the message is for
+    @param reply: False for messages with no reply
+
+    @return the reply, None if reply is False
+    """
+
+    def _call(self, build, timeout_s, reply, session=(None, None)):
+        with self.lock:
+            if self.keepalive is None or (self.mux and self.sock is None):
+                self._negotiate(timeout_s, mux=self.want_mux)
+            if not self.mux:
+                if self.observing and session != (None, None):
+                    # observe messages name their table, so acts and ends do too
+                    plain = build
+                    build = lambda p: {**plain(p), "table": session[0], "seat": session[1]}
+                return self._exchange(build, timeout_s, reply)
+            msg = dict(build(True))
+            msg["table"], msg["seat"] = session
+            future = None
+            if reply:
+                self.next_id += 1
+                msg["id"] = self.next_id
+                future = self.waiting[self.next_id] = concurrent.futures.Future()
+            try:
+                self.sock.settimeout(timeout_s)
+                send_message(self.sock, msg, self.encoding)
+            except (OSError, ValueError):
+                self.waiting.pop(msg.get("id"), None)
+                self.close()
+                raise
+        if future is None:
+            return None
+        try:
+            return future.result(timeout_s)
+        except concurrent.futures.TimeoutError:
+            self.waiting.pop(msg["id"], None)
+            raise socket.timeout("timed out") from None
+
+    def _read_replies(self, sock, reader):
+        # reader thread of a multiplexed socket: replies go to whoever waits for their id
+        error = None
+        while error is None:
+            try:
+                resp = reader.recv()
+            except socket.timeout:
+                continue  # idle, a frame cut short by it is picked up where it stopped
+            except (OSError, ValueError) as e:
+                error = e
+                break
+            future = self.waiting.pop(resp.get("id"), None) if isinstance(resp, dict) else None
+            if future is not None:
+                future.set_result(resp)
+        with self.lock:
+            if self.sock is sock:
+                self.close()
+
+    def _delta_for(self, session):
+        """The DeltaSender for a table's seat, None if the bot doesn't take deltas."""
+        if self.delta is None or not self.mux:
+            return self.delta
+        sender = self.deltas.get(session)
+        if sender is None:
+            sender = self.deltas[session] = DeltaSender()
+        return sender
+
+    def request(self, msg, timeout_s=2.0):
+        """Send a message and wait for the reply."""
+        return self._call(lambda p: msg, timeout_s, reply=True)
+
+    def act(self, state, timeout_s=2.0, session=(None, None)):
+        """Ask for an action, as a delta against the last state if the bot takes them."""
+        build = lambda p: self._act_message(state, p, session)
+        resp = self._call(build, timeout_s, True, session)
+        if isinstance(resp, dict) and resp.get("resync"):
+            delta = self._delta_for(session)
+            if delta is not None:
+                # the bot missed a message, send the full state instead
+                delta.reset()
+                resp = self._call(build, timeout_s, True, session)
+        return resp
+
+    def _act_message(self, state, persistent, session):
+        delta = self._delta_for(session) if persistent else None
+        if delta is not None:
+            return delta.message(state)
+        return {"op": "act", "state": state}
+
+    def send(self, msg, timeout_s=2.0, session=(None, None)):
+        """Send a message that gets no reply (end notifications)."""
+        if msg.get("op") == "end":
+            with self.lock:
+                delta = self._delta_for(session)
+                if delta is not None:
+                    # the hand is over, the next act starts from a full state
+                    delta.reset()
+        self._call(lambda p: msg, timeout_s, False, session)
+
+    def observe(self, msg, timeout_s=0.5):
+        """
+        Pushes an observe message to a subscribed bot, fire-and-forget: never
+        waits for the connection or opens one for it, and a bot that can't
+        take it just misses it (the connection is dropped if the send fails,
+        the next act opens a new one). Returns True if it was sent.
+        """
+        if not self.observing:
+            return False
+        # multiplexed, the lock is only held to send; otherwise it can be held
+        # for a whole act round trip of another table, so skip the message
+        if not self.lock.acquire(blocking=self.mux):
+            return False
+        try:
+            if self.sock is None:
+                return False
+            try:
+                self.sock.settimeout(timeout_s)
+                send_message(self.sock, msg, self.encoding)
+            except (OSError, ValueError):
+                self.close()
+                return False
+        finally:
+            self.lock.release()
+        return True
+
+    def close(self):
+        sock, self.sock = self.sock, None
+        if sock is not None:
+            self.reader = None
+            try:
+                if self.mux:
+                    sock.shutdown(socket.SHUT_RDWR)  # wakes up the reader thread
+                sock.close()
+            except OSError:
+                pass
+        if self.delta is not None:
+            self.delta.reset()
+        self.deltas.clear()
+        waiting, self.waiting = self.waiting, {}
+        for future in waiting.values():
+            future.set_exception(ConnectionError("connection closed"))
+
+
+class ConnectionPool:
+    """One BotConnection per bot address, shared by everything in the engine."""
+
+    def __init__(self, keepalive=True, encoding="json", delta=False, mux=False, observe=False):
+        self.keepalive = keepalive
+        self.encoding = encoding
+        self.delta = delta
+        self.mux = mux
+        self.observe = observe
+        self._conns = {}
+        self._lock = threading.Lock()
+
+    def get(self, host, port):
+        key = (host, int(port) if port is not None else None)
+        with self._lock:
+            conn = self._conns.get(key)
+            if conn is None:
+                conn = self._conns[key] = BotConnection(
+                    *key, self.keepalive, self.encoding, self.delta, self.mux, self.observe
+                )
+            return conn
+
+    def close_all(self):
+        with self._lock:
+            for conn in self._conns.values():
+                conn.close()
+            self._conns.clear()
+
+
+POOL = ConnectionPool()
+
+
+def request_action(host, port, state, timeout_s=2.0, pool=POOL, table=None, seat=None):
+    """Like ask_bot_tcp, but raises on timeouts, connection problems and bad replies."""
+    resp = pool.get(host, port).act(state, timeout_s, (table, seat))
+    #print(f"[wire] {address_str(host, port)} -> {resp!r}")
+    if not isinstance(resp, dict):
+        raise ValueError(f"bad reply {resp!r}")
     try:
-        with contextlib.closing(
-            socket.create_connection((host, port), timeout=timeout_s)
-        ) as s:
-            s.settimeout(timeout_s)
-            send_json(s, {"op": "act", "state": state})
-            resp = recv_json(s)
-            #print(f"[wire] {host}:{port} -> {resp!r}")
-            mv = resp.get("move")
-            if isinstance(mv, str):
-                mv = mv.strip().lower()
-            if mv == "raise":
-
-                def first_present(d, keys):
-                    for k in keys:
-                        if k in d and d[k] is not None:
-                            return d[k]
-                    return None
-
-                amt = first_present(resp, ("amount", "raise_to", "value", "amt"))
-
-                return RaiseAction(int(amt))
-            if mv == "call":
-                return CallAction()
-            return FoldAction()
+        return action_from_wire(resp)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"bad reply {resp!r}") from e
+
+
+def ask_bot_tcp(host, port, state, timeout_s=2.0, pool=POOL, table=None, seat=None):
+    try:
+        return request_action(host, port, state, timeout_s, pool, table, seat)
     except (OSError, ConnectionError, ValueError, json.JSONDecodeError) as e:
-        print(f"[WARN] bot {host}:{port} comms error: {e}")
+        LOG.warn("comms_error", "bot %s comms error: %s", address_str(host, port), e)
         return FoldAction()
+
+
+def notify_bot_tcp(host, port, msg, timeout_s=2.0, pool=POOL, table=None, seat=None):
+    """Fire-and-forget message to a bot, raises on connection problems."""
+    pool.get(host, port).send(msg, timeout_s, (table, seat))
+
+
+def observing_tcp(host, port, pool=POOL):
+    """True if the bot subscribed to observe messages on its kept-alive connection."""
+    return pool.observe and pool.get(host, port).observing
+
+
+def observe_bot_tcp(host, port, msg, pool=POOL):
+    return pool.get(host, port).observe(msg)
+
+
+"""
+In-process bots: any object with decide_action(state) and end_game(state),
+like PokerBot in bots/. They get what the bot server would give them, a
+botstate.BotState if they set `wants_state` and otherwise the JSON string
+(the dict for observe events), and their actions go through the same wire
+conversion as a TCP bot's, so a bot plays the same in-process as over TCP.
+"""
+
+
+def ask_bot_local(bot, state, table=None):
+    try:
+        action = bot.decide_action(for_bot(bot, state, as_json=True, table=table))
+    except Exception as e:
+        # a bot server folds when decide_action raises
+        LOG.warn("bot_error", "bot %s decide_action raised: %s", getattr(bot, "name", bot), e)
+        action = FoldAction()
+    return action_from_wire(action_to_wire(action))
+
+
+def notify_bot_local(bot, msg, table=None):
+    if msg.get("op") != "end":
+        return
+    try:
+        bot.end_game(for_bot(bot, msg.get("state", {}), as_json=True, table=table))
+    except Exception as e:
+        LOG.warn("bot_error", "bot %s end_game raised: %s", getattr(bot, "name", bot), e)
+
+
+def observe_bot_local(bot, msg):
+    try:
+        bot.on_observe(for_bot(bot, msg, seat=msg.get("seat")))
+    except Exception as e:
+        LOG.warn("bot_error", "bot %s on_observe raised: %s", getattr(bot, "name", bot), e)
@@ -0,0 +1,332 @@
+import math
+import random
+import time
+from collections import namedtuple
+from itertools import combinations
+
+from board import CARDS, Card, hand_strength
+
+try:
+    import numpy as np
+
+    from batch_eval import evaluate_hands_batch
+except ImportError:  # fall back to the scalar evaluator
+    np = None
+
+"""
+Equity estimates for bots.
+
+Deals random runouts and random opponent hands from the cards that are left
+and counts how often our hand wins or ties. With NumPy installed the runouts
+are dealt and scored in batches; without it the same simulation runs in a
+plain Python loop (slower, so expect fewer samples within a time budget).
+"""
+
+# win: P(we beat every opponent), tie: P(we tie for best),
+# equity: expected share of the pot, low/high: confidence interval for equity
+EquityResult = namedtuple("EquityResult", ["win", "tie", "equity", "low", "high", "samples"])
+
+
+def _card_ids(cards):
+    return [c.id if isinstance(c, Card) else int(c) for c in cards]
+
+
+"""
+Cards that can still be dealt: num_decks full decks minus the known cards
+(one copy removed per known card).
+
+@param known: cards we can see (our hand + board), Card objs or ids
+@param num_decks: decks in the shoe
+
+@return list of Card ids, with repeats when num_decks > 1
+"""
+
+
+def remaining_deck(known, num_decks=1):
+    counts = [num_decks] * len(CARDS)
+    for card_id in _card_ids(known):
+        if counts[card_id] > 0:
+            counts[card_id] -= 1
+    return [card_id for card_id, n in enumerate(counts) for _ in range(n)]
+
+
+def _result(total, total_sq, wins, ties, n, z):
+    equity = total / n
+    var = max(total_sq / n - equity * equity, 0.0)
+    half = z * math.sqrt(var / n)
+    return EquityResult(
+        win=wins / n,
+        tie=ties / n,
+        equity=equity,
+        low=max(0.0, equity - half),
+        high=min(1.0, equity + half),
+        samples=n,
+    )
+
+
+def _simulate_numpy(hand, board, deck, num_opponents, count, rng):
+    need_board = 5 - len(board)
+    need = need_board + 2 * num_opponents
+    # the `need` smallest of a row of random keys are `need` distinct deck
+    # positions; sorting them by key keeps which card goes where random too
+    keys = rng.random((count, len(deck)))
+    picks = keys.argpartition(need - 1, axis=1)[:, :need]
+    picks = np.take_along_axis(picks, np.take_along_axis(keys, picks, 1).argsort(axis=1), 1)
+    drawn = deck[picks]
+    boards = np.concatenate(
+        [np.broadcast_to(board, (count, len(board))), drawn[:, :need_board]], axis=1
+    )
+    hands = [np.broadcast_to(hand, (count, 2))]
+    for i in range(num_opponents):
+        start = need_board + 2 * i
+        hands.append(drawn[:, start : start + 2])
+    strengths = evaluate_hands_batch(
+        np.concatenate([np.concatenate([h, boards], axis=1) for h in hands], axis=0)
+    ).reshape(num_opponents + 1, count)
+
+    ours, theirs = strengths[0], strengths[1:]
+    best = theirs.max(axis=0)
+    won = ours > best
+    tied = ours == best
+    share = won + tied / ((theirs == ours).sum(axis=0) + 1)
+    return float(share.sum()), float((share * share).sum()), int(won.sum()), int(tied.sum())
+
+
+def _simulate_python(hand, board, deck, num_opponents, count, rng):
+    need_board = 5 - len(board)
+    need = need_board + 2 * num_opponents
+    hand = [CARDS[i] for i in hand]
+    board = [CARDS[i] for i in board]
+    deck = [CARDS[i] for i in deck]
+    total = total_sq = 0.0
+    wins = ties = 0
+    for _ in range(count):
+        drawn = rng.sample(deck, need)
+        full_board = board + drawn[:need_board]
+        ours = hand_strength(hand + full_board)
+        theirs = [
+            hand_strength(drawn[need_board + 2 * i : need_board + 2 * i + 2] + full_board)
+            for i in range(num_opponents)
+        ]
+        best = max(theirs)
+        if ours > best:
+            share = 1.0
+            wins += 1
+        elif ours == best:
+            share = 1.0 / (theirs.count(ours) + 1)
+            ties += 1
+        else:
+            share = 0.0
+        total += share
+        total_sq += share * share
+    return total, total_sq, wins, ties
+
+
+"""
+Estimates our chance of winning against random opponent hands.
+
+@param hand: our 2 hole cards (Card objs or ids)
+@param board: community cards so far (0, 3, 4 or 5 cards)
+@param num_opponents: opponents still in the hand
+@param samples: maximum number of runouts to simulate
+@param time_budget: optional seconds to stop after (at least one batch always runs)
+@param deck: cards that can still be dealt (ids or Cards, repeats allowed for
+             multi-deck shoes). Defaults to one deck minus hand and board.
+@param rng: numpy Generator (or random.Random without numpy), for repeatable runs
+@param batch: runouts simulated per batch
+@param z: z-score of the confidence interval (1.96 = 95%)
+
+@return EquityResult
+"""
+
+
+def estimate_equity(
+    hand,
+    board=(),
+    num_opponents=1,
+    samples=2000,
+    time_budget=None,
+    deck=None,
+    rng=None,
+    batch=500,
+    z=1.96,
+):
+    hand = _card_ids(hand)
+    board = _card_ids(board)
+    num_opponents = max(1, int(num_opponents))
+    if len(hand) != 2 or len(board) > 5:
+        raise ValueError("need 2 hole cards and at most 5 board cards")
+    deck = remaining_deck(hand + board) if deck is None else _card_ids(deck)
+    if len(deck) < 5 - len(board) + 2 * num_opponents:
+        raise ValueError("not enough cards left to deal")
+
+    if np is not None:
+        simulate = _simulate_numpy
+        hand, board, deck = (np.asarray(x, dtype=np.int32) for x in (hand, board, deck))
+        rng = rng if rng is not None else np.random.default_rng()
+    else:
+        simulate = _simulate_python
+        rng = rng if rng is not None else random.Random()
+
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    total = total_sq = 0.0
+    wins = ties = n = 0
+    while n < samples:
+        count = min(batch, samples - n)
+        t, t_sq, w, ti = simulate(hand, board, deck, num_opponents, count, rng)
+        total += t
+        total_sq += t_sq
+        wins += w
+        ties += ti
+        n += count
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+    return _result(total, total_sq, wins, ties, n, z)
+
+
+"""
+Exact equity by enumerating every way the rest of the hand can be dealt.
+
+Opponent hands are either given (`opponents`, only the board is enumerated)
+or unknown (every hole card combination for each of `num_opponents` is
+enumerated too). The number of deals grows fast: heads-up with unknown hands
+is fine from the flop on, multiway or preflop spots usually need
+estimate_equity or the preflop table (preflop.py) instead.
+
+@param hand: our 2 hole cards (Card objs or ids)
+@param board: community cards so far
+@param num_opponents: opponents with unknown hands (ignored if `opponents` given)
+@param opponents: optional list of known opponent hands
+@param deck: cards that can still be dealt, defaults to one deck minus known cards
+@param max_deals: refuse (ValueError) to enumerate more deals than this
+
+@return EquityResult, with low == high == equity and samples = deals enumerated
+"""
+
+
+def exact_equity(hand, board=(), num_opponents=1, opponents=None, deck=None, max_deals=2_000_000):
+    hand = _card_ids(hand)
+    board = _card_ids(board)
+    known = [_card_ids(h) for h in opponents] if opponents else []
+    num_unknown = 0 if known else max(1, int(num_opponents))
+    if len(hand) != 2 or len(board) > 5 or any(len(h) != 2 for h in known):
+        raise ValueError("need 2 hole cards per hand and at most 5 board cards")
+    if deck is None:
+        deck = remaining_deck(hand + board + [c for h in known for c in h])
+    else:
+        deck = _card_ids(deck)
+
+    need_board = 5 - len(board)
+    deals = math.comb(len(deck), need_board)
+    left = len(deck) - need_board
+    for _ in range(num_unknown):
+        deals *= math.comb(left, 2)
+        left -= 2
+    # opponents are interchangeable, each set of hole cards is dealt once
+    deals //= math.factorial(num_unknown)
+    if left < 0 or deals == 0:
+        raise ValueError("not enough cards left to deal")
+    if deals > max_deals:
+        raise ValueError(f"{deals} deals is too many to enumerate, use estimate_equity")
+
+    enumerate_deals = _exact_numpy if np is not None else _exact_python
+    total, total_sq, wins, ties, n = enumerate_deals(hand, board, known, deck, num_unknown)
+    return _result(total, total_sq, wins, ties, n, 0.0)
+
+
+def _exact_python(hand, board, known, deck, num_unknown):
+    need_board = 5 - len(board)
+    hand = [CARDS[i] for i in hand]
+    board = [CARDS[i] for i in board]
+    known = [[CARDS[i] for i in h] for h in known]
+    total = total_sq = 0.0
+    wins = ties = n = 0
+
+    def hole_cards(free, k, after=-1):
+        # every set of k hands from the free deck positions, in order of
+        # their first card so each set comes up once
+        if k == 0:
+            yield []
+            return
+        for pair in combinations(free, 2):
+            if pair[0] <= after:
+                continue
+            rest = [p for p in free if p not in pair]
+            for more in hole_cards(rest, k - 1, pair[0]):
+                yield [pair] + more
+
+    for runout in combinations(range(len(deck)), need_board):
+        full_board = board + [CARDS[deck[p]] for p in runout]
+        ours = hand_strength(hand + full_board)
+        fixed = [hand_strength(h + full_board) for h in known]
+        free = [p for p in range(len(deck)) if p not in runout]
+        for pairs in hole_cards(free, num_unknown):
+            theirs = fixed + [
+                hand_strength([CARDS[deck[a]], CARDS[deck[b]]] + full_board) for a, b in pairs
+            ]
+            best = max(theirs)
+            share = 0.0
+            if ours > best:
+                share = 1.0
+                wins += 1
+            elif ours == best:
+                share = 1.0 / (theirs.count(ours) + 1)
+                ties += 1
+            total += share
+            total_sq += share * share
+            n += 1
+    return total, total_sq, wins, ties, n
+
+
+def _exact_numpy(hand, board, known, deck, num_unknown, chunk_cells=4_000_000):
+    deck = np.asarray(deck, dtype=np.int32)
+    m = len(deck)
+    need_board = 5 - len(board)
+    # rows of deck positions: runout first, then 2 per unknown opponent
+    deals = np.array(list(combinations(range(m), need_board)), dtype=np.int32)
+    deals = deals.reshape(math.comb(m, need_board), need_board)
+    pairs = np.array(list(combinations(range(m), 2)), dtype=np.int32)
+    chunks = [deals]
+    for i in range(num_unknown):
+        grown = []
+        for rows in chunks:
+            step = max(1, chunk_cells // (len(pairs) * max(1, rows.shape[1]) * 2))
+            for start in range(0, len(rows), step):
+                part = rows[start : start + step]
+                clash = (part[:, None, :, None] == pairs[None, :, None, :]).any(axis=(2, 3))
+                if i > 0:
+                    # keep opponents in order of their first card, see _exact_python
+                    clash |= pairs[None, :, 0] <= part[:, -2, None]
+                r, p = np.nonzero(~clash)
+                grown.append(np.concatenate([part[r], pairs[p]], axis=1))
+        chunks = grown
+
+    total = total_sq = 0.0
+    wins = ties = n = 0
+    hand = np.asarray(hand, dtype=np.int32)
+    board = np.asarray(board, dtype=np.int32)
+    for rows in chunks:
+        count = len(rows)
+        if count == 0:
+            continue
+        cards = deck[rows]
+        boards = np.concatenate(
+            [np.broadcast_to(board, (count, len(board))), cards[:, :need_board]], axis=1
+        )
+        hands = [np.broadcast_to(hand, (count, 2))]
+        hands += [np.broadcast_to(np.asarray(h, dtype=np.int32), (count, 2)) for h in known]
+        hands += [cards[:, need_board + 2 * i : need_board + 2 * i + 2] for i in range(num_unknown)]
+        strengths = evaluate_hands_batch(
+            np.concatenate([np.concatenate([h, boards], axis=1) for h in hands], axis=0)
+        ).reshape(len(hands), count)
+        ours, theirs = strengths[0], strengths[1:]
+        best = theirs.max(axis=0)
+        won = ours > best
+        tied = ours == best
+        share = won + tied / ((theirs == ours).sum(axis=0) + 1)
+        total += float(share.sum())
+        total_sq += float((share * share).sum())
+        wins += int(won.sum())
+        ties += int(tied.sum())
+        n += count
+    return total, total_sq, wins, ties, n
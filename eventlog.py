@@ -0,0 +1,113 @@
+import atexit
+import contextlib
+import json
+import sys
+import threading
+import time
+
+"""
+Leveled, buffered event log for the engine.
+
+Every line the engine used to print() is now an event with a level and a
+name ("deal", "action", "blind", "winner", ...). Events below the log level
+are dropped before their message is formatted, the rest are kept in a buffer
+and written out in one go every `buffer_size` events, at the end of each
+hand, and right away for warnings. Optionally every event is also written as
+a JSON line to a second file, for tools.
+
+Levels: DEBUG is the per-action detail (deals, actions, blinds, stacks),
+INFO the per-hand/table/tier results, WARN problems with bots or the deck.
+"""
+
+DEBUG, INFO, WARN, ERROR, OFF = 10, 20, 30, 40, 100
+LEVELS = {"debug": DEBUG, "info": INFO, "warn": WARN, "error": ERROR, "off": OFF}
+_LEVEL_NAMES = {v: k for k, v in LEVELS.items()}
+
+
+class EventLog:
+    def __init__(self, stream=None, level=DEBUG, buffer_size=256, events=None):
+        # stream None means whatever sys.stdout is when the buffer is written
+        self.stream = stream
+        self.level = level
+        self.buffer_size = buffer_size
+        # optional file obj for JSON lines
+        self.events = events
+        self._records = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def enabled(self, level):
+        """For callers that want to skip building expensive arguments."""
+        return level >= self.level
+
+    def log(self, level, event, msg, *args):
+        if level < self.level:
+            return
+        record = (time.time(), level, event, msg % args if args else msg)
+        captured = getattr(self._local, "records", None)
+        if captured is not None:
+            captured.append(record)
+            return
+        with self._lock:
+            self._records.append(record)
+            if level >= WARN or len(self._records) >= self.buffer_size:
+                self._write_locked()
+
+    def debug(self, event, msg, *args):
+        self.log(DEBUG, event, msg, *args)
+
+    def info(self, event, msg, *args):
+        self.log(INFO, event, msg, *args)
+
+    def warn(self, event, msg, *args):
+        self.log(WARN, event, msg, *args)
+
+    def error(self, event, msg, *args):
+        self.log(ERROR, event, msg, *args)
+
+    def flush(self):
+        with self._lock:
+            self._write_locked()
+
+    def _write_locked(self):
+        if not self._records:
+            return
+        records, self._records = self._records, []
+        stream = self.stream or sys.stdout
+        stream.write("".join(text + "\n" for _, _, _, text in records))
+        stream.flush()
+        if self.events is not None:
+            self.events.write(
+                "".join(
+                    json.dumps({"t": t, "level": _LEVEL_NAMES.get(lvl, lvl), "event": ev, "msg": text})
+                    + "\n"
+                    for t, lvl, ev, text in records
+                )
+            )
+            self.events.flush()
+
+    @contextlib.contextmanager
+    def capture(self):
+        """
+        Collects this thread's events in a list instead of writing them, so
+        tables played on other threads can be written out in table order
+        with emit().
+        """
+        records = []
+        prev = getattr(self._local, "records", None)
+        self._local.records = records
+        try:
+            yield records
+        finally:
+            self._local.records = prev
+
+    def emit(self, records):
+        """Writes events collected by capture()."""
+        with self._lock:
+            self._records.extend(records)
+            self._write_locked()
+
+
+# the engine's log, configured from config.json in engine.py
+LOG = EventLog()
+atexit.register(LOG.flush)
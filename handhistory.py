@@ -0,0 +1,220 @@
+import argparse
+import atexit
+import json
+import struct
+import sys
+import threading
+import time
+
+from netwire import decode_payload, encode_payload
+
+"""
+Hand history: every hand the engine plays, streamed to an append-only file.
+
+File layout: a header (HISTORY_MAGIC, HISTORY_VERSION), then records, each a
+4-byte big-endian length followed by the record in netwire's binary encoding
+(card strings, action names and the common keys take a byte each). Records
+are dicts with a "type":
+
+    "tournament"  written when a tournament starts: time, seed, players
+                  (in config order), starting_chips, num_decks, max_players,
+                  config (the "tournament" section of config.json)
+    "hand"        one per hand played:
+        tier, table, table_hand (hand number at that table), time,
+        small_blind, big_blind, num_decks,
+        seats:   [{"name", "chips" (before blinds), "hand" (["AH", "KD"] or [])}]
+                 in seat order, the small blind first
+        actions: [street, seat, move, amount], street 0..3 (preflop..river),
+                 move one of small_blind, big_blind, check, call, raise, fold,
+                 error (the bot didn't answer and was folded), amount the
+                 chips the move put in the pot; raises add the total bet
+                 the bot asked for: [street, seat, "raise", amount, to]
+        board:   ["8H", "5S", "9D", ...]
+        awards:  [[seat, chips], ...]
+        reason:  how the hand ended: "early" (everyone else folded),
+                 "showdown", "last standing" or "no_players_left"
+
+Writes are buffered and flushed every `flush_every` records or
+`flush_interval` seconds, and at exit. A file cut short by a crash is read up
+to its last complete record.
+
+Read it lazily, record by record:
+    for hand in read_hands("history.phh"):
+        ...
+or dump it as JSON lines:
+    python handhistory.py history.phh --type hand --limit 10
+"""
+
+HISTORY_MAGIC = b"PBHH"
+HISTORY_VERSION = 1
+_HEADER = struct.Struct(">4sB")
+_LENGTH = struct.Struct(">I")
+
+STREETS = ("preflop", "flop", "turn", "river")
+
+
+class HandRecord:
+    """Collects one hand while it is played, see the module docstring for the fields."""
+
+    def __init__(self, players, blinds, num_decks, tier=None, table=None, table_hand=None):
+        self.seats = {p.name: i for i, p in enumerate(players)}
+        self.data = {
+            "type": "hand",
+            "tier": tier,
+            "table": table,
+            "table_hand": table_hand,
+            "time": time.time(),
+            "small_blind": blinds[0],
+            "big_blind": blinds[1],
+            "num_decks": num_decks,
+            # blinds are already paid when the hand is recorded, add them back
+            "seats": [{"name": p.name, "chips": p.chips + p.curr_bet, "hand": []} for p in players],
+            "actions": [],
+            "board": [],
+            "awards": [],
+            "reason": None,
+        }
+        blind_moves = iter(("small_blind", "big_blind"))
+        for p in players:
+            if p.curr_bet:
+                self.action(0, p, next(blind_moves, "big_blind"), p.curr_bet)
+
+    def deal(self, player):
+        self.data["seats"][self.seats[player.name]]["hand"] = [c.short_str() for c in player.hand]
+
+    def action(self, street, player, move, amount=0, to=None):
+        if isinstance(street, str):
+            street = STREETS.index(street)
+        entry = [street, self.seats[player.name], move, amount]
+        if to is not None:
+            entry.append(to)
+        self.data["actions"].append(entry)
+
+    def award(self, player, chips):
+        self.data["awards"].append([self.seats[player.name], chips])
+
+    def finish(self, board, reason):
+        self.data["board"] = [c.short_str() for c in board]
+        self.data["reason"] = reason
+        return self.data
+
+
+class HandHistoryWriter:
+    """Thread safe, tables running concurrently write to the same file."""
+
+    def __init__(self, path=None, flush_every=64, flush_interval=5.0):
+        self.path = None
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._file = None
+        self._buffer = bytearray()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        if path:
+            self.open(path)
+
+    @property
+    def enabled(self):
+        return self._file is not None
+
+    def open(self, path):
+        self.close()
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(_HEADER.pack(HISTORY_MAGIC, HISTORY_VERSION))
+        self.path = path
+
+    def write(self, record):
+        if self._file is None:
+            return
+        data = encode_payload(record, "binary")
+        with self._lock:
+            self._buffer += _LENGTH.pack(len(data))
+            self._buffer += data
+            self._pending += 1
+            if (
+                self._pending >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            ):
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._file is not None and self._buffer:
+            self._file.write(self._buffer)
+            self._file.flush()
+        self._buffer = bytearray()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+"""
+Reads a hand history file one record at a time, never holding more than one
+record in memory.
+
+@param path: hand history file
+@param types: only yield records of these types, default all
+
+@return generator of record dicts
+"""
+
+
+def read_records(path, types=None):
+    with open(path, "rb") as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            return
+        magic, version = _HEADER.unpack(header)
+        if magic != HISTORY_MAGIC:
+            raise ValueError(f"{path} is not a hand history file")
+        if version != HISTORY_VERSION:
+            raise ValueError(f"unsupported hand history version {version}")
+        while True:
+            hdr = f.read(_LENGTH.size)
+            if len(hdr) < _LENGTH.size:
+                return
+            n = _LENGTH.unpack(hdr)[0]
+            data = f.read(n)
+            if len(data) < n:
+                return  # cut short while writing
+            record = decode_payload(data)
+            if types is None or record.get("type") in types:
+                yield record
+
+
+def read_hands(path):
+    return read_records(path, types=("hand",))
+
+
+# the engine's recorder, opened from config.json in engine.py
+HISTORY = HandHistoryWriter()
+atexit.register(HISTORY.flush)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Print a hand history file as JSON lines.")
+    ap.add_argument("path")
+    ap.add_argument("--type", dest="types", action="append", help="only records of this type (repeatable)")
+    ap.add_argument("--limit", type=int, default=0, help="stop after this many records")
+    args = ap.parse_args()
+
+    for i, record in enumerate(read_records(args.path, args.types)):
+        if args.limit and i >= args.limit:
+            break
+        sys.stdout.write(json.dumps(record) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
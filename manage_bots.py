@@ -21,12 +21,23 @@ REPO_ROOT = pathlib.Path(__file__).resolve().parent
 sys.path.append(str(REPO_ROOT))  # so we can import netwire from repo root
 
 try:
-    from netwire import recv_json, send_json
+    from netwire import address_str, connect, recv_json, send_json
 except Exception:
     # minimal fallback terminate sender if import fails
     import json as _json
     import struct
 
+    def address_str(host, port):
+        return f"unix:{host}" if port is None else f"{host}:{port}"
+
+    def connect(host, port, timeout=None):
+        if port is not None:
+            return socket.create_connection((host, int(port)), timeout=timeout)
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        s.settimeout(timeout)
+        s.connect(host)
+        return s
+
     def _send_all(sock, b):
         view = memoryview(b)
         while view:
@@ -52,6 +63,13 @@ def resolve_path(base_cfg, maybe_rel):
     return str((pathlib.Path(base_cfg).parent / p).resolve())
 
 
+def bot_address(bot, cfg_path):
+    """(host, port) of a bot entry, or (socket path, None) for one with "unix"."""
+    if bot.get("unix"):
+        return resolve_path(cfg_path, bot["unix"]), None
+    return bot.get("host", "127.0.0.1"), int(bot.get("port", 0) or 0)
+
+
 def load_config(path):
     with open(path, "r", encoding="utf-8") as f:
         cfg = json.load(f)
@@ -175,11 +193,16 @@ def build_bot_cmd(bot, cfg_path):
     - "path": path to a python script
     - "module": python module to run with -m
     If none provided, falls back to repo's `bots/simple_bot.py`.
+    The bot gets --host/--port, or --unix PATH if the entry has "unix".
     """
     py = sys.executable or "python3"
     name = bot.get("name", "Bot")
     host = bot.get("host", "127.0.0.1")
     port = int(bot.get("port", 5001))
+    if bot.get("unix"):
+        where = ["--unix", resolve_path(cfg_path, bot["unix"])]
+    else:
+        where = ["--host", host, "--port", port]
 
     # 1) raw command string
     cmd = bot.get("cmd")
@@ -192,17 +215,17 @@ def build_bot_cmd(bot, cfg_path):
     if exe:
         exe_path = resolve_path(cfg_path, exe)
         if exe_path and os.path.isfile(exe_path) and os.access(exe_path, os.X_OK):
-            return shell_join([exe_path, "--name", name, "--host", host, "--port", port])
+            return shell_join([exe_path, "--name", name, *where])
 
     # 3) python script path
     path = resolve_path(cfg_path, bot.get("path"))
     if path and os.path.isfile(path):
-        return shell_join([py, path, "--name", name, "--host", host, "--port", port])
+        return shell_join([py, path, "--name", name, *where])
 
     # 4) python module
     module = bot.get("module")
     if module:
-        return shell_join([py, "-m", module, "--name", name, "--host", host, "--port", port])
+        return shell_join([py, "-m", module, "--name", name, *where])
 
     # If we reach here, we couldn't determine a runnable command
     raise ValueError(
@@ -212,9 +235,7 @@ def build_bot_cmd(bot, cfg_path):
 
 def ping(host, port, timeout=0.5):
     try:
-        with contextlib.closing(
-            socket.create_connection((host, int(port)), timeout=timeout)
-        ):
+        with contextlib.closing(connect(host, port, timeout=timeout)):
             return True
     except OSError:
         return False
@@ -222,9 +243,7 @@ def ping(host, port, timeout=0.5):
 
 def terminate(host, port, timeout=1.0):
     try:
-        with contextlib.closing(
-            socket.create_connection((host, int(port)), timeout=timeout)
-        ) as s:
+        with contextlib.closing(connect(host, port, timeout=timeout)) as s:
             send_json(s, {"op": "terminate"})
         return True
     except OSError:
@@ -240,8 +259,8 @@ def cmd_start(args):
         n = b.get("name", "Bot")
         if names and n not in names:
             continue
-        host, port = b.get("host", "127.0.0.1"), int(b.get("port", 0) or 0)
-        if port <= 0:
+        host, port = bot_address(b, args.config)
+        if port is not None and port <= 0:
             print(f"skip {n}: missing/invalid port")
             continue
         try:
@@ -256,7 +275,7 @@ def cmd_start(args):
         return
     print("Started:")
     for n, h, p, where in started:
-        print(f" - {n} @ {h}:{p} -> {where}")
+        print(f" - {n} @ {address_str(h, p)} -> {where}")
 
 
 def cmd_status(args):
@@ -264,13 +283,12 @@ def cmd_status(args):
     print("Status:")
     for b in bots:
         n = b.get("name", "Bot")
-        h = b.get("host", "127.0.0.1")
-        p = int(b.get("port", 0) or 0)
-        if p <= 0:
+        h, p = bot_address(b, args.config)
+        if p is not None and p <= 0:
             print(f" - {n}: invalid port")
             continue
         up = ping(h, p)
-        print(f" - {n} @ {h}:{p}: {'UP' if up else 'DOWN'}")
+        print(f" - {n} @ {address_str(h, p)}: {'UP' if up else 'DOWN'}")
 
 
 def cmd_stop(args):
@@ -281,9 +299,9 @@ def cmd_stop(args):
         n = b.get("name", "Bot")
         if names and n not in names:
             continue
-        h, p = b.get("host", "127.0.0.1"), int(b.get("port", 0) or 0)
+        h, p = bot_address(b, args.config)
         ok = terminate(h, p)
-        print(f" - stop {n} @ {h}:{p}: {'OK' if ok else 'no response'}")
+        print(f" - stop {n} @ {address_str(h, p)}: {'OK' if ok else 'no response'}")
         any_hit = True
     if not any_hit:
         print("No matching bots to stop (check --name).")
@@ -293,9 +311,9 @@ def cmd_stop_all(args):
     bots = load_config(args.config)
     for b in bots:
         n = b.get("name", "Bot")
-        h, p = b.get("host", "127.0.0.1"), int(b.get("port", 0) or 0)
+        h, p = bot_address(b, args.config)
         ok = terminate(h, p)
-        print(f" - stop {n} @ {h}:{p}: {'OK' if ok else 'no response'}")
+        print(f" - stop {n} @ {address_str(h, p)}: {'OK' if ok else 'no response'}")
 
 
 def main():
@@ -0,0 +1,225 @@
+import json
+import math
+import os
+import threading
+import time
+
+"""
+Per-bot response metrics for the engine.
+
+The engine records how long every bot takes to answer an act request, per
+street, in fixed-bucket histograms, and counts timeouts, connection failures,
+bad replies and auto-folds (folds the engine made for the bot). The totals are
+printed as a report at the end of a tournament and can be written to a file
+while it runs, as JSON (path ending in .json) or Prometheus text format.
+"""
+
+STREETS = ("preflop", "flop", "turn", "river")
+
+# histogram bucket upper bounds in seconds, the last one catches the rest
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, math.inf)
+
+COUNTERS = ("timeouts", "connection_failures", "bad_replies", "autofolds")
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        i = 0
+        while seconds > BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.total += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def merge(self, other):
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.total += other.total
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q):
+        """Estimate, interpolated inside the bucket like Prometheus' histogram_quantile."""
+        if self.total == 0:
+            return 0.0
+        rank = q * self.total
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = min(BUCKETS[i], self.max)
+                return lower + (upper - lower) * max(0.0, rank - seen) / n
+            seen += n
+        return self.max
+
+    def to_dict(self):
+        return {
+            "buckets": {_le(b): n for b, n in zip(BUCKETS, self.counts)},
+            "count": self.total,
+            "sum": self.sum,
+            "max": self.max,
+        }
+
+
+def _le(bound):
+    return "+Inf" if bound == math.inf else repr(bound)
+
+
+class BotMetrics:
+    def __init__(self):
+        self.latency = {street: Histogram() for street in STREETS}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        # slowest answer as a fraction of the timeout it had
+        self.max_timeout_fraction = 0.0
+
+    def all_streets(self):
+        total = Histogram()
+        for hist in self.latency.values():
+            total.merge(hist)
+        return total
+
+
+class MetricsRegistry:
+    """Thread safe, tables running concurrently record into the same registry."""
+
+    def __init__(self, path=None, interval=10.0):
+        self.path = path
+        self.interval = interval
+        self.bots = {}
+        self._lock = threading.Lock()
+        # one writer at a time, they share the tmp file
+        self._write_lock = threading.Lock()
+        self._last_write = time.monotonic()
+
+    def _bot(self, name):
+        bot = self.bots.get(name)
+        if bot is None:
+            bot = self.bots[name] = BotMetrics()
+        return bot
+
+    def observe(self, name, street, seconds, timeout_s=None):
+        """A bot answered an act request on `street` after `seconds`."""
+        with self._lock:
+            bot = self._bot(name)
+            bot.latency.setdefault(street, Histogram()).observe(seconds)
+            if timeout_s:
+                bot.max_timeout_fraction = max(bot.max_timeout_fraction, seconds / timeout_s)
+
+    def count(self, name, counter, n=1):
+        with self._lock:
+            self._bot(name).counters[counter] += n
+
+    def failure(self, name, error):
+        """Counts a failed act request by the kind of error."""
+        if isinstance(error, TimeoutError):
+            self.count(name, "timeouts")
+        elif isinstance(error, (ConnectionError, OSError)):
+            self.count(name, "connection_failures")
+        else:
+            self.count(name, "bad_replies")
+
+    def reset(self):
+        with self._lock:
+            self.bots.clear()
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                name: {
+                    "latency": {street: h.to_dict() for street, h in bot.latency.items()},
+                    "counters": dict(bot.counters),
+                    "max_timeout_fraction": bot.max_timeout_fraction,
+                }
+                for name, bot in sorted(self.bots.items())
+            }
+
+    def to_prometheus(self):
+        lines = [
+            "# HELP poker_bot_response_seconds Time for a bot to answer an act request.",
+            "# TYPE poker_bot_response_seconds histogram",
+        ]
+        data = self.to_dict()
+        for name, bot in data.items():
+            for street, hist in bot["latency"].items():
+                labels = f'bot="{_escape(name)}",street="{street}"'
+                cumulative = 0
+                for le, n in hist["buckets"].items():
+                    cumulative += n
+                    lines.append(f'poker_bot_response_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f"poker_bot_response_seconds_sum{{{labels}}} {hist['sum']!r}")
+                lines.append(f"poker_bot_response_seconds_count{{{labels}}} {hist['count']}")
+        for counter in COUNTERS:
+            metric = f"poker_bot_{counter}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for name, bot in data.items():
+                lines.append(f'{metric}{{bot="{_escape(name)}"}} {bot["counters"][counter]}')
+        lines.append("# TYPE poker_bot_max_timeout_fraction gauge")
+        for name, bot in data.items():
+            lines.append(f'poker_bot_max_timeout_fraction{{bot="{_escape(name)}"}} {bot["max_timeout_fraction"]!r}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path=None):
+        """Writes the metrics file (JSON for .json paths, else Prometheus text)."""
+        with self._write_lock:
+            self._write(path or self.path)
+
+    def maybe_write(self):
+        """Writes the metrics file if `interval` seconds passed since the last write."""
+        if not self.path:
+            return
+        # due check and write under one lock, concurrent tables share the tmp file
+        with self._write_lock:
+            if time.monotonic() - self._last_write >= self.interval:
+                self._write(self.path)
+
+    def _write(self, path):
+        if not path:
+            return
+        if path.endswith(".json"):
+            text = json.dumps({"time": time.time(), "bots": self.to_dict()}, indent=2)
+        else:
+            text = self.to_prometheus()
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)  # readers never see a half written file
+        self._last_write = time.monotonic()
+
+    def report(self):
+        lines = [
+            f"{'bot':16s} {'acts':>6s} {'p50 ms':>8s} {'p95 ms':>8s} {'max ms':>8s} {'max/to':>7s}"
+            f" {'timeout':>7s} {'conn':>5s} {'bad':>4s} {'autofold':>8s}"
+        ]
+        with self._lock:
+            for name, bot in sorted(self.bots.items()):
+                hist = bot.all_streets()
+                c = bot.counters
+                lines.append(
+                    f"{name[:16]:16s} {hist.total:6d} {hist.quantile(0.5) * 1e3:8.1f}"
+                    f" {hist.quantile(0.95) * 1e3:8.1f} {hist.max * 1e3:8.1f}"
+                    f" {bot.max_timeout_fraction:7.0%} {c['timeouts']:7d} {c['connection_failures']:5d}"
+                    f" {c['bad_replies']:4d} {c['autofolds']:8d}"
+                )
+                streets = "  ".join(
+                    f"{street} {h.quantile(0.5) * 1e3:.1f}/{h.quantile(0.95) * 1e3:.1f}"
+                    for street, h in bot.latency.items()
+                    if h.total
+                )
+                if streets:
+                    lines.append(f"{'':16s}   p50/p95 ms by street: {streets}")
+        return "\n".join(lines)
+
+
+def _escape(label):
+    return label.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# the engine's registry, configured from config.json in engine.py
+METRICS = MetricsRegistry()
@@ -1,31 +1,557 @@
 import json
+import os
 import socket
 import struct
 
 """
 Internal wire format for communicating with bots.
+
+Every message is a 4-byte big-endian length followed by the payload. The
+payload is UTF-8 JSON by default. Bots can also agree (see the "hello" op in
+the README) to the compact binary encoding below, which is told apart from
+JSON by its first byte, so receivers accept either without knowing which
+was negotiated.
+
+Binary payload: BINARY_MAGIC, then one tagged value:
+    0x00-0x3f           int 0..63
+    0x40 / 0x41 / 0x42  null / false / true
+    0x43 <varint>       any other int (zigzag)
+    0x44 <8 bytes>      float (big-endian double)
+    0x45 <varint> <..>  string (UTF-8)
+    0x46 <varint> ...   list of n values
+    0x47 <varint> ...   dict of n key, value pairs (keys are strings)
+    0x48 <id>           card dict {"suit": .., "rank": ..}
+    0x49 <id>           short card string ("AH")
+    0x80-0xff           string number n of WIRE_STRINGS
+Decoding gives back exactly what JSON would (tuples become lists).
 """
 
-def send_json(sock, obj):
-    data = json.dumps(obj, separators=(",", ":")).encode("utf-8")
-    sock.sendall(struct.pack(">I", len(data)) + data)
+ENCODINGS = ("json", "binary")
+
+BINARY_MAGIC = 0xB1
+
+# common keys and values, index = tag - 0x80; append only, bots share this table
+WIRE_STRINGS = (
+    "op", "state", "act", "end", "hello", "terminate", "ok", "error",
+    "keepalive", "encodings", "encoding", "json", "binary", "move", "amount",
+    "fold", "call", "check", "raise", "board", "hand", "num_decks", "pot",
+    "curr_bet", "player_curr_bet", "small_blind", "big_blind", "players",
+    "chips", "last_action", "position", "winner", "is_end_state", "reset_deck",
+    "can_check", "suit", "rank", "seq", "delta", "resync", "last_move",
+    "moves", "mux", "id", "table", "seat", "observe", "event", "player",
+    "street", "stacks", "in_hand",
+)
+_STRING_TAGS = {s: 0x80 + i for i, s in enumerate(WIRE_STRINGS)}
+
+_NONE, _FALSE, _TRUE, _INT, _FLOAT, _STR, _LIST, _DICT, _CARD, _SHORT_CARD = range(0x40, 0x4A)
+_DOUBLE = struct.Struct(">d")
+
+_card_tables = None
+
+
+class ConnectionClosed(ConnectionError):
+    """The peer closed the connection cleanly, between messages."""
+
+
+def _cards():
+    # board imports netwire, so look the cards up on first use
+    global _card_tables
+    if _card_tables is None:
+        from board import CARDS
+
+        _card_tables = (
+            {(c.suit, c.rank): c.id for c in CARDS},
+            {c.short_str(): c.id for c in CARDS},
+            [(c.suit, c.rank) for c in CARDS],
+            [c.short_str() for c in CARDS],
+        )
+    return _card_tables
+
+
+def _varint(out, n):
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _encode(out, obj, card_ids, short_ids):
+    if isinstance(obj, str):
+        tag = _STRING_TAGS.get(obj)
+        if tag is not None:
+            out.append(tag)
+        elif len(obj) == 2 and obj in short_ids:
+            out += bytes((_SHORT_CARD, short_ids[obj]))
+        else:
+            data = obj.encode("utf-8")
+            out.append(_STR)
+            _varint(out, len(data))
+            out += data
+    elif obj is None:
+        out.append(_NONE)
+    elif obj is True:
+        out.append(_TRUE)
+    elif obj is False:
+        out.append(_FALSE)
+    elif isinstance(obj, int):
+        if 0 <= obj < 0x40:
+            out.append(obj)
+        else:
+            out.append(_INT)
+            _varint(out, obj << 1 if obj >= 0 else (-obj << 1) - 1)
+    elif isinstance(obj, float):
+        out.append(_FLOAT)
+        out += _DOUBLE.pack(obj)
+    elif isinstance(obj, dict):
+        if len(obj) == 2 and "suit" in obj and "rank" in obj:
+            card_id = card_ids.get((obj["suit"], obj["rank"]))
+            if card_id is not None:
+                out += bytes((_CARD, card_id))
+                return
+        out.append(_DICT)
+        _varint(out, len(obj))
+        for key, value in obj.items():
+            if not isinstance(key, str):
+                key = json.dumps(key)  # same key JSON would use
+            _encode(out, key, card_ids, short_ids)
+            _encode(out, value, card_ids, short_ids)
+    elif isinstance(obj, (list, tuple)):
+        out.append(_LIST)
+        _varint(out, len(obj))
+        for value in obj:
+            _encode(out, value, card_ids, short_ids)
+    else:
+        raise TypeError(f"cannot encode {type(obj).__name__}")
+
+
+def _decode(data, i, names, shorts):
+    tag = data[i]
+    i += 1
+    if tag < 0x40:
+        return tag, i
+    if tag >= 0x80:
+        return WIRE_STRINGS[tag - 0x80], i
+    if tag == _DICT or tag == _LIST or tag == _STR or tag == _INT:
+        n = shift = 0
+        while True:
+            b = data[i]
+            i += 1
+            n |= (b & 0x7F) << shift
+            if b < 0x80:
+                break
+            shift += 7
+        if tag == _DICT:
+            obj = {}
+            for _ in range(n):
+                key, i = _decode(data, i, names, shorts)
+                obj[key], i = _decode(data, i, names, shorts)
+            return obj, i
+        if tag == _LIST:
+            obj = []
+            for _ in range(n):
+                value, i = _decode(data, i, names, shorts)
+                obj.append(value)
+            return obj, i
+        if tag == _STR:
+            return str(data[i : i + n], "utf-8"), i + n
+        return (n >> 1) ^ -(n & 1), i
+    if tag == _CARD:
+        suit, rank = names[data[i]]
+        return {"suit": suit, "rank": rank}, i + 1
+    if tag == _SHORT_CARD:
+        return shorts[data[i]], i + 1
+    if tag == _NONE:
+        return None, i
+    if tag == _TRUE:
+        return True, i
+    if tag == _FALSE:
+        return False, i
+    if tag == _FLOAT:
+        return _DOUBLE.unpack_from(data, i)[0], i + 8
+    raise ValueError(f"bad binary tag {tag:#x}")
+
+
+def encode_payload(obj, encoding="json"):
+    if encoding == "binary":
+        card_ids, short_ids, _, _ = _cards()
+        out = bytearray((BINARY_MAGIC,))
+        _encode(out, obj, card_ids, short_ids)
+        return bytes(out)
+    if encoding != "json":
+        raise ValueError(f"unknown encoding {encoding!r}")
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def decode_payload(data):
+    """Decodes a payload from bytes, a bytearray or a memoryview over one."""
+    if len(data) and data[0] == BINARY_MAGIC:
+        _, _, names, shorts = _cards()
+        try:
+            obj, end = _decode(data, 1, names, shorts)
+        except (IndexError, struct.error) as e:
+            raise ValueError("truncated binary message") from e
+        if end != len(data):
+            raise ValueError("trailing bytes after binary message")
+        return obj
+    return json.loads(str(data, "utf-8"))
+
+
+"""
+Picks the encoding for a connection from the ones the peer offered.
+
+@param offered: encodings the peer listed in its hello, in its preference order
+@param supported: encodings we can speak
+
+@return the first offered encoding we support, "json" if none
+"""
+
+
+def choose_encoding(offered, supported=ENCODINGS):
+    for encoding in offered or ():
+        if encoding in supported:
+            return encoding
+    return "json"
+
+
+"""
+State deltas: a list of [path, value] (set) and [path] (delete) operations,
+path being the list of keys from the top of the state down to the value.
+Lists are replaced whole.
+
+@param old: state the peer already has
+@param new: state to send
+
+@return list of operations turning old into new
+"""
+
+
+def make_delta(old, new, path=(), ops=None):
+    ops = [] if ops is None else ops
+    for key, value in new.items():
+        if key not in old:
+            ops.append([[*path, key], value])
+            continue
+        prev = old[key]
+        if isinstance(value, dict) and isinstance(prev, dict):
+            make_delta(prev, value, (*path, key), ops)
+        # types too, 1 == 1.0 == True but they don't send the same
+        elif type(prev) is not type(value) or prev != value:
+            ops.append([[*path, key], value])
+    for key in old:
+        if key not in new:
+            ops.append([[*path, key]])
+    return ops
+
+
+def apply_delta(state, ops):
+    """Returns a new state with the make_delta operations applied, `state` is left as is."""
+    state = dict(state)
+    copied = {id(state)}
+    for op in ops:
+        path = op[0]
+        node = state
+        for key in path[:-1]:
+            child = node[key]
+            if id(child) not in copied:
+                child = node[key] = dict(child)
+                copied.add(id(child))
+            node = child
+        if len(op) > 1:
+            node[path[-1]] = op[1]
+        else:
+            node.pop(path[-1], None)
+    return state
+
+
+class DeltaSender:
+    """
+    Engine side of the delta protocol for one connection: the first act of a
+    hand carries the full state, the following ones only what changed. Every
+    act carries a sequence number so the bot can tell when it missed one.
+    """
+
+    def __init__(self):
+        self.seq = 0
+        self.baseline = None
+
+    def message(self, state):
+        """Act message for `state`, which must not be changed after this call."""
+        self.seq += 1
+        if self.baseline is None:
+            msg = {"op": "act", "seq": self.seq, "state": state}
+        else:
+            msg = {"op": "act", "seq": self.seq, "delta": make_delta(self.baseline, state)}
+        self.baseline = state
+        return msg
+
+    def reset(self):
+        """Next message is a full snapshot (end of hand, reconnect, resync)."""
+        self.baseline = None
+
 
+class DeltaReceiver:
+    """
+    Bot side of the delta protocol: turns act messages back into full states.
+    """
 
-def recv_json(sock, max_bytes=1 << 20):
-    hdr = _recvall(sock, 4)
-    if not hdr:
-        raise ConnectionError("closed")
-    n = struct.unpack(">I", hdr)[0]
+    def __init__(self):
+        self.seq = 0
+        self.state = None
+
+    def receive(self, req):
+        """
+        @return req with the full "state", or None if a delta can't be applied
+                (missed message), then reply {"resync": true}
+        """
+        op = req.get("op")
+        if op == "end":
+            self.state = None
+            return req
+        if op != "act" or "seq" not in req:
+            return req
+        if "delta" in req:
+            if self.state is None or req["seq"] != self.seq + 1:
+                return None
+            state = apply_delta(self.state, req["delta"])
+        else:
+            state = req.get("state", {})
+        self.state, self.seq = state, req["seq"]
+        if "delta" not in req:
+            return req
+        # keep the rest of the envelope (request id, table, ...)
+        full = {k: v for k, v in req.items() if k != "delta"}
+        full["state"] = state
+        return full
+
+
+"""
+Framing: a 4-byte big-endian length, then the payload.
+
+Frames are sent with one vectored send (header and payload as two buffers,
+nothing concatenated) and read with recv_into straight into a buffer that is
+decoded in place through a memoryview, without building bytes objects first.
+FrameReader keeps that buffer for the life of a connection; send_frame/
+send_message and recv_message are for one-off use.
+"""
+
+_FRAME_HEADER = struct.Struct(">I")
+_HAS_SENDMSG = hasattr(socket.socket, "sendmsg")
+
+
+def send_frame(sock, data):
+    header = _FRAME_HEADER.pack(len(data))
+    if not _HAS_SENDMSG:
+        sock.sendall(header + data)
+        return
+    sent = sock.sendmsg((header, data))
+    if sent < len(header) + len(data):
+        # partial send (big frame, full socket buffer): finish the rest
+        if sent < len(header):
+            sock.sendall(header[sent:])
+            sent = len(header)
+        sock.sendall(memoryview(data)[sent - len(header) :])
+
+
+def send_frame_nowait(sock, data):
+    """For non-blocking sockets: sends what the socket takes now, returns the unsent rest of the frame."""
+    header = _FRAME_HEADER.pack(len(data))
+    try:
+        sent = sock.sendmsg((header, data)) if _HAS_SENDMSG else sock.send(header + data)
+    except (BlockingIOError, InterruptedError):
+        sent = 0
+    if sent == len(header) + len(data):
+        return b""
+    return (header + data)[sent:]
+
+
+def send_message(sock, obj, encoding="json"):
+    send_frame(sock, encode_payload(obj, encoding))
+
+
+def _recv_into(sock, view, first=False):
+    """Fills view from the socket; first: nothing of the frame was read before."""
+    got, n = 0, len(view)
+    while got < n:
+        k = sock.recv_into(view[got:])
+        if not k:
+            if first and not got:
+                raise ConnectionClosed("closed")
+            raise ConnectionError("closed early")
+        got += k
+
+
+class FrameReader:
+    """
+    Reads frames from one socket into a reusable buffer, grown as needed up
+    to max_bytes. recv() blocks (honouring the socket timeout) and reads
+    exactly one frame; recv_ready() is for non-blocking sockets: it reads
+    whatever has arrived and returns the frames completed by it.
+    """
+
+    def __init__(self, sock, max_bytes=1 << 20, size=4096):
+        self.sock = sock
+        self.max_bytes = max_bytes
+        self._buf = bytearray(size)
+        self._view = memoryview(self._buf)
+        # unread bytes are _buf[_start:_end]
+        self._start = self._end = 0
+
+    @property
+    def pending(self):
+        """Bytes received but not returned as a frame yet."""
+        return self._end - self._start
+
+    def _reserve(self, n):
+        """Makes room for n bytes from _start on."""
+        if self._start + n <= len(self._buf):
+            return
+        left = bytes(self._view[self._start : self._end])
+        if n > len(self._buf):
+            self._buf = bytearray(max(n, 2 * len(self._buf)))
+            self._view = memoryview(self._buf)
+        self._buf[: len(left)] = left
+        self._start, self._end = 0, len(left)
+
+    def _frame_size(self):
+        n = _FRAME_HEADER.unpack_from(self._buf, self._start)[0]
+        if n > self.max_bytes:
+            raise ValueError("msg too large")
+        return n
+
+    def _take(self, n):
+        start = self._start + _FRAME_HEADER.size
+        payload = self._view[start : start + n]
+        try:
+            return decode_payload(payload)
+        finally:
+            payload.release()
+            self._start = start + n
+            if self._start == self._end:
+                self._start = self._end = 0
+
+    def _fill(self, n):
+        """Blocks until n bytes are pending, reading as much as the buffer takes."""
+        self._reserve(n)
+        first = not self.pending
+        while self._end - self._start < n:
+            k = self.sock.recv_into(self._view[self._end :])
+            if not k:
+                if first and self._end == self._start:
+                    raise ConnectionClosed("closed")
+                raise ConnectionError("closed early")
+            self._end += k
+
+    def recv(self):
+        size = _FRAME_HEADER.size
+        if self._end - self._start < size:
+            self._fill(size)
+        n = self._frame_size()
+        if self._end - self._start < size + n:
+            self._fill(size + n)
+        return self._take(n)
+
+    def recv_ready(self):
+        """Frames completed by what the socket has now, [] if nothing arrived yet."""
+        if self._end == len(self._buf):
+            self._reserve(max(len(self._buf) // 2, self.pending + 1))
+        try:
+            k = self.sock.recv_into(self._view[self._end :])
+        except (BlockingIOError, InterruptedError):
+            return []
+        if not k:
+            raise ConnectionClosed("closed") if not self.pending else ConnectionError("closed early")
+        self._end += k
+        frames = []
+        size = _FRAME_HEADER.size
+        while self.pending >= size:
+            n = self._frame_size()
+            if self.pending < size + n:
+                self._reserve(size + n)
+                break
+            frames.append(self._take(n))
+        return frames
+
+
+def recv_message(sock, max_bytes=1 << 20):
+    """Receives one message in either encoding."""
+    header = bytearray(_FRAME_HEADER.size)
+    _recv_into(sock, memoryview(header), first=True)
+    n = _FRAME_HEADER.unpack(header)[0]
     if n > max_bytes:
         raise ValueError("msg too large")
-    return json.loads(_recvall(sock, n).decode("utf-8"))
+    payload = bytearray(n)
+    _recv_into(sock, memoryview(payload))
+    return decode_payload(payload)
 
 
-def _recvall(sock, n):
-    buf = bytearray()
-    while len(buf) < n:
-        chunk = sock.recv(n - len(buf))
-        if not chunk:
-            raise ConnectionError("closed early")
-        buf.extend(chunk)
-    return bytes(buf)
+def send_json(sock, obj):
+    send_message(sock, obj, "json")
+
+
+recv_json = recv_message
+
+
+"""
+Bot addresses. A bot listens on TCP (host, port), or, when it runs on the
+same machine as the engine, on a unix domain socket: then host is the
+socket's path and port is None. Unix sockets skip the loopback TCP stack
+(no checksums, acks or Nagle), which takes a good part off every message's
+round trip. Everything that talks to bots (engine_net, the engine's checks,
+manage_bots.py, botserver.py) goes through connect/listen below.
+"""
+
+HAS_UNIX = hasattr(socket, "AF_UNIX")
+
+
+def is_unix(host, port):
+    return port is None and bool(host)
+
+
+def address_str(host, port):
+    """host:port, or unix:path."""
+    return f"unix:{host}" if is_unix(host, port) else f"{host}:{port}"
+
+
+def connect(host, port, timeout=None):
+    """A connected socket to a bot, TCP with Nagle off or a unix socket."""
+    if not is_unix(host, port):
+        s = socket.create_connection((host, int(port)), timeout=timeout)
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return s
+    if not HAS_UNIX:
+        raise OSError(f"unix sockets are not supported here ({host})")
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        s.settimeout(timeout)
+        s.connect(host)
+    except OSError:
+        s.close()
+        raise
+    return s
+
+
+def listen(host, port, backlog=64):
+    """
+    A listening socket for a bot. A unix socket file left behind by a bot
+    that didn't shut down cleanly is replaced; one another bot is still
+    listening on is not.
+    """
+    if not is_unix(host, port):
+        return socket.create_server((host, int(port)), backlog=backlog)
+    if not HAS_UNIX:
+        raise OSError(f"unix sockets are not supported here ({host})")
+    if os.path.exists(host):
+        try:
+            connect(host, None, timeout=0.5).close()
+        except OSError:
+            os.unlink(host)  # stale
+        else:
+            raise OSError(f"{host} is in use")
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        s.bind(host)
+        s.listen(backlog)
+    except OSError:
+        s.close()
+        raise
+    return s
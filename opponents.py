@@ -0,0 +1,213 @@
+import json
+import os
+import struct
+import sys
+from array import array
+from collections import namedtuple
+
+from board import Card, hand_strength, STRENGTH_CATEGORY_SHIFT
+
+"""
+Bot side opponent profiles, kept up to date from the end of hand states.
+
+Every end state lists the moves each player made in the hand ("moves", see
+README.md), also in hands the bot itself folded early.
+OpponentStats reads them and keeps, per opponent, how often they
+    vpip               put chips in preflop when they didn't have to (call or raise)
+    pfr                raised preflop
+    aggression         bet/raised after the flop, out of their postflop bets,
+                       raises, calls and folds
+    wtsd               went to showdown
+    showdown_strength  how strong the hands they showed down were, 0..1
+                       (hand_strength of hand + board, scaled)
+    all_in             went all in during a hand
+along with how many hands, postflop actions and showdowns that is based on.
+A call of 0 chips is a check: it is neither VPIP nor a postflop action.
+
+The rates are exponentially decayed averages: a plain average over the
+first 1/decay samples, after that recent hands count more, so a bot that
+changes its style shows up within a few dozen hands. Every update is O(1),
+and all the numbers live in one fixed size array of floats, `capacity`
+opponents (the one not seen for longest makes room for a new one), so
+reading a profile inside the act deadline costs nothing and memory never
+grows. save()/load() write that array as is, to keep profiles across bot
+restarts:
+
+    stats = OpponentStats.load(path, me=name)   # or OpponentStats(me=name)
+    ...
+    stats.observe(state)                        # every end state
+    p = stats.profile("AllInBot")
+    if p and p.hands > 20 and p.all_in > 0.5: ...
+    stats.save(path)
+
+Hands are counted for opponents that made a move or won (a big blind
+everyone folds to), not for ones sitting out.
+"""
+
+FIELDS = (
+    "hands", "vpip", "pfr", "aggression", "actions", "wtsd",
+    "showdown_strength", "showdowns", "all_in", "last_seen",
+)
+(
+    _HANDS, _VPIP, _PFR, _AGGRESSION, _ACTIONS, _WTSD,
+    _SD_STRENGTH, _SHOWDOWNS, _ALL_IN, _LAST_SEEN,
+) = range(len(FIELDS))
+_NUM_FIELDS = len(FIELDS)
+
+OpponentProfile = namedtuple("OpponentProfile", FIELDS[:-1])
+
+STATS_MAGIC = b"OPST"
+STATS_VERSION = 1
+# magic, version, capacity, fields per opponent, decay, hands seen, names length;
+# then the names as a JSON list and the little-endian float64 array
+_HEADER = struct.Struct(">4sBHBdQI")
+
+_MAX_STRENGTH = 9 << STRENGTH_CATEGORY_SHIFT
+
+
+def _folded(moves):
+    return bool(moves) and moves[-1][1] == "fold"
+
+
+def _card(card):
+    if isinstance(card, Card):
+        return card
+    if isinstance(card, dict):
+        return Card.from_dict(card)
+    return Card.from_string(card)
+
+
+class OpponentStats:
+    def __init__(self, me=None, capacity=64, decay=0.02):
+        # our own name, never profiled
+        self.me = me
+        self.capacity = int(capacity)
+        self.decay = float(decay)
+        self.data = array("d", bytes(8 * self.capacity * _NUM_FIELDS))
+        self.names = [None] * self.capacity
+        self.slots = {}
+        self.hands_seen = 0
+
+    def _slot(self, name):
+        slot = self.slots.get(name)
+        if slot is not None:
+            return slot * _NUM_FIELDS
+        if len(self.slots) < self.capacity:
+            slot = len(self.slots)
+        else:
+            # full, forget the opponent we haven't seen for longest
+            d = self.data
+            slot = min(range(self.capacity), key=lambda s: d[s * _NUM_FIELDS + _LAST_SEEN])
+            del self.slots[self.names[slot]]
+        base = slot * _NUM_FIELDS
+        self.data[base : base + _NUM_FIELDS] = array("d", bytes(8 * _NUM_FIELDS))
+        self.names[slot] = name
+        self.slots[name] = slot
+        return base
+
+    def _average(self, i, count, x):
+        # plain mean for the first 1/decay samples, decayed after that
+        self.data[i] += (x - self.data[i]) * max(1.0 / count, self.decay)
+
+    """
+    Updates the profiles from an end state, which lists every move each
+    player made in the hand; act states are skipped, so any state can be
+    passed in.
+
+    @param state: the state dict the engine sent
+    """
+
+    def observe(self, state):
+        if not state.get("is_end_state"):
+            return
+        players = state.get("players") or {}
+        board = [_card(c) for c in state.get("board", ())]
+        # hands still in at the end; more than one means a showdown
+        shown = {
+            name: seat["hand"]
+            for name, seat in players.items()
+            if seat.get("hand") and not _folded(seat.get("moves"))
+        }
+        showdown = len(shown) > 1 and len(board) == 5
+
+        d = self.data
+        counted = False
+        for name, seat in players.items():
+            moves = seat.get("moves")
+            if name == self.me or not (moves or seat.get("winner")):
+                continue
+            base = self._slot(name)
+            vpip = pfr = all_in = False
+            for street, move, amount, left in moves or ():
+                if move == "call" and not amount:
+                    move = "check"  # a call with nothing to call
+                if move == "call" or move == "raise":
+                    if street == 0:
+                        vpip = True
+                        pfr = pfr or move == "raise"
+                    all_in = all_in or left == 0
+                if street and move != "check":
+                    d[base + _ACTIONS] += 1
+                    self._average(base + _AGGRESSION, d[base + _ACTIONS], move == "raise")
+
+            d[base + _HANDS] += 1
+            hands = d[base + _HANDS]
+            self._average(base + _VPIP, hands, vpip)
+            self._average(base + _PFR, hands, pfr)
+            self._average(base + _ALL_IN, hands, all_in)
+            went = showdown and name in shown
+            self._average(base + _WTSD, hands, went)
+            if went:
+                d[base + _SHOWDOWNS] += 1
+                strength = hand_strength([_card(c) for c in shown[name]] + board) / _MAX_STRENGTH
+                self._average(base + _SD_STRENGTH, d[base + _SHOWDOWNS], strength)
+            d[base + _LAST_SEEN] = self.hands_seen
+            counted = True
+        if counted:
+            self.hands_seen += 1
+
+    def profile(self, name):
+        """OpponentProfile of `name`, None if we haven't seen them play a hand."""
+        slot = self.slots.get(name)
+        if slot is None:
+            return None
+        base = slot * _NUM_FIELDS
+        return OpponentProfile._make(self.data[base : base + _NUM_FIELDS - 1])
+
+    def profiles(self):
+        return {name: self.profile(name) for name in self.slots}
+
+    def save(self, path):
+        names = json.dumps(self.names).encode()
+        data = array("d", self.data)
+        if sys.byteorder != "little":
+            data.byteswap()
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(
+                _HEADER.pack(
+                    STATS_MAGIC, STATS_VERSION, self.capacity, _NUM_FIELDS, self.decay, self.hands_seen, len(names)
+                )
+            )
+            f.write(names)
+            f.write(data.tobytes())
+        os.replace(tmp, path)  # a crash mid-save keeps the old file
+
+    @classmethod
+    def load(cls, path, me=None):
+        with open(path, "rb") as f:
+            raw = f.read()
+        magic, version, capacity, fields, decay, hands_seen, n = _HEADER.unpack_from(raw)
+        if magic != STATS_MAGIC or version != STATS_VERSION or fields != _NUM_FIELDS:
+            raise ValueError(f"{path} is not an opponent stats file")
+        stats = cls(me=me, capacity=capacity, decay=decay)
+        stats.hands_seen = hands_seen
+        start = _HEADER.size + n
+        stats.names = json.loads(raw[_HEADER.size : start])
+        stats.data = array("d", raw[start : start + 8 * capacity * fields])
+        if sys.byteorder != "little":
+            stats.data.byteswap()
+        if len(stats.names) != capacity or len(stats.data) != capacity * fields:
+            raise ValueError(f"{path} is cut short")
+        stats.slots = {name: slot for slot, name in enumerate(stats.names) if name is not None}
+        return stats
@@ -0,0 +1,166 @@
+import argparse
+import json
+import os
+import struct
+import sys
+
+from board import Card, ranks
+from equity import estimate_equity, remaining_deck
+
+"""
+Precomputed preflop equity.
+
+There are only 169 different starting hands once suits are ignored (13 pairs,
+78 suited, 78 offsuit). This module maps a hand to its class and stores the
+equity of every class against 1..N random opponents in a small binary file,
+so a bot can look up its preflop equity instead of simulating it.
+
+Generate the table (reads max_table_size / num_decks from config.json):
+    python preflop.py --samples 50000
+"""
+
+TABLE_MAGIC = b"PFEQ"
+TABLE_VERSION = 1
+# magic, version, num_decks, max_opponents, then 169 * max_opponents
+# big-endian uint16 equities (equity * 65535), grouped by opponent count
+_HEADER = struct.Struct(">4sBBB")
+_SCALE = 65535
+
+DEFAULT_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "preflop_equity.bin")
+
+
+def _class_label(hi, lo, suited):
+    if hi == lo:
+        return Card.REVERSE_RANK_MAP[ranks[hi]] * 2
+    label = Card.REVERSE_RANK_MAP[ranks[hi]] + Card.REVERSE_RANK_MAP[ranks[lo]]
+    return label + ("s" if suited else "o")
+
+
+# "AA", "AKs", "AKo", ... "32o", "22"
+PREFLOP_CLASSES = []
+for _hi in range(12, -1, -1):
+    for _lo in range(_hi, -1, -1):
+        if _hi == _lo:
+            PREFLOP_CLASSES.append(_class_label(_hi, _lo, False))
+        else:
+            PREFLOP_CLASSES.append(_class_label(_hi, _lo, True))
+            PREFLOP_CLASSES.append(_class_label(_hi, _lo, False))
+_CLASS_INDEX = {label: i for i, label in enumerate(PREFLOP_CLASSES)}
+
+
+def preflop_class(hand):
+    a, b = hand
+    hi, lo = sorted((a.id % 13, b.id % 13), reverse=True)
+    return _class_label(hi, lo, a.id // 13 == b.id // 13)
+
+
+def preflop_index(hand):
+    return _CLASS_INDEX[preflop_class(hand)]
+
+
+def _example_hand(label):
+    """Two cards (hearts, plus diamonds unless suited) for a class label."""
+    hi = Card.from_string(label[0] + "H")
+    lo = Card.from_string(label[1] + ("H" if label.endswith("s") else "D"))
+    return [hi, lo]
+
+
+class PreflopTable:
+    def __init__(self, equities, num_decks=1):
+        """equities[k - 1][class index] is the equity against k opponents."""
+        self.equities = [list(row) for row in equities]
+        self.num_decks = num_decks
+
+    @property
+    def max_opponents(self):
+        return len(self.equities)
+
+    def equity(self, hand, num_opponents=1):
+        """Equity of a 2 card hand, opponents above the table size use the largest."""
+        k = min(max(1, int(num_opponents)), self.max_opponents)
+        return self.equities[k - 1][preflop_index(hand)]
+
+    def save(self, path=DEFAULT_TABLE_PATH):
+        values = [round(e * _SCALE) for row in self.equities for e in row]
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(TABLE_MAGIC, TABLE_VERSION, self.num_decks, self.max_opponents))
+            f.write(struct.pack(f">{len(values)}H", *values))
+
+    @classmethod
+    def load(cls, path=DEFAULT_TABLE_PATH):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, num_decks, max_opponents = _HEADER.unpack_from(data)
+        if magic != TABLE_MAGIC or version != TABLE_VERSION:
+            raise ValueError(f"{path} is not a preflop equity table")
+        n = len(PREFLOP_CLASSES)
+        values = struct.unpack_from(f">{n * max_opponents}H", data, _HEADER.size)
+        equities = [
+            [v / _SCALE for v in values[k * n : (k + 1) * n]] for k in range(max_opponents)
+        ]
+        return cls(equities, num_decks=num_decks)
+
+
+"""
+Simulates the equity of every preflop class.
+
+@param max_opponents: fill in equity against 1..max_opponents opponents
+@param samples: runouts per class and opponent count
+@param num_decks: decks in the shoe
+@param progress: optional callback(done, total)
+
+@return PreflopTable
+"""
+
+
+def generate_table(max_opponents, samples=50000, num_decks=1, rng=None, progress=None):
+    equities = []
+    total = max_opponents * len(PREFLOP_CLASSES)
+    for k in range(1, max_opponents + 1):
+        row = []
+        for label in PREFLOP_CLASSES:
+            hand = _example_hand(label)
+            result = estimate_equity(
+                hand, [], k, samples=samples, deck=remaining_deck(hand, num_decks), rng=rng
+            )
+            row.append(result.equity)
+            if progress:
+                progress(len(equities) * len(PREFLOP_CLASSES) + len(row), total)
+        equities.append(row)
+    return PreflopTable(equities, num_decks=num_decks)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate the preflop equity table.")
+    ap.add_argument("-c", "--config", default="config.json")
+    ap.add_argument("--samples", type=int, default=50000, help="runouts per class and opponent count")
+    ap.add_argument("--out", default=DEFAULT_TABLE_PATH)
+    ap.add_argument("--seed", type=int, default=None)
+    args = ap.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        game = json.load(f).get("game", {})
+    max_opponents = int(game.get("max_table_size", 6)) - 1
+    num_decks = int(game.get("num_decks", 1))
+
+    rng = None
+    if args.seed is not None:
+        try:
+            import numpy as np
+
+            rng = np.random.default_rng(args.seed)
+        except ImportError:
+            import random
+
+            rng = random.Random(args.seed)
+
+    def progress(done, total):
+        print(f"\r{done}/{total} classes", end="", file=sys.stderr)
+
+    table = generate_table(max_opponents, args.samples, num_decks, rng=rng, progress=progress)
+    table.save(args.out)
+    print(f"\nwrote {args.out} ({max_opponents} opponents, {num_decks} decks)")
+
+
+if __name__ == "__main__":
+    main()
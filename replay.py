@@ -0,0 +1,189 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import deque
+
+from board import CallAction, CheckAction, FoldAction, RaiseAction
+from engine import Player, Tournament
+from handhistory import HISTORY, read_hands, read_records
+
+"""
+Replays a recorded tournament (game.hand_history) as fast as the engine can
+go, for profiling and regression checks.
+
+The tournament is played again with the recorded seed, so seating and cards
+are the same, against stand-in bots that answer with the actions recorded for
+them. Everything runs in-process, headless. The replayed hands are recorded
+too and compared with the original ones: if the engine still plays the same
+way, every hand (stacks, cards, actions, awards) matches.
+
+    python replay.py history.phh                   # replay the first tournament
+    python replay.py history.phh --tournament 2    # the second one in the file
+    python replay.py history.phh --repeat 20       # for profiling
+    python -m cProfile -s cumtime replay.py history.phh --repeat 5
+
+Exits with 1 if a replayed hand differs from the recording.
+"""
+
+_BLINDS = ("small_blind", "big_blind")
+
+
+class ReplayBot:
+    """Answers act requests with the actions recorded for one bot, in order."""
+
+    def __init__(self, name, actions):
+        self.name = name
+        self.actions = deque(actions)
+
+    def decide_action(self, state):
+        if not self.actions:
+            raise RuntimeError(f"no recorded action left for {self.name}")
+        move, amount = self.actions.popleft()
+        match move:
+            case "check":
+                return CheckAction()
+            case "call":
+                return CallAction()
+            case "raise":
+                return RaiseAction(amount)
+            case "error":
+                raise ConnectionError("recorded comms error")
+        return FoldAction()
+
+    def end_game(self, state):
+        pass
+
+
+class ReplayPlayer(Player):
+    """Asks its ReplayBot directly, so recorded errors take the engine's error path."""
+
+    def action(self, game_state, timeout_s=2.0):
+        return self.bot.decide_action(game_state)
+
+
+def _hand_key(hand):
+    return hand["tier"], hand["table"], hand["table_hand"]
+
+
+"""
+Reads one tournament and its hands from a hand history file.
+
+@param path: hand history file
+@param number: which tournament in the file, from 1
+
+@return tournament record, list of its hand records in play order
+"""
+
+
+def load_tournament(path, number=1):
+    tournament, hands, seen = None, [], 0
+    for record in read_records(path):
+        if record.get("type") == "tournament":
+            seen += 1
+            if seen > number:
+                break
+            tournament = record if seen == number else None
+        elif tournament is not None and record.get("type") == "hand":
+            hands.append(record)
+    if tournament is None:
+        raise ValueError(f"{path} has no tournament {number}")
+    hands.sort(key=_hand_key)
+    return tournament, hands
+
+
+def recorded_actions(hands):
+    """Bot name -> list of (move, amount or raise total) in the order the bot was asked."""
+    actions = {}
+    for hand in hands:
+        seats = hand["seats"]
+        for street, seat, move, *amounts in hand["actions"]:
+            if move not in _BLINDS:
+                actions.setdefault(seats[seat]["name"], []).append((move, amounts[-1]))
+    return actions
+
+
+def replay(tournament, hands):
+    """Plays the tournament again, returns the seconds it took."""
+    actions = recorded_actions(hands)
+    players = [
+        ReplayPlayer(name=name, chips=tournament["starting_chips"], bot=ReplayBot(name, actions.get(name, ())))
+        for name in tournament["players"]
+    ]
+    rules = {
+        "starting_chips": tournament["starting_chips"],
+        "num_decks": tournament["num_decks"],
+        "max_players": tournament["max_players"],
+        "headless": True,
+        "turbo": True,
+    }
+    config = dict(tournament["config"] or {}, seed=tournament["seed"])
+    start = time.perf_counter()
+    Tournament(players, rules, config=config).run()
+    return time.perf_counter() - start
+
+
+"""
+Compares recorded and replayed hands, ignoring timestamps.
+
+@return list of (key, field, recorded value, replayed value) differences
+"""
+
+
+def compare_hands(recorded, replayed):
+    diffs = []
+    replayed = {_hand_key(h): h for h in replayed}
+    for hand in recorded:
+        key = _hand_key(hand)
+        other = replayed.pop(key, None)
+        if other is None:
+            diffs.append((key, "hand", "played", "missing"))
+            continue
+        for field in hand:
+            if field != "time" and hand[field] != other.get(field):
+                diffs.append((key, field, hand[field], other.get(field)))
+    for key in replayed:
+        diffs.append((key, "hand", "missing", "played"))
+    return diffs
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Replay a recorded tournament at full speed.")
+    ap.add_argument("path", help="hand history file (game.hand_history)")
+    ap.add_argument("--tournament", type=int, default=1, help="which tournament in the file, from 1")
+    ap.add_argument("--repeat", type=int, default=1, help="replay this many times (profiling)")
+    ap.add_argument("--out", help="keep the last replay's hand history in this file")
+    args = ap.parse_args()
+
+    tournament, hands = load_tournament(args.path, args.tournament)
+    out = args.out
+    if out is None:
+        fd, out = tempfile.mkstemp(suffix=".phh")
+        os.close(fd)
+    try:
+        elapsed = 0.0
+        for _ in range(args.repeat):
+            if os.path.exists(out):
+                os.remove(out)
+            HISTORY.open(out)
+            elapsed += replay(tournament, hands)
+            HISTORY.close()
+        diffs = compare_hands(hands, list(read_hands(out)))
+    finally:
+        if args.out is None:
+            os.remove(out)
+
+    played = len(hands) * args.repeat
+    print(f"replayed {played} hands in {elapsed:.2f} s ({played / max(elapsed, 1e-9):.0f} hands/s)")
+    if diffs:
+        print(f"{len(diffs)} difference(s) from the recording, first ones:")
+        for key, field, was, now in diffs[:10]:
+            print(f"  tier {key[0]} table {key[1]} hand {key[2]} {field}: recorded {was!r}, replayed {now!r}")
+        return 1
+    print(f"all {len(hands)} hands match the recording")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
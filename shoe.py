@@ -0,0 +1,112 @@
+from board import CARDS, Card
+
+"""
+Bot side card counting for multi-deck shoes.
+
+The engine deals every hand at a table from the same shoe of num_decks decks
+and only reshuffles when it runs low, saying so with reset_deck in the end
+state. ShoeTracker follows along: it counts every card the bot gets to see
+(its hand, the board, hands shown at the end) once, per card, rank and suit,
+and starts over when the shoe is reshuffled. What it has not seen is either
+still in the shoe or hidden (burned, folded), so that is what's left to deal
+as far as the bot can tell, and what equity estimates should draw from:
+
+    shoe = ShoeTracker()
+    ...
+    shoe.observe(state)      # every act and end state
+    estimate_equity(hand, board, opponents, deck=shoe.remaining_ids())
+"""
+
+
+def _card_id(card):
+    if isinstance(card, Card):
+        return card.id
+    if isinstance(card, dict):
+        return Card.from_dict(card).id
+    if isinstance(card, str):
+        return Card.from_string(card).id
+    return int(card)
+
+
+class ShoeTracker:
+    def __init__(self, num_decks=1):
+        self.num_decks = max(1, int(num_decks))
+        self.reset()
+
+    def reset(self, num_decks=None):
+        """A freshly shuffled shoe, optionally with a different number of decks."""
+        if num_decks:
+            self.num_decks = max(1, int(num_decks))
+        n = self.num_decks
+        # copies not seen yet, per card id / rank (0 = 2 .. 12 = Ace) / suit (board.suits order)
+        self.counts = [n] * len(CARDS)
+        self.rank_counts = [4 * n] * 13
+        self.suit_counts = [13 * n] * 4
+        self.remaining = 52 * n
+        # card id -> copies already counted in the current hand
+        self._hand = {}
+
+    def see(self, card):
+        """Counts one card as seen: Card, id, short string or {"suit", "rank"} dict."""
+        card_id = _card_id(card)
+        if self.counts[card_id]:
+            self.counts[card_id] -= 1
+            self.rank_counts[card_id % 13] -= 1
+            self.suit_counts[card_id // 13] -= 1
+            self.remaining -= 1
+
+    """
+    Counts the cards in an act or end state that weren't counted yet this
+    hand (act states repeat the hand and board every decision). End states
+    close the hand, and reset the count when the shoe is reshuffled.
+
+    @param state: the state dict the engine sent
+    """
+
+    def observe(self, state):
+        num_decks = state.get("num_decks")
+        if num_decks and int(num_decks) != self.num_decks:
+            self.reset(num_decks)
+        if state.get("is_end_state"):
+            if state.get("reset_deck"):
+                self.reset()
+                return
+            cards = list(state.get("board", ()))
+            for seat in state.get("players", {}).values():
+                cards.extend(seat.get("hand") or ())
+        else:
+            cards = list(state.get("hand", ())) + list(state.get("board", ()))
+
+        # several copies of a card can be out at once with more than one deck
+        in_state = {}
+        for card in cards:
+            card_id = _card_id(card)
+            in_state[card_id] = in_state.get(card_id, 0) + 1
+            if in_state[card_id] > self._hand.get(card_id, 0):
+                self._hand[card_id] = in_state[card_id]
+                self.see(card_id)
+        if state.get("is_end_state"):
+            self._hand = {}
+
+    def remaining_ids(self):
+        """Card ids not seen, with repeats, e.g. the deck for equity.estimate_equity."""
+        return [card_id for card_id, n in enumerate(self.counts) for _ in range(n)]
+
+    def probability(self, card=None, rank=None, suit=None):
+        """
+        Chance that the next unseen card is `card`, or of rank `rank` (2..14)
+        or suit `suit` (suit name or letter).
+        """
+        if not self.remaining:
+            return 0.0
+        if card is not None:
+            return self.counts[_card_id(card)] / self.remaining
+        if rank is not None:
+            return self.rank_counts[int(rank) - 2] / self.remaining
+        if suit is not None:
+            suit = Card.SUIT_MAP.get(suit, suit)
+            return self.suit_counts[_SUIT_INDEX[suit]] / self.remaining
+        return 1.0
+
+
+_SUIT_INDEX = {card.suit: card.id // 13 for card in CARDS}
@@ -0,0 +1,5 @@
+import pathlib
+import sys
+
+# the modules live at the repo root, not in a package
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
@@ -0,0 +1,94 @@
+from board import CARDS, Card, Deck, GameState
+
+"""
+Cards and the Deck: interned cards, dealing, removing and resetting.
+"""
+
+
+def test_cards_are_interned():
+    assert Card("Hearts", "Ace") is Card.from_string("AH") is CARDS[Card("Hearts", "Ace").id]
+    assert Card.from_dict(Card.from_string("TS").to_dict()) is Card.from_string("TS")
+
+
+def test_to_dict_is_a_new_dict():
+    card = Card.from_string("AH")
+    d = card.to_dict()
+    d["rank"] = "Two"
+    assert card.to_dict() == {"suit": card.suit, "rank": card.rank}
+    assert card.to_dict() is not card.to_dict()
+
+
+def test_state_dicts_dont_share_card_dicts():
+    deck = Deck(1)
+    deck.deal_table(3)
+    gs = GameState(deck=deck, players=[])
+    first = gs.to_safe_dict()
+    first["board"][0]["rank"] = "changed by a bot"
+    assert gs.to_safe_dict()["board"][0] == deck.community_cards[0].to_dict()
+
+
+def test_deal():
+    deck = Deck(1)
+    top = deck.cards[-2:]
+    hand = deck.deal(2)
+    assert hand == [top[1], top[0]]  # the next one dealt is last
+    assert len(deck) == 50 and deck.used_cards == tuple(hand)
+    board = deck.deal_table(3)
+    assert board == deck.community_cards and len(deck) == 47
+    assert deck.used_cards == tuple(hand)  # community cards aren't used cards
+    assert len(set(hand + board)) == 5 and not set(hand + board) & set(deck.cards)
+
+
+def test_deal_past_the_end():
+    deck = Deck(1)
+    assert len(deck.deal(60)) == 52 and len(deck) == 0
+    assert deck.deal() == [] and not deck.burn()
+
+
+def test_remove():
+    deck = Deck(2)
+    ace = Card.from_string("AH")
+    assert deck.remove(ace) and deck.remove(ace)
+    assert not deck.remove(ace)  # both copies are gone
+    assert len(deck) == 102 and ace not in deck.cards
+    assert deck.used_cards.count(ace) == 2
+
+
+def test_cards_are_read_only():
+    deck = Deck(1)
+    cards = deck.cards
+    assert isinstance(cards, tuple) and isinstance(deck.used_cards, tuple)
+    assert deck.cards is not cards and deck.cards == cards
+
+
+def test_clear_table():
+    deck = Deck(1)
+    deck.shuffle()
+    hand = deck.deal(2)
+    board = list(deck.deal_table(5))
+    deck.clear_table()
+    assert deck.community_cards == [] and len(deck) == 45
+    assert set(deck.used_cards) == set(hand + board)
+    # the cleared board goes back in with the rest on shuffle
+    deck.shuffle()
+    assert len(deck) == 52 and deck.used_cards == ()
+
+
+def test_shuffle_keeps_the_board():
+    deck = Deck(1)
+    deck.deal(4)
+    board = list(deck.deal_table(3))
+    deck.shuffle()
+    assert deck.community_cards == board and len(deck) == 49
+    assert not set(board) & set(deck.cards)
+
+
+def test_needs_reset():
+    deck = Deck(1)
+    assert not deck.needs_reset(6)  # 6 * 2 + 5 + 3 = 20 cards
+    deck.deal(32)
+    assert not deck.needs_reset(6)
+    deck.deal()
+    assert deck.needs_reset(6) and len(deck) == 19  # only asks, changes nothing
+    deck.reset()
+    assert len(deck) == 52 and not deck.needs_reset(6) and deck.community_cards == []
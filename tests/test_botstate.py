@@ -0,0 +1,69 @@
+import json
+
+from board import CallAction
+from botstate import BotState, for_bot
+from engine_net import ask_bot_local, notify_bot_local
+
+"""
+BotState's accessors over an act state, and what for_bot gives a bot.
+"""
+
+
+def act_state():
+    return {
+        "pot": 90, "curr_bet": 40, "player_curr_bet": 10,
+        "players": {
+            "Me": {"chips": 500, "position": 0, "in_hand": True, "last_move": "call"},
+            "Folded": {"chips": 300, "position": 1, "in_hand": False, "last_move": "fold"},
+            "SatOut": {"chips": 5, "position": 2, "in_hand": False, "last_move": None},
+            "Raiser": {"chips": 200, "position": 3, "in_hand": True, "last_move": "raise"},
+            "Waiting": {"chips": 400, "position": 4, "in_hand": True, "last_move": None},
+        },
+    }
+
+
+def test_opponents():
+    state = BotState(act_state(), "Me")
+    assert state.opponents == ["Folded", "SatOut", "Raiser", "Waiting"]
+    assert state.live_opponents == ["Raiser", "Waiting"]
+    assert state.to_call == 30
+    assert state.my_stack == 500
+
+
+def test_live_opponents_without_in_hand():
+    # states from engines before "in_hand": folds are all there is to go on
+    state = act_state()
+    for seat in state["players"].values():
+        del seat["in_hand"]
+    assert BotState(state, "Me").live_opponents == ["SatOut", "Raiser", "Waiting"]
+
+
+class PlainBot:
+    """A bot without wants_state: keeps whatever it was handed."""
+
+    def __init__(self):
+        self.name = "Me"
+        self.got = []
+
+    def decide_action(self, state):
+        self.got.append(state)
+        return CallAction()
+
+    def end_game(self, state):
+        self.got.append(state)
+
+
+def test_local_bot_gets_what_a_tcp_bot_gets():
+    bot, state = PlainBot(), act_state()
+    ask_bot_local(bot, state, table="0.0")
+    notify_bot_local(bot, {"op": "end", "state": state}, table="0.0")
+    over_tcp = for_bot(bot, state, True, "0.0")
+    assert bot.got == [over_tcp, over_tcp]
+    assert isinstance(over_tcp, str) and json.loads(over_tcp) == {**state, "table": "0.0"}
+
+
+def test_local_bot_with_wants_state_gets_a_botstate():
+    bot = PlainBot()
+    bot.wants_state = True
+    ask_bot_local(bot, act_state())
+    assert isinstance(bot.got[0], BotState) and bot.got[0].live_opponents == ["Raiser", "Waiting"]
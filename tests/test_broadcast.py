@@ -0,0 +1,60 @@
+import threading
+import time
+
+import pytest
+
+import engine
+from board import CallAction
+from engine import Player, broadcast_end
+from eventlog import LOG, OFF
+
+"""
+broadcast_end's deadline: a slow end message still reaches the bot before
+anything the engine sends it afterwards.
+"""
+
+
+@pytest.fixture(autouse=True)
+def quiet_log():
+    level, LOG.level = LOG.level, OFF
+    yield
+    LOG.level = level
+
+
+class SlowSeat(Player):
+    """A TCP seat whose end messages take `delay` seconds to send."""
+
+    def __init__(self, name, delays, sent):
+        super().__init__(name, host="127.0.0.1", port=1)
+        self.delays = list(delays)
+        self.sent = sent
+
+    def notify(self, msg, timeout_s=2.0):
+        time.sleep(self.delays.pop(0))
+        self.sent.append(("end", msg["state"]["n"]))
+
+
+def test_act_waits_for_an_end_message_past_the_deadline(monkeypatch):
+    sent = []
+    lock = threading.Lock()
+
+    def request_action(host, port, state, **kwargs):
+        with lock:
+            sent.append(("act", port))
+        return CallAction()
+
+    monkeypatch.setattr(engine, "request_action", request_action)
+    slow = SlowSeat("Slow", [0.3], sent)
+    delivery = broadcast_end([slow], [{"n": 1}], timeout_s=0.05)
+    assert delivery == {"Slow": "timeout"}
+    slow.action({}, timeout_s=1.0)
+    assert sent == [("end", 1), ("act", 1)]
+
+
+def test_end_messages_stay_in_order():
+    sent = []
+    slow = SlowSeat("Slow", [0.2, 0], sent)
+    assert broadcast_end([slow], [{"n": 1}], timeout_s=0.05) == {"Slow": "timeout"}
+    assert broadcast_end([slow], [{"n": 2}], timeout_s=1.0) == {"Slow": "ok"}
+    assert sent == [("end", 1), ("end", 2)]
+    assert slow.pending_notify is None
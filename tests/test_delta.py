@@ -0,0 +1,114 @@
+import copy
+
+from netwire import DeltaReceiver, DeltaSender, apply_delta, make_delta
+
+"""
+Delta states (netwire.py): make_delta/apply_delta round trips, and the
+sequence numbers and resync between DeltaSender and DeltaReceiver.
+"""
+
+
+def state(**changes):
+    s = {
+        "pot": 30, "curr_bet": 20, "board": [],
+        "hand": [{"suit": "Hearts", "rank": "Ace"}, {"suit": "Spades", "rank": "King"}],
+        "players": {
+            "A": {"chips": 990, "last_move": None, "position": 0},
+            "B": {"chips": 980, "last_move": None, "position": 1},
+            "C": {"chips": 1000, "last_move": None, "position": 2},
+        },
+    }
+    s.update(changes)
+    return s
+
+
+def round_trip(old, new):
+    before = copy.deepcopy(old)
+    assert apply_delta(old, make_delta(old, new)) == new
+    assert old == before  # applying never changes the old state
+
+
+def test_round_trip_changes():
+    old = state()
+    new = state(pot=70, board=[{"suit": "Clubs", "rank": "Two"}])
+    new["players"]["C"] = {"chips": 960, "last_move": "call", "position": 2}
+    round_trip(old, new)
+    assert make_delta(old, old) == []
+
+
+def test_round_trip_added_and_removed_keys():
+    old = state()
+    new = state(can_check=True)
+    del new["curr_bet"]
+    round_trip(old, new)
+    assert [["curr_bet"]] in make_delta(old, new)
+
+
+def test_nested_removals():
+    old = state()
+    new = state()
+    del new["players"]["B"]
+    del new["players"]["A"]["last_move"]
+    ops = make_delta(old, new)
+    assert [["players", "B"]] in ops
+    assert [["players", "A", "last_move"]] in ops
+    round_trip(old, new)
+
+
+def test_type_changes_are_sent():
+    # 1 == 1.0 == True, but they don't encode the same
+    old, new = {"x": 1}, {"x": 1.0}
+    assert make_delta(old, new) == [[["x"], 1.0]]
+    assert type(apply_delta(old, make_delta(old, new))["x"]) is float
+    round_trip({"x": 1}, {"x": True})
+
+
+def test_sender_and_receiver():
+    sender, receiver = DeltaSender(), DeltaReceiver()
+    states = [state(pot=30 + 10 * i) for i in range(4)]
+    for i, s in enumerate(states):
+        msg = sender.message(s)
+        assert ("state" in msg) == (i == 0)
+        assert receiver.receive(msg)["state"] == s
+    # a hand ends, the next act is a full state again
+    assert receiver.receive({"op": "end", "state": {}}) is not None
+    sender.reset()
+    msg = sender.message(states[0])
+    assert "state" in msg and receiver.receive(msg)["state"] == states[0]
+
+
+def test_missed_message_asks_for_resync():
+    sender, receiver = DeltaSender(), DeltaReceiver()
+    receiver.receive(sender.message(state(pot=30)))
+    sender.message(state(pot=40))  # lost on the way
+    late = sender.message(state(pot=50))
+    assert receiver.receive(late) is None  # seq gap: the bot replies {"resync": true}
+    sender.reset()
+    full = receiver.receive(sender.message(state(pot=50)))
+    assert full["state"] == state(pot=50)
+    assert receiver.receive(sender.message(state(pot=60)))["state"] == state(pot=60)
+
+
+def test_out_of_order_seq():
+    sender, receiver = DeltaSender(), DeltaReceiver()
+    first = sender.message(state(pot=30))
+    second = sender.message(state(pot=40))
+    third = sender.message(state(pot=50))
+    receiver.receive(first)
+    assert receiver.receive(third) is None
+    assert receiver.receive(second)["state"] == state(pot=40)
+
+
+def test_delta_before_any_full_state():
+    sender, receiver = DeltaSender(), DeltaReceiver()
+    sender.message(state())
+    assert receiver.receive(sender.message(state(pot=40))) is None
+
+
+def test_envelope_is_kept():
+    sender, receiver = DeltaSender(), DeltaReceiver()
+    receiver.receive(sender.message(state()))
+    msg = dict(sender.message(state(pot=40)), id=7, table="1.2", seat="A")
+    full = receiver.receive(msg)
+    assert (full["id"], full["table"], full["seat"]) == (7, "1.2", "A")
+    assert "delta" not in full
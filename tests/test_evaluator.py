@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+from board import Card, _evaluate_hand_combinations, evaluate_hand, hand_strength, ranks, suits
+
+"""
+The table evaluator (evaluate_hand, hand_strength) against the old
+combinations evaluator, and the NumPy batch evaluator against hand_strength,
+on seeded random hands. benchmarks/bench_evaluator.py runs the same checks
+on more hands (and every 5 card hand with --exhaustive) and times them.
+"""
+
+HANDS = 2000
+
+
+def random_hands(count, size, num_decks=1, seed=0):
+    rng = random.Random(seed)
+    deck = [Card(s, r) for _ in range(num_decks) for s in suits for r in ranks]
+    return [rng.sample(deck, size) for _ in range(count)]
+
+
+@pytest.mark.parametrize("size", [5, 6, 7])
+@pytest.mark.parametrize("num_decks", [1, 2])
+def test_evaluate_hand_matches_combinations(size, num_decks):
+    for cards in random_hands(HANDS, size, num_decks, seed=size * 10 + num_decks):
+        expected, _ = _evaluate_hand_combinations(cards)
+        got, best = evaluate_hand(cards)
+        assert got == expected, [c.short_str() for c in cards]
+        # the 5 cards it picked make that hand on their own
+        assert _evaluate_hand_combinations(list(best))[0] == expected
+
+
+def test_hand_strength_orders_like_combinations():
+    hands = random_hands(HANDS, 7, seed=1)
+    by_strength = sorted(hands, key=hand_strength)
+    scores = [_evaluate_hand_combinations(cards)[0] for cards in by_strength]
+    assert scores == sorted(scores)
+
+
+@pytest.mark.parametrize("size", [5, 6, 7])
+def test_batch_matches_hand_strength(size):
+    pytest.importorskip("numpy")
+    from batch_eval import cards_to_ids, evaluate_hands_batch
+
+    hands = random_hands(HANDS, size, seed=size)
+    got = evaluate_hands_batch(cards_to_ids(hands)).tolist()
+    assert got == [hand_strength(cards) for cards in hands]
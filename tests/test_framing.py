@@ -0,0 +1,160 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from netwire import (
+    ConnectionClosed,
+    FrameReader,
+    encode_payload,
+    recv_message,
+    send_frame,
+    send_frame_nowait,
+    send_message,
+)
+
+"""
+Length-prefixed frames over a socket pair: FrameReader's reused buffer
+against partial frames, several frames per recv and frames bigger than
+the buffer, in both encodings.
+"""
+
+
+@pytest.fixture
+def pair():
+    a, b = socket.socketpair()
+    a.settimeout(5)
+    b.settimeout(5)
+    yield a, b
+    a.close()
+    b.close()
+
+
+def frame(obj, encoding="json"):
+    data = encode_payload(obj, encoding)
+    return len(data).to_bytes(4, "big") + data
+
+
+def state(n):
+    return {"pot": n, "board": ["AH", "KD", "2C"], "players": {"P0": {"chips": 1000 - n, "position": 0}}}
+
+
+def send_in_pieces(sock, data, sizes):
+    """Sends data a few bytes at a time from a thread, pausing in between."""
+
+    def run():
+        i = 0
+        for size in sizes:
+            sock.sendall(data[i : i + size])
+            i += size
+            time.sleep(0.01)
+        sock.sendall(data[i:])
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_partial_frames(pair):
+    a, b = pair
+    reader = FrameReader(b)
+    data = frame(state(1)) + frame(state(2), "binary")
+    # split inside the header, then inside the payload
+    thread = send_in_pieces(a, data, [2, 3, 10, 1])
+    assert reader.recv() == state(1)
+    assert reader.recv() == state(2)
+    thread.join()
+    assert reader.pending == 0
+
+
+def test_partial_frames_non_blocking(pair):
+    a, b = pair
+    b.setblocking(False)
+    reader = FrameReader(b)
+    data = frame(state(1))
+    got = []
+    for i in range(len(data)):
+        a.sendall(data[i : i + 1])
+        time.sleep(0.001)
+        got += reader.recv_ready()
+    assert got == [state(1)]
+    assert reader.recv_ready() == []  # nothing arrived
+
+
+def test_several_frames_in_one_recv(pair):
+    a, b = pair
+    a.sendall(b"".join(frame(state(i), ("json", "binary")[i % 2]) for i in range(5)))
+    time.sleep(0.05)
+    b.setblocking(False)
+    reader = FrameReader(b)
+    assert reader.recv_ready() == [state(i) for i in range(5)]
+    assert reader.pending == 0
+
+    # blocking reads take them one at a time from what is already buffered
+    b.settimeout(5)
+    a.sendall(frame(state(7)) + frame(state(8)))
+    assert reader.recv() == state(7)
+    a.close()
+    assert reader.recv() == state(8)
+    with pytest.raises(ConnectionClosed):
+        reader.recv()
+
+
+def test_frame_bigger_than_the_buffer(pair):
+    a, b = pair
+    reader = FrameReader(b, size=64)
+    big = {"players": {f"P{i}": {"chips": i, "hand": ["AH", "KD"]} for i in range(2000)}}
+    thread = threading.Thread(target=lambda: (send_message(a, big, "binary"), send_message(a, state(1))))
+    thread.start()
+    assert reader.recv() == big
+    assert reader.recv() == state(1)
+    thread.join()
+    assert len(reader._buf) > 64
+
+
+def test_frame_bigger_than_the_buffer_non_blocking(pair):
+    a, b = pair
+    b.setblocking(False)
+    reader = FrameReader(b, size=64)
+    big = {"log": "x" * 5000}
+    thread = threading.Thread(target=send_message, args=(a, big))
+    thread.start()
+    got = []
+    deadline = time.monotonic() + 5
+    while not got and time.monotonic() < deadline:
+        got = reader.recv_ready()
+        time.sleep(0.001)
+    thread.join()
+    assert got == [big]
+
+
+def test_too_large(pair):
+    a, b = pair
+    send_message(a, {"log": "x" * 200})
+    with pytest.raises(ValueError):
+        FrameReader(b, max_bytes=100).recv()
+
+
+def test_mixed_encodings(pair):
+    a, b = pair
+    reader = FrameReader(b)
+    msgs = [({"op": "hello", "encodings": ["json", "binary"]}, "json"), (state(3), "binary"),
+            ({"move": "raise", "amount": 150}, "json"), ({"op": "end", "state": state(4)}, "binary")]
+    for obj, encoding in msgs:
+        send_message(a, obj, encoding)
+    assert [reader.recv() for _ in msgs] == [obj for obj, _ in msgs]
+    # and the one-off helpers read and write the same frames
+    send_frame(b, encode_payload(state(5), "binary"))
+    assert recv_message(a) == state(5)
+    assert send_frame_nowait(b, encode_payload(state(6))) == b""
+    assert recv_message(a) == state(6)
+
+
+def test_closed_mid_frame(pair):
+    a, b = pair
+    a.sendall(frame(state(1))[:6])
+    a.close()
+    with pytest.raises(ConnectionError) as err:
+        FrameReader(b).recv()
+    assert not isinstance(err.value, ConnectionClosed)
@@ -0,0 +1,102 @@
+import pytest
+
+from board import Card
+from engine import Player
+from handhistory import HISTORY_MAGIC, HandHistoryWriter, HandRecord, read_hands, read_records
+
+"""
+Hand history files: records written with HandHistoryWriter read back the
+same with read_records/read_hands.
+"""
+
+
+def players(*chips):
+    seats = [Player(f"P{i}", chips=c) for i, c in enumerate(chips)]
+    for p, hand in zip(seats, (["AH", "KD"], ["2C", "2S"], ["TD", "9D"])):
+        p.hand = [Card.from_string(c) for c in hand]
+    return seats
+
+
+def blinds(seats, small=10, big=20):
+    for p, bet in zip(seats, (small, big)):
+        p.chips -= bet
+        p.curr_bet = bet
+
+
+def folded_preflop():
+    # the big blind takes it before any board is dealt
+    seats = players(1000, 1000, 1000)
+    blinds(seats)
+    record = HandRecord(seats, (10, 20), 1, tier=0, table=0, table_hand=1)
+    for p in seats:
+        record.deal(p)
+    record.action("preflop", seats[2], "fold")
+    record.action("preflop", seats[0], "fold")
+    record.award(seats[1], 30)
+    return record.finish([], "early")
+
+
+def split_pot():
+    seats = players(500, 500, 500)
+    blinds(seats)
+    record = HandRecord(seats, (10, 20), 2, tier=1, table=3, table_hand=7)
+    for p in seats:
+        record.deal(p)
+    record.action(0, seats[2], "raise", 60, to=60)
+    record.action(0, seats[0], "call", 50)
+    record.action(0, seats[1], "fold")
+    record.action(1, seats[0], "check")
+    record.action(1, seats[2], "check")
+    record.award(seats[0], 70)
+    record.award(seats[2], 70)
+    board = [Card.from_string(c) for c in ("QS", "JS", "TH", "3C", "4D")]
+    return record.finish(board, "showdown")
+
+
+def write(path, records, **kwargs):
+    writer = HandHistoryWriter(str(path), **kwargs)
+    for record in records:
+        writer.write(record)
+    writer.close()
+
+
+def test_hands_read_back(tmp_path):
+    path = tmp_path / "history.phh"
+    tournament = {"type": "tournament", "seed": 7, "players": ["P0", "P1", "P2"], "num_decks": 1}
+    hands = [folded_preflop(), split_pot()]
+    write(path, [tournament] + hands)
+
+    assert list(read_records(path)) == [tournament] + hands
+    assert list(read_hands(path)) == hands
+    empty, split = read_hands(path)
+    assert empty["board"] == [] and empty["reason"] == "early"
+    assert empty["seats"][0] == {"name": "P0", "chips": 1000, "hand": ["AH", "KD"]}
+    assert empty["actions"][:2] == [[0, 0, "small_blind", 10], [0, 1, "big_blind", 20]]
+    assert split["awards"] == [[0, 70], [2, 70]]
+    assert split["actions"][2] == [0, 2, "raise", 60, 60]
+
+
+def test_appends_and_buffers(tmp_path):
+    path = tmp_path / "history.phh"
+    write(path, [folded_preflop()])
+    # a second writer appends after the existing header
+    writer = HandHistoryWriter(str(path), flush_every=100, flush_interval=60)
+    writer.write(split_pot())
+    assert len(list(read_hands(path))) == 1  # still buffered
+    writer.close()
+    assert [h["reason"] for h in read_hands(path)] == ["early", "showdown"]
+    assert path.read_bytes().count(HISTORY_MAGIC) == 1
+
+
+def test_cut_short_file(tmp_path):
+    path = tmp_path / "history.phh"
+    write(path, [folded_preflop(), split_pot()])
+    path.write_bytes(path.read_bytes()[:-5])
+    assert [h["reason"] for h in read_hands(path)] == ["early"]
+
+
+def test_not_a_history_file(tmp_path):
+    path = tmp_path / "history.phh"
+    path.write_bytes(b"nope!")
+    with pytest.raises(ValueError):
+        list(read_records(path))
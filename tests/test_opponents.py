@@ -0,0 +1,94 @@
+import pytest
+
+from board import CallAction, CheckAction, Deck, FoldAction, GameState, RaiseAction
+from engine import Player, betting_round
+from eventlog import LOG, OFF
+from opponents import OpponentStats
+
+"""
+OpponentStats profiles from end states: what counts as VPIP, PFR and a
+postflop action.
+"""
+
+
+@pytest.fixture(autouse=True)
+def quiet_log():
+    level, LOG.level = LOG.level, OFF
+    yield
+    LOG.level = level
+
+
+def end_state(**moves):
+    players = {name: {"moves": m, "winner": False, "hand": []} for name, m in moves.items()}
+    return {"is_end_state": True, "board": [], "players": players}
+
+
+def profile(**moves):
+    stats = OpponentStats(me="Me")
+    stats.observe(end_state(Me=[[0, "fold", 0, 1000]], **moves))
+    return stats.profile("Opp")
+
+
+def test_vpip_needs_chips_in():
+    # the big blind "calls" with nothing to call: a check, not VPIP
+    p = profile(Opp=[[0, "call", 0, 980], [1, "check", 0, 980]])
+    assert p.hands == 1 and p.vpip == 0.0 and p.pfr == 0.0
+    assert profile(Opp=[[0, "call", 20, 980]]).vpip == 1.0
+
+
+def test_zero_calls_are_checks():
+    p = profile(Opp=[[0, "call", 20, 980], [1, "call", 0, 980], [2, "call", 0, 980], [3, "raise", 100, 880]])
+    assert p.actions == 1 and p.aggression == 1.0
+    p = profile(Opp=[[0, "call", 20, 980], [1, "call", 50, 930], [2, "call", 0, 930]])
+    assert p.actions == 1 and p.aggression == 0.0
+
+
+def test_raises_count_as_pfr():
+    p = profile(Opp=[[0, "raise", 60, 940]])
+    assert (p.vpip, p.pfr, p.all_in) == (1.0, 1.0, 0.0)
+
+
+class ScriptedBot:
+    """Plays the given actions in order, then checks."""
+
+    def __init__(self, name, actions):
+        self.name = name
+        self.actions = list(actions)
+
+    def decide_action(self, state):
+        return self.actions.pop(0) if self.actions else CheckAction()
+
+    def end_game(self, state):
+        pass
+
+
+def preflop(*seats):
+    players = [Player(name, chips=chips, bot=ScriptedBot(name, actions)) for name, chips, actions in seats]
+    game_state = GameState(deck=Deck(1), players=players)
+    game_state.reset_round(blinds=[10, 20])
+    betting_round(players, game_state, street="preflop")
+    return OpponentStats(), game_state.to_end_dict([], None)
+
+
+def test_short_all_in_is_not_pfr():
+    # Opp is all in for 50 against a raise to 100: it only calls
+    stats, end = preflop(
+        ("SB", 1000, [FoldAction()]), ("BB", 1000, [FoldAction()]),
+        ("Raiser", 1000, [RaiseAction(100)]), ("Opp", 50, [RaiseAction(500)]),
+    )
+    assert end["players"]["Opp"]["moves"] == [[0, "call", 50, 0]]
+    stats.observe(end)
+    p = stats.profile("Opp")
+    assert (p.vpip, p.pfr, p.all_in) == (1.0, 0.0, 1.0)
+    assert stats.profile("Raiser").pfr == 1.0
+
+
+def test_all_in_above_the_bet_is_pfr():
+    stats, end = preflop(
+        ("SB", 1000, [FoldAction()]), ("BB", 1000, [FoldAction()]),
+        ("Raiser", 1000, [RaiseAction(100), CallAction()]), ("Opp", 300, [RaiseAction(1000)]),
+    )
+    assert end["players"]["Opp"]["moves"] == [[0, "raise", 300, 0]]
+    stats.observe(end)
+    p = stats.profile("Opp")
+    assert (p.vpip, p.pfr, p.all_in) == (1.0, 1.0, 1.0)
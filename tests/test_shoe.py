@@ -0,0 +1,91 @@
+import pytest
+
+from board import Card
+from shoe import ShoeTracker
+
+"""
+ShoeTracker: counting the cards seen across the hands of one shoe.
+"""
+
+
+def act(hand, board=(), num_decks=1):
+    return {"hand": list(hand), "board": list(board), "num_decks": num_decks}
+
+
+def end(board=(), shown=(), num_decks=1, reset_deck=False):
+    players = {f"P{i}": {"hand": list(hand)} for i, hand in enumerate(shown)}
+    return {"is_end_state": True, "board": list(board), "players": players,
+            "num_decks": num_decks, "reset_deck": reset_deck}
+
+
+def test_counts_each_card_once_per_hand():
+    shoe = ShoeTracker()
+    # act states repeat the hand and board every decision
+    shoe.observe(act(["AH", "KD"]))
+    shoe.observe(act(["AH", "KD"]))
+    shoe.observe(act(["AH", "KD"], ["2C", "3C", "4C"]))
+    shoe.observe(act(["AH", "KD"], ["2C", "3C", "4C", "5C"]))
+    assert shoe.remaining == 52 - 6
+    shoe.observe(end(["2C", "3C", "4C", "5C", "6C"], [["AH", "KD"], ["QS", "QD"]]))
+    assert shoe.remaining == 52 - 9
+    assert shoe.counts[Card.from_string("QS").id] == 0
+    assert shoe.rank_counts[12] == 3 and shoe.probability(rank=14) == pytest.approx(3 / 43)
+    assert shoe.suit_counts[Card.from_string("2C").id // 13] == 13 - 5
+    assert shoe.probability(suit="C") == pytest.approx(8 / 43)
+
+
+def test_counts_carry_across_hands():
+    shoe = ShoeTracker()
+    shoe.observe(act(["AH", "KD"], ["2C", "3C", "4C"]))
+    shoe.observe(end(["2C", "3C", "4C"]))
+    # same shoe, next hand: new cards add up, nothing is counted twice
+    shoe.observe(act(["7S", "8S"]))
+    shoe.observe(act(["7S", "8S"], ["9S", "TS", "JS"]))
+    shoe.observe(end(["9S", "TS", "JS"], [["7S", "8S"]]))
+    assert shoe.remaining == 52 - 10
+    seen = {Card.from_string(c).id for c in ("AH", "KD", "2C", "3C", "4C", "7S", "8S", "9S", "TS", "JS")}
+    assert set(range(52)) - set(shoe.remaining_ids()) == seen
+    assert shoe.probability(card="AH") == 0.0 and shoe.probability(card="AS") == pytest.approx(1 / 42)
+
+
+def test_reset_deck_starts_over():
+    shoe = ShoeTracker()
+    shoe.observe(act(["AH", "KD"], ["2C", "3C", "4C"]))
+    shoe.observe(end(["2C", "3C", "4C"], reset_deck=True))
+    assert shoe.remaining == 52 and shoe.remaining_ids() == list(range(52))
+    # the first hand from the new shoe counts its cards again
+    shoe.observe(act(["AH", "KD"]))
+    assert shoe.remaining == 50
+
+
+def test_multi_deck_counts():
+    shoe = ShoeTracker()
+    shoe.observe(act(["AH", "AH"], ["AH"], num_decks=2))
+    assert shoe.num_decks == 2
+    # only two aces of hearts in two decks
+    assert shoe.counts[Card.from_string("AH").id] == 0 and shoe.remaining == 104 - 2
+    assert shoe.rank_counts[12] == 6
+    shoe.observe(end(["AH"], [["AH", "AS"]], num_decks=2))
+    assert shoe.remaining == 104 - 3
+    # the next hand shows another copy of the same card
+    shoe.observe(act(["AS", "2D"], num_decks=2))
+    assert shoe.counts[Card.from_string("AS").id] == 0 and shoe.remaining == 104 - 5
+    assert len(shoe.remaining_ids()) == shoe.remaining
+
+
+def test_num_decks_change_resets():
+    shoe = ShoeTracker(num_decks=2)
+    shoe.observe(act(["AH", "KD"], num_decks=2))
+    shoe.observe(act(["AH", "KD"], num_decks=4))
+    assert shoe.num_decks == 4 and shoe.remaining == 208 - 2
+
+
+def test_see_takes_any_card_form():
+    shoe = ShoeTracker()
+    shoe.see(Card.from_string("AH"))
+    shoe.see("KD")
+    shoe.see({"suit": "Clubs", "rank": "2"})
+    shoe.see(Card.from_string("3S").id)
+    assert shoe.remaining == 48
+    shoe.see("KD")  # no copy left: not counted
+    assert shoe.remaining == 48